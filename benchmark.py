@@ -0,0 +1,285 @@
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import resource
+import tempfile
+import subprocess
+import cv2
+import numpy as np
+from frames_extractor import VideoFrameExtractor
+from image_processor import ImageProcessor
+from property_calculator import PropertyCalculator
+from property_drift_calculator import DriftCalculator
+
+# (width, height, seconds, fps) of each synthetic video
+DEFAULT_CONFIGS = [
+    (640, 360, 30, 30),
+    (1280, 720, 30, 30),
+    (1920, 1080, 30, 30),
+    (1280, 720, 120, 30),
+    (1280, 720, 30, 60),
+]
+QUICK_CONFIGS = [
+    (320, 240, 10, 30),
+    (640, 360, 10, 30),
+]
+# Entry points whose start-up time is measured by running them with --help
+STARTUP_SCRIPTS = [
+    'pipeline_propdrift.py',
+    'drift_service.py',
+    'drift_monitor.py',
+    'noise_drift.py',
+    'image_ingestor.py',
+    'videonoiseadder.py',
+    'video_downloader.py',
+]
+
+def generate_video(path, width, height, seconds, fps, seed=0):
+    """
+    Writes a deterministic synthetic video of a moving gradient with a noisy band, so frame properties vary.
+
+    Args:
+        path (str): Output path of the .mp4 file.
+        width (int): Frame width in pixels.
+        height (int): Frame height in pixels.
+        seconds (int): Duration in seconds.
+        fps (int): Frames per second.
+        seed (int): Seed of the noise generator.
+    """
+    rng = np.random.default_rng(seed)
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (width, height))
+    gradient = np.linspace(0, 255, width, dtype=np.float32)[np.newaxis, :, np.newaxis]
+    frame = np.empty((height, width, 3), dtype=np.uint8)
+    for index in range(int(seconds * fps)):
+        shift = (index * 3) % 256
+        frame[:] = ((gradient + shift + np.array([0, 40, 80], dtype=np.float32)) % 256).astype(np.uint8)
+        band = height // 4
+        frame[:band] = rng.integers(0, 256, (band, width, 3), dtype=np.uint8)
+        writer.write(frame)
+    writer.release()
+
+def peak_rss_mb():
+    # ru_maxrss is the process high-water mark: kilobytes on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 ** 2 if sys.platform == 'darwin' else 1024)
+
+def summarize(latencies, frames, total_seconds):
+    """
+    Summarises the per-call latencies of one stage.
+
+    Returns:
+        dict: Number of calls and frames, total seconds, frames per second, latency percentiles in milliseconds
+        and the process peak RSS in MB after the stage.
+    """
+    latencies_ms = np.asarray(latencies, dtype=np.float64) * 1000.0
+    return {
+        'calls': len(latencies_ms),
+        'frames': frames,
+        'total_seconds': total_seconds,
+        'fps': frames / total_seconds if total_seconds else 0.0,
+        'latency_ms': {
+            'p50': float(np.percentile(latencies_ms, 50)),
+            'p90': float(np.percentile(latencies_ms, 90)),
+            'p99': float(np.percentile(latencies_ms, 99)),
+            'max': float(latencies_ms.max())
+        },
+        'peak_rss_mb': peak_rss_mb()
+    }
+
+def benchmark_video(video_path, target_fpm, drift_repeats):
+    """
+    Times each stage of the extraction, property and drift hot path on one video.
+
+    Returns:
+        dict: Stage names mapped to their summaries.
+    """
+    results = {}
+    extractor = VideoFrameExtractor(video_path, target_fpm=target_fpm)
+
+    # Per-frame latencies from the generator, total time from extract_frames itself
+    latencies = []
+    start = time.perf_counter()
+    for _ in extractor.iter_frames():
+        now = time.perf_counter()
+        latencies.append(now - start)
+        start = now
+    start = time.perf_counter()
+    frames = extractor.extract_frames()
+    total = time.perf_counter() - start
+    results['VideoFrameExtractor.extract_frames'] = summarize(latencies, len(frames), total)
+
+    images = [frame[0].transpose(1, 2, 0) for frame in frames]
+    processor = ImageProcessor()
+    methods = [name for name in dir(processor) if name.startswith('calculate_')]
+    for method_name in methods:
+        method = getattr(processor, method_name)
+        latencies = []
+        for image in images:
+            start = time.perf_counter()
+            method(image)
+            latencies.append(time.perf_counter() - start)
+        results[f'ImageProcessor.{method_name}'] = summarize(latencies, len(images), sum(latencies))
+
+    for label, calculator in (('PropertyCalculator.get_images_properties', PropertyCalculator()),
+                              ('PropertyCalculator.get_images_properties[fused]', PropertyCalculator(fused=True))):
+        latencies = []
+        for frame in frames:
+            start = time.perf_counter()
+            calculator.get_images_properties([frame])
+            latencies.append(time.perf_counter() - start)
+        results[label] = summarize(latencies, len(frames), sum(latencies))
+
+    calculator = PropertyCalculator()
+    chunk_size = 32
+    latencies = []
+    for start_index in range(0, len(frames), chunk_size):
+        start = time.perf_counter()
+        calculator.get_batch_properties(frames[start_index:start_index + chunk_size])
+        latencies.append(time.perf_counter() - start)
+    results['PropertyCalculator.get_batch_properties'] = summarize(latencies, len(frames), sum(latencies))
+
+    props = calculator.get_images_properties(frames)
+    batch_props = calculator.get_batch_properties(frames)
+
+    # Drift of the video against itself shifted by one sample, so both sides are realistic and non-identical
+    drift_calculator = DriftCalculator()
+    shifted_props = {prop_name: np.roll(values, 1) * 1.01 for prop_name, values in batch_props.items()}
+    latencies = []
+    for _ in range(drift_repeats):
+        start = time.perf_counter()
+        drift_calculator.calculate_property_drift(test_props=shifted_props, train_props=props)
+        latencies.append(time.perf_counter() - start)
+    results['DriftCalculator.calculate_property_drift'] = summarize(latencies, len(frames) * drift_repeats,
+                                                                    sum(latencies))
+    return results
+
+def benchmark_startup(repeats):
+    """
+    Times each entry point from a fresh interpreter to the end of argument parsing, by running it with --help.
+
+    Returns:
+        dict: Script names mapped to the number of runs and latency percentiles in milliseconds, or to an
+        'error' if the script failed to start.
+    """
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    results = {}
+    for script in STARTUP_SCRIPTS:
+        latencies = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            completed = subprocess.run([sys.executable, os.path.join(script_dir, script), '--help'],
+                                       capture_output=True, text=True)
+            latencies.append(time.perf_counter() - start)
+            if completed.returncode:
+                break
+        if completed.returncode:
+            stderr = completed.stderr.strip()
+            results[script] = {'error': stderr.splitlines()[-1] if stderr else f"exit status {completed.returncode}"}
+            continue
+        latencies_ms = np.asarray(latencies) * 1000.0
+        results[script] = {
+            'calls': len(latencies_ms),
+            'latency_ms': {
+                'p50': float(np.percentile(latencies_ms, 50)),
+                'p90': float(np.percentile(latencies_ms, 90)),
+                'max': float(latencies_ms.max())
+            }
+        }
+    return results
+
+def compare(current, baseline, tolerance, min_delta_ms=0.05, startup_min_delta_ms=25.0):
+    """
+    Compares median stage latencies with a saved baseline.
+
+    Args:
+        current (dict): Results of this run.
+        baseline (dict): Results of a previous run.
+        tolerance (float): Allowed relative slowdown, e.g. 0.1 for 10%.
+        min_delta_ms (float): Slowdowns smaller than this are ignored as timer noise.
+        startup_min_delta_ms (float): The same for start-up times, which vary with process creation and disk cache.
+
+    Returns:
+        list: One dictionary per regressed stage. Start-up times are reported with 'startup' as the video.
+    """
+    groups = [(video_name, stages, baseline.get('videos', {}).get(video_name, {}), min_delta_ms)
+              for video_name, stages in current['videos'].items()]
+    groups.append(('startup', current.get('startup', {}), baseline.get('startup', {}), startup_min_delta_ms))
+    regressions = []
+    for video_name, stages, baseline_stages, min_delta in groups:
+        for stage_name, summary in stages.items():
+            if 'latency_ms' not in summary or 'latency_ms' not in baseline_stages.get(stage_name, {}):
+                continue
+            before = baseline_stages[stage_name]['latency_ms']['p50']
+            after = summary['latency_ms']['p50']
+            if after > before * (1.0 + tolerance) and after - before > min_delta:
+                regressions.append({'video': video_name, 'stage': stage_name, 'baseline_p50_ms': before,
+                                    'current_p50_ms': after, 'ratio': after / before})
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the extraction, property and drift hot path on synthetic videos.")
+    parser.add_argument('--output', type=str, default='benchmark_results.json', help='Path of the JSON results file')
+    parser.add_argument('--quick', action='store_true', help='Use a small set of short, low-resolution videos')
+    parser.add_argument('--video_dir', type=str, default=None, help='Directory to generate videos in (default: a temporary directory)')
+    parser.add_argument('--target_fpm', type=int, default=600, help='Frames per minute sampled by VideoFrameExtractor')
+    parser.add_argument('--drift_repeats', type=int, default=20, help='Number of timed drift calculations per video')
+    parser.add_argument('--startup_repeats', type=int, default=5, help='Number of timed start-ups of each entry point (0 to skip)')
+    parser.add_argument('--compare', type=str, default=None, help='Baseline JSON results to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.1, help='Allowed relative p50 slowdown before a stage counts as regressed')
+    parser.add_argument('--min_delta_ms', type=float, default=0.05, help='Ignore p50 slowdowns smaller than this many milliseconds')
+    parser.add_argument('--startup_min_delta_ms', type=float, default=25.0, help='Ignore start-up p50 slowdowns smaller than this many milliseconds')
+
+    args = parser.parse_args()
+    configs = QUICK_CONFIGS if args.quick else DEFAULT_CONFIGS
+
+    results = {
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'numpy': np.__version__,
+            'opencv': cv2.__version__,
+            'cpu_count': os.cpu_count()
+        },
+        'parameters': {'target_fpm': args.target_fpm, 'drift_repeats': args.drift_repeats,
+                       'startup_repeats': args.startup_repeats},
+        'startup': {},
+        'videos': {}
+    }
+
+    if args.startup_repeats > 0:
+        print("Benchmarking start-up")
+        results['startup'] = benchmark_startup(args.startup_repeats)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        video_dir = args.video_dir or tmp_dir
+        if not os.path.exists(video_dir):
+            os.makedirs(video_dir)
+        for width, height, seconds, fps in configs:
+            video_name = f"{width}x{height}_{seconds}s_{fps}fps"
+            video_path = os.path.join(video_dir, f"{video_name}.mp4")
+            if not os.path.exists(video_path):
+                generate_video(video_path, width, height, seconds, fps)
+            print(f"Benchmarking {video_name}")
+            results['videos'][video_name] = benchmark_video(video_path, args.target_fpm, args.drift_repeats)
+
+    with open(args.output, 'w') as file:
+        json.dump(results, file, indent=4)
+    print(f"Benchmark results saved to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+        regressions = compare(results, baseline, args.tolerance, args.min_delta_ms, args.startup_min_delta_ms)
+        for regression in regressions:
+            print(f"REGRESSION {regression['video']} {regression['stage']}: "
+                  f"p50 {regression['baseline_p50_ms']:.3f} ms -> {regression['current_p50_ms']:.3f} ms "
+                  f"({regression['ratio']:.2f}x)")
+        if regressions:
+            sys.exit(1)
+        print("No regressions against the baseline.")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,341 @@
+import json
+import time
+import argparse
+import cv2
+import numpy as np
+from image_processor import ImageProcessor, PropertyScratch
+from property_drift_calculator import DriftCalculator
+
+def ks_bin_edges(train_values, num_bins):
+    """
+    Returns sorted bin edges for binned KS statistics: the num_bins quantiles of the training values, the last of
+    which is their maximum, each followed by the next larger float.
+
+    Every quantile value thereby gets a bin of its own, so CDFs read off the bins are compared just below and at
+    each quantile. Ties at a quantile and shifts past the training maximum, e.g. of a constant property, are scored
+    like the exact KS statistic instead of vanishing into a shared bin.
+    """
+    edges = np.quantile(train_values, np.linspace(0.0, 1.0, num_bins + 1)[1:])
+    return np.sort(np.concatenate([edges, np.nextafter(edges, np.inf)]))
+
+class HistogramSketch:
+    """
+    A fixed-bin histogram of one property. Memory is constant in the number of values seen, and two sketches
+    with the same bin edges merge by adding their counts.
+    """
+
+    def __init__(self, edges):
+        """
+        Args:
+            edges: Sorted bin edges. Bin i holds values in [edges[i - 1], edges[i]), with open-ended first and
+                last bins.
+        """
+        self.edges = np.asarray(edges, dtype=np.float64)
+        self.counts = np.zeros(len(self.edges) + 1, dtype=np.int64)
+        self.total = 0.0
+
+    def update(self, values):
+        """
+        Adds one or more values to the histogram.
+        """
+        values = np.atleast_1d(np.asarray(values, dtype=np.float64))
+        bins = np.searchsorted(self.edges, values, side='right')
+        self.counts += np.bincount(bins, minlength=len(self.counts))
+        self.total += values.sum()
+
+    def merge(self, other):
+        """
+        Adds the counts of another sketch with identical bin edges.
+        """
+        if not np.array_equal(self.edges, other.edges):
+            raise ValueError("Cannot merge sketches with different bin edges.")
+        self.counts += other.counts
+        self.total += other.total
+
+    def reset(self):
+        self.counts[:] = 0
+        self.total = 0.0
+
+    @property
+    def count(self):
+        return int(self.counts.sum())
+
+    def mean(self):
+        return self.total / self.count if self.count else float('nan')
+
+    def cdf(self):
+        """
+        Returns the empirical CDF evaluated just below each bin edge.
+        """
+        count = self.count
+        if not count:
+            return np.zeros(len(self.edges))
+        return np.cumsum(self.counts[:-1]) / count
+
+class OnlineDriftMonitor:
+    """
+    Tracks property drift of a live stream of frames against a training reference, using constant memory.
+
+    The training values of each property are summarised once into quantile bin edges (see ks_bin_edges) and the
+    reference CDF at those edges. Incoming frames only update per-property fixed-bin histograms, so each drift
+    update costs O(bins) per property. The drift score is the Kolmogorov-Smirnov statistic evaluated below and at
+    every quantile; with num_bins quantile bins it is within 1 / num_bins of the exact statistic.
+    """
+
+    def __init__(self, train_props, num_bins=100, every_n_frames=None, every_seconds=None, callback=None,
+                 reset_on_emit=False):
+        """
+        Args:
+            train_props: Training property values, either per image or per property (see
+                DriftCalculator.get_property_values).
+            num_bins (int): Number of quantile bins per property.
+            every_n_frames (int): Emit a drift update every this many ingested frames.
+            every_seconds (float): Emit a drift update every this many seconds.
+            callback: Function called with each emitted drift update.
+            reset_on_emit (bool): If True, each update covers only the frames since the previous update
+                instead of all frames since the monitor started.
+        """
+        self.processor = ImageProcessor()
+        self.scratch = PropertyScratch()
+        self.drift_calculator = DriftCalculator()
+        self.every_n_frames = every_n_frames
+        self.every_seconds = every_seconds
+        self.callback = callback
+        self.reset_on_emit = reset_on_emit
+
+        self.reference = {}
+        self.sketches = {}
+        for prop_name in self.drift_calculator.properties:
+            train_data = self.drift_calculator.get_property_values(train_props, prop_name).astype(np.float64)
+            if not len(train_data):
+                raise ValueError(f"No training values for property: {prop_name}.")
+            edges = np.unique(ks_bin_edges(train_data, num_bins))
+            self.reference[prop_name] = HistogramSketch(edges)
+            self.reference[prop_name].update(train_data)
+            self.sketches[prop_name] = HistogramSketch(edges)
+
+        self.frames_since_emit = 0
+        self.last_emit_time = time.monotonic()
+
+    def update_frame(self, frame):
+        """
+        Computes the properties of one frame and ingests them.
+
+        Args:
+            frame: A BGR frame of shape (H, W, 3), or (1, 3, H, W) as produced by VideoFrameExtractor.
+
+        Returns:
+            dict: The drift update if one was emitted, otherwise None.
+        """
+        if frame.ndim == 4:
+            frame = frame[0].transpose(1, 2, 0)
+        return self.update(self.processor.calculate_all_properties(frame, self.scratch))
+
+    def update(self, prop_values):
+        """
+        Ingests property values of one frame, or arrays of values for several frames.
+
+        Args:
+            prop_values (dict): Property names mapped to a value or an array of values.
+
+        Returns:
+            dict: The drift update if one was emitted, otherwise None.
+        """
+        num_frames = 0
+        for prop_name, sketch in self.sketches.items():
+            values = np.atleast_1d(prop_values[prop_name])
+            sketch.update(values)
+            num_frames = len(values)
+        self.frames_since_emit += num_frames
+
+        due = self.every_n_frames is not None and self.frames_since_emit >= self.every_n_frames
+        if self.every_seconds is not None and time.monotonic() - self.last_emit_time >= self.every_seconds:
+            due = True
+        if due and self.frames_since_emit:
+            return self.emit()
+        return None
+
+    def merge(self, other):
+        """
+        Merges the ingested histograms of another monitor built from the same training reference.
+        """
+        for prop_name, sketch in self.sketches.items():
+            sketch.merge(other.sketches[prop_name])
+        self.frames_since_emit += other.frames_since_emit
+
+    def drift(self):
+        """
+        Calculates the current drift of the ingested frames against the training reference.
+
+        Returns:
+            dict: For each property, 'Drift Score' (binned KS statistic), 'Mean (Train)', 'Mean (Test)' and
+            'Frames'.
+        """
+        drift_info = {}
+        for prop_name, sketch in self.sketches.items():
+            reference = self.reference[prop_name]
+            ks_statistic = np.max(np.abs(reference.cdf() - sketch.cdf()), initial=0.0) if sketch.count else float('nan')
+            drift_info[prop_name] = {
+                'Drift Score': float(ks_statistic),
+                'Mean (Train)': float(reference.mean()),
+                'Mean (Test)': float(sketch.mean()),
+                'Frames': sketch.count
+            }
+        return drift_info
+
+    def emit(self):
+        """
+        Emits a drift update to the callback and restarts the emission counters.
+
+        Returns:
+            dict: The drift update.
+        """
+        drift_info = self.drift()
+        if self.callback is not None:
+            self.callback(drift_info)
+        self.frames_since_emit = 0
+        self.last_emit_time = time.monotonic()
+        if self.reset_on_emit:
+            for sketch in self.sketches.values():
+                sketch.reset()
+        return drift_info
+
+class SlidingWindowDrift:
+    """
+    Calculates property drift as a time series over sliding windows of sampled frames.
+
+    Every window of `window` consecutive frames, advancing by `stride` frames, is compared with the training
+    reference. Each frame is binned once against per-property quantile edges of the reference when it arrives;
+    the window histogram is then updated by adding the entering frame and removing the leaving one, so sliding
+    the window costs O(P) per frame and O(P * bins) per emitted window instead of a sort per window. Drift
+    scores are binned KS statistics over the edges of ks_bin_edges, within 1 / num_bins of the exact statistic.
+    """
+
+    def __init__(self, train_props, window, stride=1, num_bins=100, properties=None):
+        """
+        Args:
+            train_props: Training property values or a DriftBaseline (see DriftCalculator.get_property_values).
+            window (int): Number of sampled frames per window.
+            stride (int): Number of sampled frames between the starts of consecutive windows.
+            num_bins (int): Number of quantile bins per property.
+            properties (list): Names of the registered properties to track; defaults to the default properties.
+        """
+        if window < 1 or stride < 1:
+            raise ValueError("Window and stride must be positive.")
+        self.window = window
+        self.stride = stride
+        drift_calculator = DriftCalculator(properties=properties)
+        self.property_names = list(drift_calculator.properties)
+
+        self.edges = np.empty((len(self.property_names), 2 * num_bins))
+        self.reference_cdf = np.empty_like(self.edges)
+        for index, prop_name in enumerate(self.property_names):
+            train_sorted = np.sort(drift_calculator.get_property_values(train_props, prop_name).astype(np.float64))
+            if not len(train_sorted):
+                raise ValueError(f"No training values for property: {prop_name}.")
+            # Duplicate edges are kept so every property has the same number of bins; they only add empty bins
+            self.edges[index] = ks_bin_edges(train_sorted, num_bins)
+            self.reference_cdf[index] = np.searchsorted(train_sorted, self.edges[index], side='left') / len(train_sorted)
+
+        self._rows = np.arange(len(self.property_names))
+        self._counts = np.zeros((len(self.property_names), self.edges.shape[1] + 1), dtype=np.int64)
+        self._ring = np.zeros((window, len(self.property_names)), dtype=np.int64)
+        self._timestamps = np.zeros(window)
+        self._num_frames = 0
+        self._drift = []
+        self._start_times = []
+        self._end_times = []
+        self._start_frames = []
+
+    def update(self, prop_values, timestamp=None):
+        """
+        Ingests the property values of the next sampled frame.
+
+        Args:
+            prop_values (dict): Property names mapped to the frame's values.
+            timestamp (float): Time of the frame in seconds. Defaults to the frame's sample index.
+
+        Returns:
+            numpy.ndarray: The drift scores of the window ending at this frame if one was completed, otherwise None.
+        """
+        bins = np.array([np.searchsorted(self.edges[index], prop_values[prop_name], side='right')
+                         for index, prop_name in enumerate(self.property_names)])
+
+        slot = self._num_frames % self.window
+        if self._num_frames >= self.window:
+            self._counts[self._rows, self._ring[slot]] -= 1
+        self._counts[self._rows, bins] += 1
+        self._ring[slot] = bins
+        self._timestamps[slot] = self._num_frames if timestamp is None else timestamp
+        self._num_frames += 1
+
+        window_start = self._num_frames - self.window
+        if window_start < 0 or window_start % self.stride:
+            return None
+
+        window_cdf = np.cumsum(self._counts[:, :-1], axis=1) / self.window
+        drift = np.max(np.abs(self.reference_cdf - window_cdf), axis=1, initial=0.0)
+        self._drift.append(drift.astype(np.float32))
+        self._start_times.append(self._timestamps[self._num_frames % self.window])
+        self._end_times.append(self._timestamps[slot])
+        self._start_frames.append(window_start)
+        return drift
+
+    def result(self):
+        """
+        Returns the drift time series.
+
+        Returns:
+            dict: 'drift', a float32 array of shape (num_windows, P); 'properties', the P property names;
+            'start_frame', the sample index of each window's first frame; and 'start_time'/'end_time', the
+            timestamps of each window's first and last frames.
+        """
+        return {
+            'drift': np.array(self._drift, dtype=np.float32).reshape(-1, len(self.property_names)),
+            'properties': np.array(self.property_names),
+            'start_frame': np.array(self._start_frames, dtype=np.int64),
+            'start_time': np.array(self._start_times, dtype=np.float64),
+            'end_time': np.array(self._end_times, dtype=np.float64)
+        }
+
+def main():
+    from pipeline_propdrift import compute_video_properties
+
+    parser = argparse.ArgumentParser(description="Monitor property drift of a live video source against a training video.")
+    parser.add_argument('--train_video', type=str, required=True, help='Path to the training video')
+    parser.add_argument('--source', type=str, required=True, help='Camera index, stream URL or video path to monitor')
+    parser.add_argument('--frame_step', type=int, default=30, help='Ingest every nth frame of the source')
+    parser.add_argument('--every_n_frames', type=int, default=None, help='Emit drift every this many ingested frames')
+    parser.add_argument('--every_seconds', type=float, default=None, help='Emit drift every this many seconds')
+    parser.add_argument('--num_bins', type=int, default=100, help='Number of quantile bins per property')
+    parser.add_argument('--reset_on_emit', action='store_true', help='Score only the frames since the previous update')
+
+    args = parser.parse_args()
+    if args.every_n_frames is None and args.every_seconds is None:
+        args.every_n_frames = 60
+
+    monitor = OnlineDriftMonitor(compute_video_properties(args.train_video), num_bins=args.num_bins,
+                                 every_n_frames=args.every_n_frames, every_seconds=args.every_seconds,
+                                 callback=lambda drift_info: print(json.dumps(drift_info), flush=True),
+                                 reset_on_emit=args.reset_on_emit)
+
+    cap = cv2.VideoCapture(int(args.source) if args.source.isdigit() else args.source)
+    if not cap.isOpened():
+        print("Error: Could not open video source.")
+        return
+    try:
+        frame_counter = 0
+        while True:
+            if frame_counter % args.frame_step == 0:
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                monitor.update_frame(cv2.resize(frame, (384, 384)))
+            elif not cap.grab():
+                break
+            frame_counter += 1
+    finally:
+        cap.release()
+
+if __name__ == '__main__':
+    main()
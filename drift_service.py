@@ -0,0 +1,191 @@
+import os
+import sys
+import json
+import time
+import argparse
+import socketserver
+from concurrent.futures import ProcessPoolExecutor
+from pipeline_propdrift import PropertyDriftPipeline, add_pipeline_arguments, pipeline_options
+
+class DriftService:
+    """
+    Runs drift comparisons as jobs against one long-lived PropertyDriftPipeline.
+
+    The pipeline's calculators, property cache, loaded baselines and, with several workers, its process pool stay
+    warm between jobs, so a short clip costs only its own decoding and drift calculation. Jobs run one at a time
+    and each result is appended as one JSON line tagged with the job's ID.
+
+    A job is a JSON object with 'test_video' and either 'train_video' or 'train_baseline', plus optional
+    'job_id', 'save_baseline', 'distances', 'window' and 'stride' with the meaning of the matching
+    pipeline_propdrift options.
+    """
+
+    def __init__(self, pipeline, output, baseline_dir=None):
+        """
+        Args:
+            pipeline (PropertyDriftPipeline): The pipeline jobs run on. Its video and baseline attributes are set
+                per job.
+            output: A writable text file the JSON-lines results are appended to.
+            baseline_dir (str): Directory that relative 'train_baseline' and 'save_baseline' names are resolved
+                against, so jobs can refer to baselines by ID.
+        """
+        self.pipeline = pipeline
+        self.output = output
+        self.baseline_dir = baseline_dir
+        self.default_distances = pipeline.distances
+        self.jobs_run = 0
+
+    def _baseline_path(self, name):
+        if name and self.baseline_dir and not os.path.isabs(name):
+            return os.path.join(self.baseline_dir, name)
+        return name
+
+    def run_job(self, job):
+        """
+        Runs one job and appends its result to the output.
+
+        Args:
+            job (dict): The job spec.
+
+        Returns:
+            dict: The result record, with 'job_id', 'status' ('ok' or 'error'), 'seconds' and either 'results'
+            (drift per property, or the drift time series when 'window' is given) or 'error'.
+        """
+        self.jobs_run += 1
+        job_id = job.get('job_id', f"job-{self.jobs_run}") if isinstance(job, dict) else f"job-{self.jobs_run}"
+        start = time.perf_counter()
+        try:
+            if not isinstance(job, dict):
+                raise ValueError("A job must be a JSON object.")
+            if not job.get('test_video') or bool(job.get('train_video')) == bool(job.get('train_baseline')):
+                raise ValueError("A job needs 'test_video' and exactly one of 'train_video' or 'train_baseline'.")
+            pipeline = self.pipeline
+            pipeline.train_video = job.get('train_video')
+            pipeline.test_video = job['test_video']
+            pipeline.train_baseline = self._baseline_path(job.get('train_baseline'))
+            pipeline.save_baseline = self._baseline_path(job.get('save_baseline'))
+            pipeline.distances = job.get('distances', self.default_distances)
+            pipeline.window = job.get('window')
+            pipeline.stride = job.get('stride', 1)
+            if pipeline.window:
+                timeline = pipeline.calculate_temporal_drift()
+                results = {name: values.tolist() for name, values in timeline.items()}
+            else:
+                results = pipeline.calculate_drift()
+            record = {'job_id': job_id, 'status': 'ok', 'results': results}
+        except Exception as e:
+            record = {'job_id': job_id, 'status': 'error', 'error': f"{type(e).__name__}: {e}"}
+        record['seconds'] = time.perf_counter() - start
+
+        if self.pipeline.instrumentation is not None:
+            self.pipeline.instrumentation.flush()
+        self.output.write(json.dumps(record, default=float) + '\n')
+        self.output.flush()
+        return record
+
+    def run_lines(self, lines):
+        """
+        Runs one job per non-empty line of JSON.
+
+        Returns:
+            list: The result records.
+        """
+        records = []
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                job = json.loads(line)
+            except json.JSONDecodeError as e:
+                records.append(self._invalid(e))
+                continue
+            records.append(self.run_job(job))
+        return records
+
+    def _invalid(self, error):
+        self.jobs_run += 1
+        record = {'job_id': f"job-{self.jobs_run}", 'status': 'error', 'error': f"Invalid job JSON: {error}",
+                  'seconds': 0.0}
+        self.output.write(json.dumps(record) + '\n')
+        self.output.flush()
+        return record
+
+    def serve_directory(self, jobs_dir, poll_seconds=1.0, once=False):
+        """
+        Runs the jobs of every .jsonl file dropped into a directory, one job per line, in file name order.
+
+        A processed file is renamed to <name>.done. Writers should create files under another name and rename
+        them to .jsonl when complete, so half-written files are never picked up.
+
+        Args:
+            jobs_dir (str): The directory to watch.
+            poll_seconds (float): Seconds between directory scans.
+            once (bool): If True, process the files present now and return instead of watching.
+        """
+        while True:
+            names = sorted(name for name in os.listdir(jobs_dir) if name.endswith('.jsonl'))
+            for name in names:
+                path = os.path.join(jobs_dir, name)
+                with open(path) as file:
+                    self.run_lines(file)
+                os.replace(path, path + '.done')
+            if once:
+                return
+            if not names:
+                time.sleep(poll_seconds)
+
+    def serve_socket(self, socket_path):
+        """
+        Accepts connections on a Unix socket. Each connection sends jobs as JSON lines and receives each job's
+        result record as a JSON line, in addition to the output file. Connections are served one at a time.
+        """
+        service = self
+
+        class JobHandler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for line in self.rfile:
+                    for record in service.run_lines([line.decode()]):
+                        self.wfile.write((json.dumps(record, default=float) + '\n').encode())
+
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        with socketserver.UnixStreamServer(socket_path, JobHandler) as server:
+            try:
+                server.serve_forever()
+            finally:
+                os.remove(socket_path)
+
+def main():
+    parser = argparse.ArgumentParser(description="Run property drift jobs from a directory, stdin or a Unix socket with warm components.")
+    source_group = parser.add_mutually_exclusive_group(required=True)
+    source_group.add_argument('--jobs_dir', type=str, help='Directory to watch for .jsonl job files')
+    source_group.add_argument('--stdin', action='store_true', help='Read jobs as JSON lines from standard input')
+    source_group.add_argument('--socket', type=str, help='Path of a Unix socket to accept JSON-lines jobs on')
+    parser.add_argument('--output', type=str, default='property_drift_results.jsonl', help='File to append JSON-lines results to')
+    parser.add_argument('--baseline_dir', type=str, default=None, help='Directory that baseline IDs in jobs are resolved against')
+    parser.add_argument('--poll_seconds', type=float, default=1.0, help='Seconds between scans of the jobs directory')
+    parser.add_argument('--once', action='store_true', help='Process the job files present in the jobs directory and exit')
+    add_pipeline_arguments(parser)
+
+    args = parser.parse_args()
+
+    options = pipeline_options(args)
+    executor = ProcessPoolExecutor(max_workers=args.workers) if args.workers > 1 else None
+    pipeline = PropertyDriftPipeline(None, None, executor=executor, **options)
+    try:
+        with open(args.output, 'a') as output:
+            service = DriftService(pipeline, output, baseline_dir=args.baseline_dir)
+            if args.jobs_dir:
+                service.serve_directory(args.jobs_dir, args.poll_seconds, args.once)
+            elif args.stdin:
+                service.run_lines(sys.stdin)
+            else:
+                service.serve_socket(args.socket)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+if __name__ == '__main__':
+    main()
@@ -1,17 +1,81 @@
+import os
+import time
 import cv2
 import numpy as np
 
+INTERPOLATIONS = {
+    'linear': cv2.INTER_LINEAR,
+    'area': cv2.INTER_AREA,
+    'nearest': cv2.INTER_NEAREST,
+}
+
+class FrameRingBuffer:
+    """
+    Preallocated frame slots that VideoFrameExtractor decodes and resizes into, so the steady-state extraction loop
+    allocates no frame-sized arrays.
+
+    Frames yielded from a ring buffer are views of its slots and are overwritten num_slots frames later; consumers
+    must finish with (or copy) a frame before then.
+    """
+
+    def __init__(self, num_slots=2):
+        """
+        Args:
+            num_slots (int): Number of resized frames that can be alive at the same time.
+        """
+        self.num_slots = num_slots
+        self.slots = None
+        self.decode_buffer = None
+        self._next_slot = 0
+
+    def prepare(self, native_size, frame_size=None):
+        """
+        Allocates the decode buffer and the slots, reusing them when the sizes have not changed.
+
+        Args:
+            native_size (tuple): (width, height) of the decoded frames.
+            frame_size (tuple): (width, height) of the resized frames, or None to keep the native size.
+        """
+        width, height = native_size
+        if self.decode_buffer is None or self.decode_buffer.shape != (height, width, 3):
+            self.decode_buffer = np.empty((height, width, 3), dtype=np.uint8)
+        slot_width, slot_height = frame_size or native_size
+        if self.slots is None or self.slots.shape[1:] != (slot_height, slot_width, 3):
+            self.slots = np.empty((self.num_slots, slot_height, slot_width, 3), dtype=np.uint8)
+            self._next_slot = 0
+
+    def next_slot(self):
+        slot = self.slots[self._next_slot]
+        self._next_slot = (self._next_slot + 1) % self.num_slots
+        return slot
+
 class VideoFrameExtractor:
-    def __init__(self, video_path, target_fpm=60):
+    def __init__(self, video_path, target_fpm=60, instrumentation=None, change_threshold=None, max_gap=None,
+                 frame_size=(384, 384), interpolation=cv2.INTER_LINEAR):
         """
         Initializes the VideoFrameExtractor class with the path to a video file and a target frame rate per minute.
 
         Parameters:
-        video_path (str): The path to the video file.
+        video_path (str): The path to the video file, or a seekable binary stream such as a
+            video_downloader.DownloadStream, read through OpenCV's FFmpeg backend.
         target_fpm (int): The desired number of frames per minute (default is 60 FPM).
+        instrumentation (Instrumentation): Optional collector of decode and resize timings and frame counters.
+        change_threshold (float): If set, skip sampled frames whose 16x16 grayscale thumbnail differs from that of
+            the last kept frame by less than this mean absolute difference (in 0-255 intensity units).
+        max_gap (int): With change_threshold, the maximum number of consecutive sampled frames that may be skipped
+            before one is kept regardless of change.
+        frame_size (tuple): (width, height) frames are resized to, or None to keep the native resolution.
+        interpolation (int): OpenCV interpolation flag used for resizing. cv2.INTER_AREA averages source pixels,
+            which avoids aliasing when downscaling large frames to a small frame_size.
         """
         self.video_path = video_path
         self.target_fpm = target_fpm
+        self.instrumentation = instrumentation
+        self.change_threshold = change_threshold
+        self.max_gap = max_gap
+        self.frame_size = tuple(frame_size) if frame_size is not None else None
+        self.interpolation = interpolation
+        self.native_size = None  # (width, height) of the decoded video, known once iteration starts
 
     def extract_frames(self):
         """
@@ -20,47 +84,182 @@ class VideoFrameExtractor:
         Returns:
         list: A list of numpy arrays representing the frames of the video.
         """
+        return list(self.iter_frames())
+
+    def iter_frames(self, with_timestamps=False, seek=False, ring_buffer=None, with_frame_indices=False):
+        """
+        Lazily yields the sampled frames of the video, holding at most one decoded frame in memory.
+
+        Frames between samples are skipped with cap.grab(), which advances the decoder without converting
+        the frame to a BGR image. With seek=True the capture jumps straight to each sampled frame instead,
+        letting the backend seek to the nearest keyframe rather than decoding every frame in between; this
+        is faster when the sampling interval is much longer than the keyframe interval. If change_threshold is
+        set, sampled frames that barely differ from the last kept frame are dropped before resizing. With a
+        ring_buffer, frames are decoded with cap.read(image=...) and resized with cv2.resize(dst=...) into its
+        preallocated buffers, and the yielded frames are views of its slots.
+
+        Parameters:
+        with_timestamps (bool): If True, yield (timestamp_seconds, frame) tuples instead of frames.
+        seek (bool): If True, seek to each sampled frame instead of grabbing every frame in between.
+        ring_buffer (FrameRingBuffer): Optional preallocated buffers to decode and resize into.
+        with_frame_indices (bool): If True, yield (frame_index, timestamp_seconds, frame) tuples, where frame_index
+            is the position of the frame in the video.
+
+        Yields:
+        numpy.ndarray: A frame of shape (1, 3, height, width) at frame_size, or a tuple as described above.
+        """
         # Create a VideoCapture object
-        cap = cv2.VideoCapture(self.video_path)
+        if isinstance(self.video_path, (str, os.PathLike)):
+            cap = cv2.VideoCapture(self.video_path)
+        else:
+            cap = cv2.VideoCapture(self.video_path, cv2.CAP_FFMPEG, [])
 
         # Check if video opened successfully
         if not cap.isOpened():
             print("Error: Could not open video.")
-            return []
+            return
 
-        # Get the video's FPS (frames per second) and duration
-        fps = cap.get(cv2.CAP_PROP_FPS)
-        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        duration_seconds = total_frames / fps  # Total duration in seconds
+        try:
+            fps = cap.get(cv2.CAP_PROP_FPS)
+            total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            self.native_size = (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+            frame_interval = self._frame_interval(fps, total_frames)
+
+            read, grab, preprocess = cap.read, cap.grab, self._preprocess
+            if ring_buffer is not None:
+                ring_buffer.prepare(self.native_size, self.frame_size)
+                read = lambda: cap.read(ring_buffer.decode_buffer)
+                preprocess = lambda frame: self._preprocess_into(frame, ring_buffer.next_slot())
+
+            # Swap in timed wrappers only when instrumented, so the uninstrumented loop is unchanged
+            if self.instrumentation is not None:
+                read, grab, preprocess = self._instrumented(read, grab, preprocess, total_frames)
+
+            sampled = self._iter_sampled(cap, read, grab, frame_interval, total_frames, seek)
+            if self.change_threshold is not None:
+                sampled = self._iter_changed(sampled)
+
+            for frame_index, frame in sampled:
+                frame_processed = preprocess(frame)
+                if with_frame_indices:
+                    yield frame_index, (frame_index / fps if fps > 0 else 0.0), frame_processed
+                elif with_timestamps:
+                    yield (frame_index / fps if fps > 0 else 0.0), frame_processed
+                else:
+                    yield frame_processed
+        finally:
+            # Release the VideoCapture object, also when the consumer stops iterating early
+            cap.release()
+
+    def _frame_interval(self, fps, total_frames):
+        """
+        Calculates the frame interval that yields the target number of frames per minute.
+        """
+        duration_seconds = total_frames / fps if fps > 0 else 0.0  # Total duration in seconds
         duration_minutes = duration_seconds / 60.0  # Convert duration to minutes
 
-        # Calculate the frame interval based on target FPM
         frames_to_process = int(self.target_fpm * duration_minutes)
-        frame_interval = max(int(total_frames / frames_to_process), 1)
+        if frames_to_process <= 0:
+            # Video shorter than one sampling period: keep only the first frame
+            return max(total_frames, 1)
+        return max(int(total_frames / frames_to_process), 1)
 
-        # Create a list to hold the images
-        images_list = []
+    def _iter_sampled(self, cap, read, grab, frame_interval, total_frames, seek):
+        if seek and frame_interval > 1 and total_frames > 0:
+            for frame_index in range(0, total_frames, frame_interval):
+                if not cap.set(cv2.CAP_PROP_POS_FRAMES, frame_index):
+                    self._count_dropped(total_frames, frame_index)
+                    break
+                ret, frame = read()
+                if not ret:
+                    self._count_dropped(total_frames, frame_index)
+                    break
+                yield frame_index, frame
+            return
 
-        # Read frames from the video
         frame_counter = 0
         while True:
-            ret, frame = cap.read()
-            if not ret:
-                break  # Break the loop if there are no frames left
-
-            # Process every nth frame (based on frame_interval)
+            # Only decode every nth frame (based on frame_interval) into an image
             if frame_counter % frame_interval == 0:
-                frame_processed = cv2.resize(frame, (384, 384))  # Resize the frame
-                frame_processed = np.transpose(frame_processed, (2, 0, 1))  # Change channel order
-                frame_processed = np.expand_dims(frame_processed, axis=0)  # Add batch dimension
-                images_list.append(frame_processed)
-
+                ret, frame = read()
+                if not ret:
+                    break  # Break the loop if there are no frames left
+                yield frame_counter, frame
+            elif not grab():
+                break
             frame_counter += 1
 
-        # Release the VideoCapture object
-        cap.release()
+        self._count_dropped(total_frames, frame_counter)
+
+    def _count_dropped(self, total_frames, frames_reached):
+        if self.instrumentation is not None and total_frames > frames_reached:
+            # Frames the container announced but the decoder could not deliver
+            self.instrumentation.increment('frames_dropped', total_frames - frames_reached)
+
+    def _signature(self, frame):
+        # A 16x16 grayscale thumbnail; INTER_AREA averages the whole frame, so noise barely moves it
+        thumbnail = cv2.resize(frame, (16, 16), interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(thumbnail, cv2.COLOR_BGR2GRAY).astype(np.float32)
+
+    def _iter_changed(self, sampled):
+        last_signature = None
+        gap = 0
+        for frame_index, frame in sampled:
+            signature = self._signature(frame)
+            if last_signature is not None and (self.max_gap is None or gap < self.max_gap):
+                if np.mean(np.abs(signature - last_signature)) < self.change_threshold:
+                    gap += 1
+                    if self.instrumentation is not None:
+                        self.instrumentation.increment('frames_unchanged')
+                    continue
+            last_signature = signature
+            gap = 0
+            yield frame_index, frame
+
+    def _instrumented(self, read_frame, grab_frame, preprocess_frame, total_frames):
+        instrumentation = self.instrumentation
+        try:
+            instrumentation.increment('bytes_read', os.path.getsize(self.video_path))
+        except (OSError, TypeError):
+            pass  # Streams and camera devices have no file size
+        instrumentation.increment('frames_total', total_frames)
+
+        def read():
+            start = time.perf_counter()
+            ret, frame = read_frame()
+            instrumentation.record_time('decode', time.perf_counter() - start)
+            if ret:
+                instrumentation.increment('frames_sampled')
+            return ret, frame
+
+        def grab():
+            start = time.perf_counter()
+            ret = grab_frame()
+            instrumentation.record_time('grab', time.perf_counter() - start)
+            if ret:
+                instrumentation.increment('frames_skipped')
+            return ret
+
+        def preprocess(frame):
+            start = time.perf_counter()
+            frame_processed = preprocess_frame(frame)
+            instrumentation.record_time('resize', time.perf_counter() - start)
+            return frame_processed
+
+        return read, grab, preprocess
+
+    def _preprocess(self, frame):
+        if self.frame_size is not None:
+            frame = cv2.resize(frame, self.frame_size, interpolation=self.interpolation)  # Resize the frame
+        frame_processed = np.transpose(frame, (2, 0, 1))  # Change channel order
+        return np.expand_dims(frame_processed, axis=0)  # Add batch dimension
 
-        return images_list
+    def _preprocess_into(self, frame, slot):
+        if self.frame_size is not None:
+            cv2.resize(frame, self.frame_size, dst=slot, interpolation=self.interpolation)
+        else:
+            np.copyto(slot, frame)
+        return slot.transpose(2, 0, 1)[np.newaxis]  # Views only, no copy
 
 # Example usage:
 if __name__ == '__main__':
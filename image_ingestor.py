@@ -0,0 +1,193 @@
+import os
+import tarfile
+import argparse
+import threading
+import numpy as np
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from image_processor import ImageProcessor, PropertyScratch, REDUCED_READ_FLAGS
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp', '.tif', '.tiff')
+TAR_EXTENSIONS = ('.tar', '.tar.gz', '.tgz')
+
+def iter_tar_images(tar_path, prefix=None):
+    """
+    Streams the images of a tar shard in archive order without extracting it.
+
+    Yields:
+        tuple: The name '<prefix>/<member name>' and the encoded bytes of each image.
+    """
+    prefix = prefix if prefix is not None else os.path.basename(tar_path)
+    with tarfile.open(tar_path, 'r|*') as archive:
+        for member in archive:
+            if member.isfile() and member.name.lower().endswith(IMAGE_EXTENSIONS):
+                yield f"{prefix}/{member.name}", archive.extractfile(member).read()
+
+def iter_image_sources(source):
+    """
+    Expands an image source into images to decode.
+
+    Args:
+        source: An image file, a tar shard, or a directory tree of images and tar shards, walked in sorted order.
+
+    Yields:
+        tuple: The name of each image, relative to a directory source, and either its path or its encoded bytes.
+    """
+    if source.lower().endswith(TAR_EXTENSIONS):
+        yield from iter_tar_images(source)
+        return
+    if not os.path.isdir(source):
+        yield source, source
+        return
+    for dir_path, dir_names, file_names in os.walk(source):
+        dir_names.sort()
+        for file_name in sorted(file_names):
+            path = os.path.join(dir_path, file_name)
+            name = os.path.relpath(path, source)
+            if file_name.lower().endswith(IMAGE_EXTENSIONS):
+                yield name, path
+            elif file_name.lower().endswith(TAR_EXTENSIONS):
+                yield from iter_tar_images(path, name)
+
+def load_properties(output_dir):
+    """
+    Loads the chunks written by ImageIngestor.ingest into one array per property, plus the image 'names'.
+    """
+    chunk_files = sorted(name for name in os.listdir(output_dir) if name.startswith('properties_') and name.endswith('.npz'))
+    chunks = []
+    for name in chunk_files:
+        # Read every array out of the archive, so its file is closed before the next one is opened
+        with np.load(os.path.join(output_dir, name)) as chunk:
+            chunks.append({key: chunk[key] for key in chunk.files})
+    if not chunks:
+        return {}
+    return {key: np.concatenate([chunk[key] for chunk in chunks]) for key in chunks[0]}
+
+class ImageIngestor:
+    """
+    Computes the properties of large collections of still images with bounded memory.
+
+    Images are decoded and measured on a thread pool; OpenCV decoding and the NumPy reductions of the fused
+    property kernel release the GIL, so threads scale without copying images between processes. Tar shards are
+    read sequentially in the calling thread and only their bytes are handed to the pool. At most a few images
+    per thread are in flight, and results are emitted in chunks keyed by file name.
+    """
+
+    def __init__(self, threads=8, reduce=1, chunk_size=10000):
+        """
+        Args:
+            threads (int): Number of decoding and measuring threads.
+            reduce (int): Decode images at 1/reduce of their stored size (1, 2, 4 or 8) with the IMREAD_REDUCED_*
+                flags, which lets JPEG decoding skip most of its work. Areas are scaled back by reduce ** 2, so
+                they match the stored size up to rounding; the pixel statistics are those of the smaller image.
+            chunk_size (int): Number of images per emitted chunk.
+        """
+        if reduce not in REDUCED_READ_FLAGS:
+            raise ValueError(f"Unsupported reduction: {reduce}. Use one of {sorted(REDUCED_READ_FLAGS)}.")
+        self.threads = threads
+        self.reduce = reduce
+        self.chunk_size = chunk_size
+        self.processor = ImageProcessor()
+        self.failed = []
+        self._local = threading.local()
+
+    def _measure(self, name, data):
+        if isinstance(data, str):
+            image = self.processor.load(data, self.reduce)
+        else:
+            image = self.processor.decode(data, self.reduce)
+        if image is None:
+            return name, None
+        scratch = getattr(self._local, 'scratch', None)
+        if scratch is None:
+            scratch = self._local.scratch = PropertyScratch()
+        prop_values = self.processor.calculate_all_properties(image, scratch)
+        prop_values['Area'] *= self.reduce ** 2
+        return name, prop_values
+
+    def iter_chunks(self, sources):
+        """
+        Measures every image of the given sources.
+
+        Args:
+            sources (list): Image files, tar shards or directories (see iter_image_sources).
+
+        Yields:
+            dict: For each chunk, 'names' (the image names) and one float64 array per property, in source order.
+            Images that fail to decode are skipped and their names collected in self.failed.
+        """
+        names, columns = [], {}
+
+        def add(result):
+            name, prop_values = result
+            if prop_values is None:
+                self.failed.append(name)
+                return None
+            names.append(name)
+            for prop_name, value in prop_values.items():
+                columns.setdefault(prop_name, []).append(value)
+            if len(names) < self.chunk_size:
+                return None
+            return flush()
+
+        def flush():
+            chunk = {'names': np.array(names)}
+            chunk.update({prop_name: np.array(values, dtype=np.float64) for prop_name, values in columns.items()})
+            names.clear()
+            columns.clear()
+            return chunk
+
+        pending = deque()
+        with ThreadPoolExecutor(max_workers=self.threads) as executor:
+            for source in sources:
+                for name, data in iter_image_sources(source):
+                    pending.append(executor.submit(self._measure, name, data))
+                    # Bound the images held in memory, e.g. decoded tar members waiting for a thread
+                    if len(pending) >= self.threads * 4:
+                        chunk = add(pending.popleft().result())
+                        if chunk is not None:
+                            yield chunk
+            while pending:
+                chunk = add(pending.popleft().result())
+                if chunk is not None:
+                    yield chunk
+        if names:
+            yield flush()
+
+    def ingest(self, sources, output_dir):
+        """
+        Measures every image of the given sources and writes the results to numbered .npz chunk files.
+
+        Returns:
+            dict: The number of images measured, images that failed to decode and chunk files written.
+        """
+        if not os.path.exists(output_dir):
+            os.makedirs(output_dir)
+        num_images = 0
+        num_chunks = 0
+        for chunk in self.iter_chunks(sources):
+            path = os.path.join(output_dir, f"properties_{num_chunks:05d}.npz")
+            tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+            np.savez(tmp_path, **chunk)
+            os.replace(tmp_path, path)
+            num_images += len(chunk['names'])
+            num_chunks += 1
+        return {'images': num_images, 'failed': len(self.failed), 'chunks': num_chunks}
+
+def main():
+    parser = argparse.ArgumentParser(description="Compute frame properties of image directories and tar shards in parallel.")
+    parser.add_argument('--source', type=str, nargs='+', required=True, help='Image files, tar shards or directories of images and tar shards')
+    parser.add_argument('--output_dir', type=str, required=True, help='Directory to write properties_NNNNN.npz chunks to')
+    parser.add_argument('--threads', type=int, default=8, help='Number of decoding and measuring threads')
+    parser.add_argument('--reduce', type=int, default=1, choices=sorted(REDUCED_READ_FLAGS), help='Decode images at 1/reduce of their stored size')
+    parser.add_argument('--chunk_size', type=int, default=10000, help='Number of images per output chunk')
+
+    args = parser.parse_args()
+    ingestor = ImageIngestor(args.threads, args.reduce, args.chunk_size)
+    summary = ingestor.ingest(args.source, args.output_dir)
+    print(f"Measured {summary['images']} images into {summary['chunks']} chunks in {args.output_dir}")
+    for name in ingestor.failed:
+        print(f"Failed to decode image: {name}")
+
+if __name__ == '__main__':
+    main()
@@ -1,29 +1,82 @@
 import cv2
 import numpy as np
 
+# imread flags that decode at 1/2, 1/4 or 1/8 of the stored size; JPEG decoders skip the discarded DCT detail
+REDUCED_READ_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+class PropertyScratch:
+    """
+    Reusable float32 work buffers for ImageProcessor.calculate_all_properties, so computing the properties of a
+    stream of equally sized frames allocates no frame-sized arrays. A scratch must not be shared between threads.
+    """
+
+    def __init__(self):
+        self.image_u8 = None
+        self.image_float = None
+        self.gray = None
+        self.intensity_sum = None
+        self.divisor = None
+
+    def prepare(self, shape):
+        """
+        Allocates the buffers for images of the given (height, width, channels) shape, unless they already fit.
+        """
+        if self.image_float is None or self.image_float.shape != shape:
+            self.image_u8 = np.empty(shape, dtype=np.uint8)
+            self.image_float = np.empty(shape, dtype=np.float32)
+            self.gray = np.empty(shape[:2], dtype=np.float32)
+            self.intensity_sum = np.empty(shape[:2], dtype=np.float32)
+            self.divisor = np.empty(shape, dtype=np.float32)
+
+# Weights of cv2.transform that sum the three channels of each pixel
+CHANNEL_SUM_WEIGHTS = np.ones((1, 3), dtype=np.float32)
+
 class ImageProcessor:
     """
     A class for processing images and calculating various properties such as aspect ratio, area, brightness,
     luminance brightness, RMS contrast, and color channel relative intensities.
     """
 
-    def load(self, image_path: str):
+    def load(self, image_path: str, reduce: int = 1):
         """
         Reads an image from the specified file path using OpenCV.
 
         Args:
             image_path (str): Path to the image file.
+            reduce (int): Decode at 1/reduce of the stored size; 1, 2, 4 or 8.
 
         Returns:
             numpy.ndarray: Loaded image as a NumPy array.
         """
         try:
-            img = cv2.imread(image_path, cv2.IMREAD_COLOR)
+            img = cv2.imread(image_path, REDUCED_READ_FLAGS[reduce])
             return img
         except Exception as e:
             print(f"Error reading image: {e}")
             return None
 
+    def decode(self, buffer, reduce: int = 1):
+        """
+        Decodes an encoded image, such as the bytes of a JPEG or PNG file, using OpenCV.
+
+        Args:
+            buffer: The encoded image bytes.
+            reduce (int): Decode at 1/reduce of the stored size; 1, 2, 4 or 8.
+
+        Returns:
+            numpy.ndarray: Decoded image as a NumPy array, or None if it could not be decoded.
+        """
+        try:
+            return cv2.imdecode(np.frombuffer(buffer, dtype=np.uint8), REDUCED_READ_FLAGS[reduce])
+        except Exception as e:
+            print(f"Error decoding image: {e}")
+            return None
+
     def calculate_aspect_ratio(self, image):
         """
         Calculates the aspect ratio of an image.
@@ -179,6 +232,70 @@ class ImageProcessor:
         normalized_blue = blue_channel / np.maximum(intensity_sum, 1.0)
         return np.mean(normalized_blue)
 
+    def calculate_all_properties(self, image, scratch=None):
+        """
+        Calculates all image properties in a single fused pass.
+
+        The frame is cast to float32 once and the gray (Y) plane and the per-pixel channel sum are computed once
+        and shared by every property, instead of each calculate_* method repeating the conversion. Results match
+        the individual calculate_* methods to within a relative tolerance of 1e-5: BT.601 luma from BGR2GRAY
+        equals the Y plane of BGR2YUV up to float32 rounding, and the remaining properties are computed from
+        the same values.
+
+        Args:
+            image: A loaded image.
+            scratch (PropertyScratch): Optional reusable work buffers; without one, buffers are allocated per call.
+                A scratch must not be shared between threads.
+
+        Returns:
+            dict: Property names mapped to their values.
+        """
+        if image is None:
+            raise ValueError("Error loading image. Check the image path.")
+        if len(image.shape) <= 2:
+            raise ValueError("Image must have color channels (e.g., RGB)")
+
+        if scratch is None:
+            scratch = PropertyScratch()
+        return self._fused_properties(image, scratch)
+
+    def _fused_properties(self, image, scratch):
+        # image may be any (H, W, 3) view, e.g. a channels-last view of a planar (3, H, W) frame
+        height, width, _ = image.shape
+        scratch.prepare(image.shape)
+        image_float = scratch.image_float
+        if not image.flags.c_contiguous and image.dtype == np.uint8 and image.shape[2] == 3:
+            # Interleaving the planes with cv2.merge is several times faster than a strided copy
+            image = cv2.merge([image[:, :, 0], image[:, :, 1], image[:, :, 2]], dst=scratch.image_u8)
+        np.copyto(image_float, image)
+        gray = cv2.cvtColor(image_float, cv2.COLOR_BGR2GRAY, dst=scratch.gray)
+        intensity_sum = cv2.transform(image_float, CHANNEL_SUM_WEIGHTS, dst=scratch.intensity_sum)
+
+        # Channel sums of integer pixels are exact in float32, so the float64 total is the exact pixel sum
+        average_brightness = intensity_sum.sum(dtype=np.float64) / image.size
+        np.maximum(intensity_sum, 1.0, out=intensity_sum)
+
+        luminance_brightness = gray.mean(dtype=np.float64)
+        gray -= np.float32(luminance_brightness)
+        rms_contrast = np.sqrt(np.square(gray, out=gray).mean(dtype=np.float64))
+
+        # calculate_mean_*_relative_intensity swap channels with RGB2BGR before indexing, so "red" reads
+        # channel 0 and "blue" reads channel 2 of the input
+        cv2.merge([intensity_sum, intensity_sum, intensity_sum], dst=scratch.divisor)
+        cv2.divide(image_float, scratch.divisor, dst=image_float)
+        relative_intensities = cv2.mean(image_float)
+
+        return {
+            'Aspect Ratio': width / height,
+            'Area': width * height,
+            'Average Brightness': average_brightness,
+            'Luminance Brightness': luminance_brightness,
+            'RMS Contrast': rms_contrast,
+            'Mean Red Relative Intensity': relative_intensities[0],
+            'Mean Green Relative Intensity': relative_intensities[1],
+            'Mean Blue Relative Intensity': relative_intensities[2]
+        }
+
 if __name__ == '__main__':
     processor = ImageProcessor()
     image_path = 'path_to_your_image.jpg'  # Replace with your image path
@@ -0,0 +1,168 @@
+import os
+import re
+import json
+import time
+import threading
+from contextlib import contextmanager
+
+class Instrumentation:
+    """
+    Collects stage timings and counters from the drift pipeline and publishes them to pluggable sinks.
+
+    Components take an optional instrumentation argument and skip all timing when it is None, so disabled
+    instrumentation costs one attribute check per frame.
+    """
+
+    def __init__(self, sinks=None):
+        """
+        Args:
+            sinks (list): Objects with an emit(snapshot) method, such as JsonLogSink, PrometheusTextSink or
+                CallbackSink.
+        """
+        self.sinks = list(sinks or [])
+        self.timers = {}
+        self.counters = {}
+        self._lock = threading.Lock()
+
+    def record_time(self, name, seconds):
+        """
+        Adds one timed call of a stage.
+
+        Args:
+            name (str): The stage name, e.g. 'decode' or 'property.RMS Contrast'.
+            seconds (float): The duration of the call.
+        """
+        with self._lock:
+            timer = self.timers.get(name)
+            if timer is None:
+                self.timers[name] = {'count': 1, 'total_seconds': seconds, 'max_seconds': seconds}
+            else:
+                timer['count'] += 1
+                timer['total_seconds'] += seconds
+                if seconds > timer['max_seconds']:
+                    timer['max_seconds'] = seconds
+
+    def increment(self, name, value=1):
+        """
+        Adds to a counter such as 'frames_skipped' or 'bytes_read'.
+        """
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    @contextmanager
+    def timer(self, name):
+        """
+        Times the enclosed block as one call of a stage.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_time(name, time.perf_counter() - start)
+
+    def snapshot(self):
+        """
+        Returns a copy of the collected timings and counters.
+        """
+        with self._lock:
+            return {
+                'timestamp': time.time(),
+                'timers': {name: dict(timer) for name, timer in self.timers.items()},
+                'counters': dict(self.counters)
+            }
+
+    def merge(self, snapshot):
+        """
+        Adds the timings and counters of a snapshot, e.g. one taken by another process, to this collector.
+        """
+        with self._lock:
+            for name, other in snapshot['timers'].items():
+                timer = self.timers.get(name)
+                if timer is None:
+                    self.timers[name] = dict(other)
+                else:
+                    timer['count'] += other['count']
+                    timer['total_seconds'] += other['total_seconds']
+                    timer['max_seconds'] = max(timer['max_seconds'], other['max_seconds'])
+            for name, value in snapshot['counters'].items():
+                self.counters[name] = self.counters.get(name, 0) + value
+
+    def reset(self):
+        with self._lock:
+            self.timers.clear()
+            self.counters.clear()
+
+    def flush(self):
+        """
+        Sends a snapshot to every sink.
+
+        Returns:
+            dict: The snapshot.
+        """
+        snapshot = self.snapshot()
+        for sink in self.sinks:
+            sink.emit(snapshot)
+        return snapshot
+
+class JsonLogSink:
+    """
+    Appends each snapshot as one JSON line to a log file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def emit(self, snapshot):
+        with open(self.path, 'a') as file:
+            file.write(json.dumps(snapshot) + '\n')
+
+class PrometheusTextSink:
+    """
+    Writes the latest snapshot in the Prometheus text exposition format, e.g. for the node exporter's textfile
+    collector. The file is replaced atomically on every emit.
+    """
+
+    def __init__(self, path, prefix='propdrift'):
+        self.path = path
+        self.prefix = prefix
+
+    def _metric_name(self, name):
+        return f"{self.prefix}_{re.sub(r'[^a-zA-Z0-9_]+', '_', name).strip('_').lower()}"
+
+    def emit(self, snapshot):
+        lines = []
+        for name, timer in sorted(snapshot['timers'].items()):
+            metric = self._metric_name(name) + '_seconds'
+            lines.append(f"# TYPE {metric} summary")
+            lines.append(f"{metric}_count {timer['count']}")
+            lines.append(f"{metric}_sum {timer['total_seconds']:.9f}")
+            lines.append(f"# TYPE {metric}_max gauge")
+            lines.append(f"{metric}_max {timer['max_seconds']:.9f}")
+        for name, value in sorted(snapshot['counters'].items()):
+            metric = self._metric_name(name) + '_total'
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric} {value}")
+
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as file:
+            file.write('\n'.join(lines) + '\n')
+        os.replace(tmp_path, self.path)
+
+class CallbackSink:
+    """
+    Passes each snapshot to a function.
+    """
+
+    def __init__(self, callback):
+        self.callback = callback
+
+    def emit(self, snapshot):
+        self.callback(snapshot)
+
+# Example usage:
+if __name__ == '__main__':
+    instrumentation = Instrumentation(sinks=[CallbackSink(print)])
+    with instrumentation.timer('example'):
+        time.sleep(0.01)
+    instrumentation.increment('frames_skipped', 3)
+    instrumentation.flush()
@@ -0,0 +1,133 @@
+import json
+import argparse
+import cv2
+import numpy as np
+from frames_extractor import VideoFrameExtractor, INTERPOLATIONS
+from image_processor import ImageProcessor, PropertyScratch
+from property_drift_calculator import DriftCalculator
+from videonoiseadder import NoiseEngine, NOISE_TYPES, parse_noise_config
+
+class NoiseDriftSweep:
+    """
+    Measures how property drift responds to noise, without writing noisy videos to disk.
+
+    Each frame sampled by VideoFrameExtractor is decoded once at its native resolution. For every noise
+    configuration a NoiseEngine adds noise to a copy of it, which is then resized to frame_size and measured with
+    the fused property kernel, as if the noisy video had been written by VideoNoiseAdder and read back by the
+    pipeline. Every sampled frame is noised, which corresponds to VideoNoiseAdder with frames_per_minute of at
+    least the frame rate times 60, and codec losses of the encode/decode round trip are not modelled.
+    """
+
+    def __init__(self, noise_configs, target_fpm=60, frame_size=(384, 384), interpolation=cv2.INTER_LINEAR,
+                 seed=None):
+        """
+        Args:
+            noise_configs (list): Dictionaries of noise types and intensities, one per point of the curve.
+            target_fpm (int): Frames per minute sampled from the video.
+            frame_size (tuple): (width, height) noisy frames are resized to before their properties are computed.
+            interpolation (int): OpenCV interpolation flag used for resizing.
+            seed (int): Root seed; each configuration draws from its own child of np.random.SeedSequence(seed).
+        """
+        self.noise_configs = [dict(noise_types) for noise_types in noise_configs]
+        self.target_fpm = target_fpm
+        self.frame_size = tuple(frame_size)
+        self.interpolation = interpolation
+        self.seed = seed
+        self.processor = ImageProcessor()
+        self.drift_calculator = DriftCalculator()
+
+    def measure(self, video_path):
+        """
+        Computes the properties of the clean sampled frames and of their noisy copies in one pass over the video.
+
+        Returns:
+            tuple: The clean properties and a list with the properties of each noise configuration, all as
+            dictionaries mapping property names to arrays of per-frame values.
+        """
+        seeds = np.random.SeedSequence(self.seed).spawn(len(self.noise_configs))
+        engines = [NoiseEngine(noise_types, seed) for noise_types, seed in zip(self.noise_configs, seeds)]
+        columns = [{prop_name: [] for prop_name in self.drift_calculator.properties}
+                   for _ in range(len(engines) + 1)]
+        scratch = PropertyScratch()
+        resized = np.empty((self.frame_size[1], self.frame_size[0], 3), dtype=np.uint8)
+        noisy = None
+
+        # The extractor only samples and decodes; resizing happens here, after the noise
+        extractor = VideoFrameExtractor(video_path, target_fpm=self.target_fpm, frame_size=None)
+        for frame in extractor.iter_frames():
+            frame = frame[0].transpose(1, 2, 0)
+            if noisy is None:
+                noisy = np.empty_like(frame)
+            for engine, engine_columns in zip([None] + engines, columns):
+                source = frame if engine is None else engine.apply(frame, out=noisy)
+                cv2.resize(source, self.frame_size, dst=resized, interpolation=self.interpolation)
+                prop_values = self.processor.calculate_all_properties(resized, scratch)
+                for prop_name, values in engine_columns.items():
+                    values.append(prop_values[prop_name])
+
+        clean_props, *noisy_props = [{prop_name: np.array(values, dtype=np.float64)
+                                      for prop_name, values in engine_columns.items()}
+                                     for engine_columns in columns]
+        if not len(clean_props['Area']):
+            print(f"No frames extracted from {video_path}. Check if the video path is correct and the file is accessible.")
+        return clean_props, noisy_props
+
+    def calculate_curve(self, video_path, train_props=None, distances=False):
+        """
+        Calculates the drift of every noise configuration against a training reference.
+
+        Args:
+            video_path (str): The source video the noise is added to.
+            train_props: Training properties in any form accepted by DriftCalculator.get_property_values, e.g.
+                a DriftBaseline. Defaults to the clean frames of the source video itself.
+            distances (bool): Also report Wasserstein, PSI and Jensen-Shannon distances.
+
+        Returns:
+            list: One entry per noise configuration, with its 'noise' intensities and the 'drift' results of
+            DriftCalculator.calculate_property_drift.
+        """
+        clean_props, noisy_props = self.measure(video_path)
+        if train_props is None:
+            train_props = clean_props
+        return [{'noise': noise_types,
+                 'drift': self.drift_calculator.calculate_property_drift(test_props=props, train_props=train_props,
+                                                                         distances=distances)}
+                for noise_types, props in zip(self.noise_configs, noisy_props)]
+
+def main():
+    parser = argparse.ArgumentParser(description="Calculate a drift-vs-noise-intensity curve in one pass over a video, without re-encoding.")
+    parser.add_argument('--video', type=str, required=True, help='Path to the source video to add noise to')
+    train_group = parser.add_mutually_exclusive_group()
+    train_group.add_argument('--train_video', type=str, default=None, help='Training video to compare against (default: the clean source video)')
+    train_group.add_argument('--train_baseline', type=str, default=None, help='Saved training baseline to compare against')
+    noise_group = parser.add_mutually_exclusive_group(required=True)
+    noise_group.add_argument('--sweep', type=parse_noise_config, nargs='+', metavar='CONFIG', help="Noise configurations such as 'gaussian=0.01,poisson=1.0'")
+    noise_group.add_argument('--noise_type', type=str, choices=NOISE_TYPES, help='Sweep a single noise type over --intensities')
+    parser.add_argument('--intensities', type=float, nargs='+', default=None, help='Intensities of --noise_type')
+    parser.add_argument('--target_fpm', type=int, default=60, help='Frames per minute sampled from the video')
+    parser.add_argument('--frame_size', type=int, nargs=2, default=(384, 384), metavar=('WIDTH', 'HEIGHT'), help='Size noisy frames are resized to before computing properties')
+    parser.add_argument('--interpolation', type=str, default='linear', choices=sorted(INTERPOLATIONS), help='Interpolation used for resizing frames')
+    parser.add_argument('--seed', type=int, default=None, help='Seed of the noise generators, for reproducible curves')
+    parser.add_argument('--distances', action='store_true', help='Also report Wasserstein, PSI and Jensen-Shannon distances')
+    parser.add_argument('--output', type=str, default='noise_drift_curve.json', help='Path of the JSON output file')
+
+    args = parser.parse_args()
+    if args.noise_type and not args.intensities:
+        parser.error("--noise_type requires --intensities.")
+    noise_configs = args.sweep or [{args.noise_type: intensity} for intensity in args.intensities]
+
+    sweep = NoiseDriftSweep(noise_configs, args.target_fpm, args.frame_size, INTERPOLATIONS[args.interpolation], args.seed)
+    train_props = None
+    if args.train_baseline:
+        train_props = sweep.drift_calculator.load_baseline(args.train_baseline)
+    elif args.train_video:
+        train_props, _ = NoiseDriftSweep([], args.target_fpm, args.frame_size,
+                                         INTERPOLATIONS[args.interpolation]).measure(args.train_video)
+
+    curve = sweep.calculate_curve(args.video, train_props, args.distances)
+    with open(args.output, 'w') as file:
+        json.dump(curve, file, indent=4)
+    print(f"Drift curve of {len(curve)} noise configurations saved to {args.output}")
+
+if __name__ == '__main__':
+    main()
@@ -1,45 +1,444 @@
+import os
 import json
+import time
 import argparse
-from frames_extractor import VideoFrameExtractor
+import numpy as np
+from itertools import repeat
+from concurrent.futures import ProcessPoolExecutor
+from frames_extractor import VideoFrameExtractor, FrameRingBuffer, INTERPOLATIONS
 from property_calculator import PropertyCalculator
 from property_drift_calculator import DriftCalculator
+from property_cache import PropertyCache
+from property_table import PropertyTable
+from property_registry import registry
+from video_downloader import YouTubeDownloader, DownloadStream, is_url
+from drift_monitor import SlidingWindowDrift
+from pipelined_extractor import PipelinedPropertyExtractor
+from instrumentation import Instrumentation, JsonLogSink, PrometheusTextSink
+
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv', '.webm')
+
+def resolve_videos(source):
+    """
+    Expands a video source into a list of video paths.
+
+    Args:
+        source: A video file or URL, a directory of videos, or a .txt manifest listing one video path or URL per
+            line. Relative paths in a manifest are resolved against the manifest's directory.
+
+    Returns:
+        list: The video paths, in directory-sorted or manifest order.
+    """
+    if os.path.isdir(source):
+        return [os.path.join(source, name) for name in sorted(os.listdir(source))
+                if name.lower().endswith(VIDEO_EXTENSIONS)]
+    if source.lower().endswith('.txt'):
+        base_dir = os.path.dirname(source)
+        with open(source) as manifest:
+            return [line.strip() if is_url(line.strip()) else os.path.join(base_dir, line.strip()) for line in manifest
+                    if line.strip() and not line.lstrip().startswith('#')]
+    return [source]
+
+def compute_video_properties(video_path, seek=False, cache=None, instrumentation=None, extractor_options=None,
+                             native_geometry=False, properties=None):
+    """
+    Extracts frames from one video and returns per-property arrays. Runs in pool worker processes.
+
+    If a PropertyCache is given, the arrays are loaded from it when the same video content was already
+    processed with the same parameters, and stored in it otherwise. extractor_options are passed on to
+    VideoFrameExtractor. With native_geometry, aspect ratio and area come from the native video resolution.
+    properties selects the registered properties to compute. Properties are always collected with
+    PropertyCalculator.get_batch_properties, whose values are identical to those of the fused and per-frame paths.
+    """
+    extractor_options = extractor_options or {}
+    extractor = VideoFrameExtractor(video_path, instrumentation=instrumentation, **extractor_options)
+    calculator = PropertyCalculator(instrumentation=instrumentation, properties=properties)
+    key = None
+    if cache is not None:
+        try:
+            key = cache.make_key(video_path, target_fpm=extractor.target_fpm, frame_size=extractor.frame_size,
+                                 seek=seek, properties=list(calculator.properties),
+                                 extractor_options=extractor_options, native_geometry=native_geometry)
+        except OSError:
+            pass  # An unreadable video is extracted uncached below, which reports it as without frames
+    if key is not None:
+        props = cache.get(key)
+        if instrumentation is not None:
+            instrumentation.increment('cache_hits' if props is not None else 'cache_misses')
+        if props is not None:
+            return props
+
+    props = calculator.get_batch_properties(extractor.iter_frames(seek=seek))
+    if native_geometry:
+        calculator.apply_native_geometry(props, extractor.native_size)
+    if not len(props[calculator.property_names[0]]):
+        print(f"No frames extracted from {video_path}. Check if the video path is correct and the file is accessible.")
+    elif key is not None:
+        cache.put(key, props)
+    return props
+
+def compute_instrumented_video_properties(video_path, seek=False, cache=None, extractor_options=None,
+                                          native_geometry=False, properties=None):
+    """
+    Runs compute_video_properties with an Instrumentation of its own, for pool workers, which cannot share the
+    caller's.
+
+    Returns:
+        tuple: The per-property arrays and a snapshot of the worker's timings and counters, which the caller adds
+        to its own with Instrumentation.merge.
+    """
+    instrumentation = Instrumentation()
+    props = compute_video_properties(video_path, seek, cache, instrumentation, extractor_options, native_geometry,
+                                     properties)
+    return props, instrumentation.snapshot()
+
+def merge_properties(props_list):
+    """
+    Concatenates per-video property arrays into one array per property.
+    """
+    if not props_list:
+        return {}
+    return {prop_name: np.concatenate([props[prop_name] for props in props_list]) for prop_name in props_list[0]}
 
 class PropertyDriftPipeline:
-    def __init__(self, train_video, test_video):
+    def __init__(self, train_video, test_video, fused=False, batch=False, seek=False, workers=1, cache_dir=None,
+                 cache_max_bytes=1024 ** 3, train_baseline=None, save_baseline=None, window=None, stride=1,
+                 distances=False, pipelined=False, compute_threads=2, queue_size=64, instrumentation=None,
+                 change_threshold=None, max_gap=None, frame_size=None, interpolation=None, native_geometry=False,
+                 zero_copy=False, executor=None, save_properties=None, properties=None,
+                 download_dir='downloaded_videos'):
+        if workers < 1:
+            raise ValueError("Number of workers must be at least 1.")
         self.train_video = train_video
         self.test_video = test_video
-        self.property_calculator = PropertyCalculator()
-        self.drift_calculator = DriftCalculator()
-    
+        self.train_baseline = train_baseline
+        self.save_baseline = save_baseline
+        self.save_properties = save_properties
+        self.window = window
+        self.stride = stride
+        self.distances = distances
+        self.batch = batch
+        self.seek = seek
+        self.workers = workers
+        self.instrumentation = instrumentation
+        self.native_geometry = native_geometry
+        # Names of the registered properties to compute, None for the default properties
+        self.properties = properties
+        # Content-addressed cache of videos fetched from URLs
+        self.download_dir = download_dir
+        # A long-lived process pool supplied by the caller, e.g. drift_service, is reused instead of starting one per call
+        self.executor = executor
+        self.baselines = {}
+        # Frames are consumed one at a time, so two slots are enough
+        self.ring_buffer = FrameRingBuffer(2) if zero_copy else None
+        self.extractor_options = {}
+        if change_threshold is not None:
+            self.extractor_options.update(change_threshold=change_threshold, max_gap=max_gap)
+        if frame_size is not None:
+            self.extractor_options['frame_size'] = tuple(frame_size)
+        if interpolation is not None:
+            self.extractor_options['interpolation'] = INTERPOLATIONS[interpolation]
+        self.cache = PropertyCache(cache_dir, cache_max_bytes) if cache_dir else None
+        self.pipelined_extractor = None
+        if pipelined:
+            self.pipelined_extractor = PipelinedPropertyExtractor(queue_size, compute_threads, seek, instrumentation,
+                                                                  self.extractor_options, zero_copy, properties)
+        self.stage_stats = {}
+        self.property_calculator = PropertyCalculator(fused=fused, instrumentation=instrumentation,
+                                                      properties=properties)
+        self.drift_calculator = DriftCalculator(instrumentation=instrumentation, properties=properties)
+
+    def fetch_video(self, video_path):
+        """
+        Returns the local path of a video, downloading URLs into the download cache first.
+        """
+        if not is_url(video_path):
+            return video_path
+        return YouTubeDownloader(video_path, self.download_dir, cache_dir=self.download_dir).fetch()
+
+    def open_video(self, video_path):
+        """
+        Returns what VideoFrameExtractor reads a video from: its path, or for a URL a DownloadStream, so frames are
+        extracted while the video downloads into the download cache.
+        """
+        if not is_url(video_path):
+            return video_path
+        return YouTubeDownloader(video_path, self.download_dir, cache_dir=self.download_dir).open_stream()
+
+    def close_video(self, source):
+        """
+        Closes the file handle of a DownloadStream returned by open_video; paths need no closing.
+        """
+        if isinstance(source, DownloadStream):
+            source.close()
+
     def extract_properties(self, video_path):
-        extractor = VideoFrameExtractor(video_path)
-        frames = extractor.extract_frames()
-        if not frames:
+        if self.cache is not None:
+            # The property cache is keyed by the content hash, so the video is fetched completely first
+            return compute_video_properties(self.fetch_video(video_path), self.seek, self.cache, self.instrumentation,
+                                            self.extractor_options, self.native_geometry, self.properties)
+        if self.pipelined_extractor is not None:
+            source = self.open_video(video_path)
+            try:
+                props, stats = self.pipelined_extractor.extract_properties(source)
+                if isinstance(source, DownloadStream):
+                    source.result()  # Raises if the download failed
+            finally:
+                self.close_video(source)
+            self.stage_stats[video_path] = stats
+            print(f"{video_path}: {stats['frames']} frames at {stats['fps']:.1f} fps "
+                  f"(decode {stats['decode']['fps']:.1f} fps, compute {stats['compute']['fps']:.1f} fps, "
+                  f"bottleneck: {stats['bottleneck']})")
+            if not stats['frames']:
+                print(f"No frames extracted from {video_path}. Check if the video path is correct and the file is accessible.")
+            elif self.native_geometry:
+                self.property_calculator.apply_native_geometry(props, stats['native_size'])
+            return props
+        source = self.open_video(video_path)
+        try:
+            extractor = VideoFrameExtractor(source, instrumentation=self.instrumentation, **self.extractor_options)
+            if self.batch:
+                frames = extractor.iter_frames(seek=self.seek, ring_buffer=self.ring_buffer)
+                props = self.property_calculator.get_batch_properties(frames)
+                num_frames = len(props[self.property_calculator.property_names[0]])
+            else:
+                frames = extractor.iter_frames(seek=self.seek, ring_buffer=self.ring_buffer, with_frame_indices=True)
+                props = self.property_calculator.get_frames_table(frames)
+                num_frames = len(props)
+            if isinstance(source, DownloadStream):
+                source.result()  # Raises if the download failed
+        finally:
+            self.close_video(source)
+        if not num_frames:
             print(f"No frames extracted from {video_path}. Check if the video path is correct and the file is accessible.")
-        return self.property_calculator.get_images_properties(frames)
+        elif self.native_geometry:
+            self.property_calculator.apply_native_geometry(props, extractor.native_size)
+        return props
+
+    def extract_properties_parallel(self, *video_lists):
+        """
+        Computes properties for every video across a process pool, one video per task, and merges the results
+        of each list of videos into one array per property.
+
+        Returns:
+            list: The merged property arrays of each list of videos.
+        """
+        videos = [self.fetch_video(video) for video_list in video_lists for video in video_list]
+        start = time.perf_counter()
+        if self.instrumentation is None:
+            task = compute_video_properties
+            task_args = (videos, repeat(self.seek), repeat(self.cache), repeat(None), repeat(self.extractor_options),
+                         repeat(self.native_geometry), repeat(self.properties))
+        else:
+            # Worker processes cannot share the instrumentation; each collects its own and returns a snapshot
+            task = compute_instrumented_video_properties
+            task_args = (videos, repeat(self.seek), repeat(self.cache), repeat(self.extractor_options),
+                         repeat(self.native_geometry), repeat(self.properties))
+        if self.executor is not None:
+            results = list(self.executor.map(task, *task_args))
+        else:
+            with ProcessPoolExecutor(max_workers=self.workers) as executor:
+                results = list(executor.map(task, *task_args))
+        if self.instrumentation is not None:
+            for _, snapshot in results:
+                self.instrumentation.merge(snapshot)
+            results = [props for props, _ in results]
+            self.instrumentation.record_time('extract_parallel', time.perf_counter() - start)
+            self.instrumentation.increment('videos', len(videos))
+
+        merged, start = [], 0
+        for video_list in video_lists:
+            merged.append(merge_properties(results[start:start + len(video_list)]))
+            start += len(video_list)
+        return merged
+
+    def load_baseline(self, path):
+        """
+        Loads a saved training baseline, reusing the already loaded one while its files are unchanged.
+
+        A loaded baseline is identified by the modification time and size of both of its files, since a re-saved
+        baseline replaces each file separately and may keep the same modification time on coarse clocks.
+        """
+        version = []
+        for name in ('baseline.json', 'sorted_values.npy'):
+            stat = os.stat(os.path.join(path, name))
+            version.append((stat.st_mtime_ns, stat.st_size))
+        key = os.path.realpath(path)
+        cached = self.baselines.get(key)
+        if cached is None or cached[0] != version:
+            cached = (version, self.drift_calculator.load_baseline(path))
+            self.baselines[key] = cached
+        return cached[1]
 
     def calculate_drift(self):
-        train_props = self.extract_properties(self.train_video)
-        test_props = self.extract_properties(self.test_video)
-        drift_results = self.drift_calculator.calculate_property_drift(train_props,test_props)
+        test_videos = resolve_videos(self.test_video)
+        if not test_videos:
+            raise ValueError("No videos found for the testing source.")
+
+        train_props, test_props = self.load_train_properties(test_videos)
+        if self.save_properties:
+            PropertyTable.from_props(test_props).save(self.save_properties)
+
+        drift_results = self.drift_calculator.calculate_property_drift(test_props=test_props, train_props=train_props,
+                                                                       distances=self.distances)
         return drift_results
 
+    def load_train_properties(self, test_videos=None):
+        """
+        Loads the training reference: the --train_baseline, or the properties of the training videos. The
+        reference is saved to save_baseline, unless it is the baseline loaded from there.
+
+        Args:
+            test_videos (list): Optional testing videos, extracted together with the training videos so that both
+                sides share one process pool.
+
+        Returns:
+            tuple: The training reference and the properties of test_videos, or None without test_videos.
+        """
+        video_lists = [test_videos] if test_videos else []
+        if not self.train_baseline:
+            train_videos = resolve_videos(self.train_video)
+            if not train_videos:
+                raise ValueError("No videos found for the training source.")
+            video_lists.insert(0, train_videos)
+
+        if not video_lists:
+            props = []
+        elif all(len(video_list) == 1 for video_list in video_lists) and self.workers <= 1:
+            props = [self.extract_properties(video_list[0]) for video_list in video_lists]
+        else:
+            props = self.extract_properties_parallel(*video_lists)
+
+        if self.train_baseline:
+            train_props = self.load_baseline(self.train_baseline)
+        else:
+            train_props = props.pop(0)
+        reloaded = self.train_baseline and self.save_baseline and \
+            os.path.realpath(self.train_baseline) == os.path.realpath(self.save_baseline)
+        if self.save_baseline and not reloaded:
+            self.drift_calculator.save_baseline(train_props, self.save_baseline)
+            # A baseline loaded from there before is stale now
+            self.baselines.pop(os.path.realpath(self.save_baseline), None)
+        return train_props, (props[0] if props else None)
+
+    def calculate_temporal_drift(self):
+        """
+        Calculates drift over sliding windows of the sampled frames of a single testing video.
+
+        Returns:
+            dict: The drift time series, as returned by SlidingWindowDrift.result.
+        """
+        test_videos = resolve_videos(self.test_video)
+        if len(test_videos) != 1:
+            raise ValueError("Temporal drift requires exactly one testing video.")
+
+        sliding_drift = SlidingWindowDrift(self.load_train_properties()[0], self.window, self.stride,
+                                           properties=self.properties)
+        source = self.open_video(test_videos[0])
+        try:
+            extractor = VideoFrameExtractor(source, instrumentation=self.instrumentation, **self.extractor_options)
+            frames = extractor.iter_frames(with_timestamps=True, seek=self.seek, ring_buffer=self.ring_buffer)
+            for timestamp, frame in frames:
+                prop_values = self.property_calculator.calculate_fused(frame[0].transpose(1, 2, 0),
+                                                                       self.property_calculator.scratch)
+                if self.native_geometry:
+                    self.property_calculator.apply_native_geometry({timestamp: prop_values}, extractor.native_size)
+                sliding_drift.update(prop_values, timestamp)
+            if isinstance(source, DownloadStream):
+                source.result()  # Raises if the download failed
+        finally:
+            self.close_video(source)
+        return sliding_drift.result()
+
+    def save_timeline(self, timeline, output_file='property_drift_timeline.npz'):
+        np.savez(output_file, **timeline)
+
     def save_drift_to_json(self, drift_data, output_file='property_drift_results.json'):
         with open(output_file, 'w') as file:
             json.dump(drift_data, file, indent=4)
 
     def run(self):
-        drift_data = self.calculate_drift()
-        self.save_drift_to_json(drift_data)
+        try:
+            if self.window:
+                self.save_timeline(self.calculate_temporal_drift())
+                return
+            drift_data = self.calculate_drift()
+            self.save_drift_to_json(drift_data)
+        finally:
+            if self.instrumentation is not None:
+                self.instrumentation.flush()
+
+def positive_int(value):
+    """
+    Parses a command-line count that must be at least 1.
+    """
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"Must be at least 1: {value}.")
+    return number
+
+def add_pipeline_arguments(parser):
+    """
+    Adds the frame sampling, property computation, cache and metrics options shared by this CLI and drift_service.
+    """
+    parser.add_argument('--fused', action='store_true', help='Compute all frame properties in a single fused pass')
+    parser.add_argument('--batch', action='store_true', help='Compute frame properties as vectorized batches of frames')
+    parser.add_argument('--seek', action='store_true', help='Seek to each sampled frame instead of decoding every frame')
+    parser.add_argument('--workers', type=positive_int, default=1, help='Number of worker processes, one video per task')
+    parser.add_argument('--cache_dir', type=str, default=None, help='Directory for the on-disk property cache')
+    parser.add_argument('--cache_max_mb', type=int, default=1024, help='Maximum size of the property cache in MB')
+    parser.add_argument('--properties', type=str, nargs='+', default=None, choices=list(registry.properties), metavar='PROPERTY', help=f"Properties to compute (default: the eight default properties). Available: {', '.join(registry.properties)}")
+    parser.add_argument('--distances', action='store_true', help='Also report Wasserstein, PSI and Jensen-Shannon distances')
+    parser.add_argument('--pipelined', action='store_true', help='Overlap frame decoding and property computation in threads')
+    parser.add_argument('--compute_threads', type=positive_int, default=2, help='Number of property computation threads in pipelined mode')
+    parser.add_argument('--queue_size', type=positive_int, default=64, help='Maximum number of decoded frames queued in pipelined mode')
+    parser.add_argument('--change_threshold', type=float, default=None, help='Skip sampled frames whose thumbnail changed less than this mean absolute difference (0-255)')
+    parser.add_argument('--max_gap', type=int, default=None, help='Maximum number of consecutive unchanged frames to skip')
+    parser.add_argument('--frame_size', type=int, nargs=2, default=None, metavar=('WIDTH', 'HEIGHT'), help='Size frames are resized to before computing properties (default 384 384)')
+    parser.add_argument('--interpolation', type=str, default=None, choices=sorted(INTERPOLATIONS), help='Interpolation used for resizing frames')
+    parser.add_argument('--download_dir', type=str, default='downloaded_videos', help='Content-addressed cache of videos given as URLs, which are analysed while they download')
+    parser.add_argument('--native_geometry', action='store_true', help='Report aspect ratio and area of the native video resolution')
+    parser.add_argument('--zero_copy', action='store_true', help='Decode and resize into preallocated frame buffers (use with --fused, --batch or --pipelined)')
+    parser.add_argument('--metrics_json', type=str, default=None, help='Append stage timings and counters as a JSON line to this file')
+    parser.add_argument('--metrics_prom', type=str, default=None, help='Write stage timings and counters in Prometheus text format to this file')
+
+def pipeline_options(args):
+    """
+    Returns the PropertyDriftPipeline keyword arguments for the options added by add_pipeline_arguments.
+    """
+    sinks = []
+    if args.metrics_json:
+        sinks.append(JsonLogSink(args.metrics_json))
+    if args.metrics_prom:
+        sinks.append(PrometheusTextSink(args.metrics_prom))
+    return {
+        'fused': args.fused, 'batch': args.batch, 'seek': args.seek, 'workers': args.workers,
+        'cache_dir': args.cache_dir, 'cache_max_bytes': args.cache_max_mb * 1024 ** 2, 'distances': args.distances,
+        'pipelined': args.pipelined, 'compute_threads': args.compute_threads, 'queue_size': args.queue_size,
+        'instrumentation': Instrumentation(sinks) if sinks else None, 'change_threshold': args.change_threshold,
+        'max_gap': args.max_gap, 'frame_size': args.frame_size, 'interpolation': args.interpolation,
+        'native_geometry': args.native_geometry, 'zero_copy': args.zero_copy, 'properties': args.properties,
+        'download_dir': args.download_dir
+    }
 
 def main():
-    parser = argparse.ArgumentParser(description="Calculate property drift between a single training and testing video.")
-    parser.add_argument('--train_video', type=str, required=True, help='Path to the training video')
-    parser.add_argument('--test_video', type=str, required=True, help='Path to the testing video')
+    parser = argparse.ArgumentParser(description="Calculate property drift between training and testing videos.")
+    train_group = parser.add_mutually_exclusive_group(required=True)
+    train_group.add_argument('--train_video', type=str, help='Path or URL of the training video, a directory of videos or a .txt manifest')
+    train_group.add_argument('--train_baseline', type=str, help='Path to a saved training baseline directory')
+    parser.add_argument('--test_video', type=str, required=True, help='Path or URL of the testing video, a directory of videos or a .txt manifest')
+    parser.add_argument('--save_baseline', type=str, default=None, help='Directory to save the training baseline to')
+    parser.add_argument('--window', type=int, default=None, help='Calculate drift over sliding windows of this many sampled frames')
+    parser.add_argument('--stride', type=int, default=1, help='Number of sampled frames between consecutive windows')
+    parser.add_argument('--save_properties', type=str, default=None, help='Path of a .npy file to save the per-frame properties of the testing side to')
+    add_pipeline_arguments(parser)
     
     args = parser.parse_args()
-    
-    pipeline = PropertyDriftPipeline(args.train_video, args.test_video)
+
+    pipeline = PropertyDriftPipeline(args.train_video, args.test_video, train_baseline=args.train_baseline,
+                                     save_baseline=args.save_baseline, window=args.window, stride=args.stride,
+                                     save_properties=args.save_properties,
+                                     **pipeline_options(args))
     pipeline.run()
 
 if __name__ == '__main__':
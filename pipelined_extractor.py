@@ -0,0 +1,173 @@
+import time
+import queue
+import threading
+import numpy as np
+from frames_extractor import VideoFrameExtractor, FrameRingBuffer
+from image_processor import PropertyScratch
+from property_calculator import PropertyCalculator
+
+class PipelinedPropertyExtractor:
+    """
+    Extracts frame properties with decoding and property computation running concurrently.
+
+    A decoder thread feeds sampled frames into a bounded queue and one or more compute threads take frames off it
+    and run the fused property kernel. The bounded queue applies backpressure, so at most queue_size frames are held
+    in memory. OpenCV and NumPy release the GIL in their heavy calls, so the stages overlap in practice.
+    """
+
+    def __init__(self, queue_size=64, workers=2, seek=False, instrumentation=None, extractor_options=None,
+                 zero_copy=False, properties=None):
+        """
+        Args:
+            queue_size (int): Maximum number of decoded frames waiting for a compute thread.
+            workers (int): Number of compute threads.
+            seek (bool): Passed to VideoFrameExtractor.iter_frames.
+            instrumentation (Instrumentation): Optional collector of decode, resize and compute timings.
+            extractor_options (dict): Extra keyword arguments for VideoFrameExtractor.
+            zero_copy (bool): If True, decode into a FrameRingBuffer sized so that no queued or in-flight frame is
+                overwritten, and give each compute thread its own PropertyScratch.
+            properties (list): Names of the registered properties to compute; defaults to the default properties.
+        """
+        self.queue_size = queue_size
+        self.workers = workers
+        self.seek = seek
+        self.instrumentation = instrumentation
+        self.extractor_options = extractor_options or {}
+        self.zero_copy = zero_copy
+        # Frames alive at once: the queue, one per compute thread and the one the decoder is putting
+        self.ring_buffer = FrameRingBuffer(queue_size + workers + 2) if zero_copy else None
+        self.calculator = PropertyCalculator(fused=True, properties=properties)
+
+    def extract_properties(self, video_path):
+        """
+        Extracts and measures the sampled frames of a video.
+
+        Args:
+            video_path (str): The path to the video file.
+
+        Returns:
+            tuple: A dictionary mapping property names to arrays of per-frame values in frame order, and a
+            dictionary of per-stage statistics (see _stage_stats).
+        """
+        frame_queue = queue.Queue(maxsize=self.queue_size)
+        stop = threading.Event()
+        errors = []
+        results = []
+        decode_stats = {'frames': 0, 'busy_seconds': 0.0, 'blocked_seconds': 0.0, 'native_size': None}
+        compute_stats = [{'frames': 0, 'busy_seconds': 0.0, 'starved_seconds': 0.0} for _ in range(self.workers)]
+
+        def put(item):
+            while not stop.is_set():
+                try:
+                    frame_queue.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def decode():
+            try:
+                extractor = VideoFrameExtractor(video_path, instrumentation=self.instrumentation,
+                                                **self.extractor_options)
+                frames = extractor.iter_frames(seek=self.seek, ring_buffer=self.ring_buffer)
+                index = 0
+                while True:
+                    start = time.perf_counter()
+                    frame = next(frames, None)
+                    decode_stats['busy_seconds'] += time.perf_counter() - start
+                    if frame is None:
+                        break
+                    decode_stats['native_size'] = extractor.native_size
+                    start = time.perf_counter()
+                    if not put((index, frame)):
+                        return
+                    decode_stats['blocked_seconds'] += time.perf_counter() - start
+                    decode_stats['frames'] += 1
+                    index += 1
+            except Exception as e:
+                errors.append(e)
+                stop.set()
+            finally:
+                for _ in range(self.workers):
+                    put(None)
+
+        def compute(stats):
+            scratch = PropertyScratch() if self.zero_copy else None
+            try:
+                while not stop.is_set():
+                    start = time.perf_counter()
+                    try:
+                        item = frame_queue.get(timeout=0.1)
+                    except queue.Empty:
+                        stats['starved_seconds'] += time.perf_counter() - start
+                        continue
+                    stats['starved_seconds'] += time.perf_counter() - start
+                    if item is None:
+                        return
+                    index, frame = item
+                    start = time.perf_counter()
+                    prop_values = self.calculator.calculate_fused(frame[0].transpose(1, 2, 0), scratch)
+                    elapsed = time.perf_counter() - start
+                    stats['busy_seconds'] += elapsed
+                    stats['frames'] += 1
+                    if self.instrumentation is not None:
+                        self.instrumentation.record_time('property.fused', elapsed)
+                    results.append((index, prop_values))
+            except Exception as e:
+                errors.append(e)
+                stop.set()
+
+        wall_start = time.perf_counter()
+        threads = [threading.Thread(target=decode, daemon=True)]
+        threads += [threading.Thread(target=compute, args=(stats,), daemon=True) for stats in compute_stats]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall_seconds = time.perf_counter() - wall_start
+
+        if errors:
+            raise errors[0]
+
+        results.sort(key=lambda item: item[0])
+        prop_names = self.calculator.property_names
+        props = {prop_name: np.array([prop_values[prop_name] for _, prop_values in results], dtype=np.float64)
+                 for prop_name in prop_names}
+        return props, self._stage_stats(decode_stats, compute_stats, wall_seconds)
+
+    def _stage_stats(self, decode_stats, compute_stats, wall_seconds):
+        """
+        Summarises per-stage throughput.
+
+        The decode stage's throughput counts only time spent decoding, and the compute stage's counts the busy
+        time of all threads in parallel. The slower stage is reported as the bottleneck: a decoder blocked on a
+        full queue means compute-bound, compute threads starved on an empty queue means decode-bound.
+        """
+        frames = decode_stats['frames']
+        compute_busy = sum(stats['busy_seconds'] for stats in compute_stats)
+        decode_fps = frames / decode_stats['busy_seconds'] if decode_stats['busy_seconds'] else float('inf')
+        compute_fps = frames * self.workers / compute_busy if compute_busy else float('inf')
+        return {
+            'frames': frames,
+            'native_size': decode_stats['native_size'],
+            'wall_seconds': wall_seconds,
+            'fps': frames / wall_seconds if wall_seconds else 0.0,
+            'decode': {
+                'fps': decode_fps,
+                'busy_seconds': decode_stats['busy_seconds'],
+                'blocked_seconds': decode_stats['blocked_seconds']
+            },
+            'compute': {
+                'workers': self.workers,
+                'fps': compute_fps,
+                'busy_seconds': compute_busy,
+                'starved_seconds': sum(stats['starved_seconds'] for stats in compute_stats)
+            },
+            'bottleneck': 'decode' if decode_fps < compute_fps else 'compute'
+        }
+
+# Example usage:
+if __name__ == '__main__':
+    extractor = PipelinedPropertyExtractor(queue_size=64, workers=2)
+    props, stats = extractor.extract_properties('path_to_your_video.mp4')  # Replace with your video path
+    print(stats)
@@ -0,0 +1,126 @@
+import os
+import json
+import hashlib
+import numpy as np
+
+class PropertyCache:
+    """
+    A size-bounded on-disk cache of per-frame property arrays, stored as one compressed .npz file per entry.
+
+    Entries are keyed by the SHA-256 of the video's content together with the extraction parameters, so a
+    renamed copy of a video hits the cache while a re-encoded one does not. When the cache grows beyond
+    max_bytes, the least recently used entries are evicted.
+    """
+
+    def __init__(self, cache_dir, max_bytes=1024 ** 3):
+        """
+        Args:
+            cache_dir (str): Directory holding the cache files. Created if missing.
+            max_bytes (int): Maximum total size of the cache files in bytes.
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        if not os.path.exists(self.cache_dir):
+            os.makedirs(self.cache_dir)
+
+    def file_hash(self, path, block_size=1 << 20):
+        """
+        Calculates the SHA-256 of a file's content, reading it in blocks.
+
+        Args:
+            path (str): Path to the file.
+            block_size (int): Number of bytes read at a time.
+
+        Returns:
+            str: The hex digest.
+        """
+        digest = hashlib.sha256()
+        with open(path, 'rb') as file:
+            for block in iter(lambda: file.read(block_size), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def make_key(self, video_path, **params):
+        """
+        Builds the cache key for a video and its extraction parameters.
+
+        Args:
+            video_path (str): Path to the video file.
+            **params: Extraction parameters such as target_fpm, frame_size and the property names.
+
+        Returns:
+            str: The cache key.
+        """
+        key_data = json.dumps({'content': self.file_hash(video_path), 'params': params}, sort_keys=True, default=str)
+        return hashlib.sha256(key_data.encode('utf-8')).hexdigest()
+
+    def _entry_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.npz")
+
+    def get(self, key):
+        """
+        Loads the property arrays stored under a key.
+
+        Args:
+            key (str): The cache key.
+
+        Returns:
+            dict: Property names mapped to arrays, or None on a cache miss.
+        """
+        entry_path = self._entry_path(key)
+        try:
+            with np.load(entry_path) as entry:
+                props = {name: entry[name] for name in entry.files}
+        except (OSError, ValueError):
+            return None
+        try:
+            os.utime(entry_path)  # Mark as recently used
+        except OSError:
+            pass  # Evicted by another process since it was read; the loaded arrays are still valid
+        return props
+
+    def put(self, key, props):
+        """
+        Stores property arrays under a key and evicts least recently used entries over the size limit.
+
+        Args:
+            key (str): The cache key.
+            props (dict): Property names mapped to arrays of per-frame values.
+        """
+        entry_path = self._entry_path(key)
+        tmp_path = f"{entry_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as file:
+            np.savez_compressed(file, **props)
+        os.replace(tmp_path, entry_path)  # Atomic, so concurrent readers never see a partial entry
+        self.evict()
+
+    def evict(self):
+        """
+        Removes least recently used entries until the cache fits within max_bytes.
+        """
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.npz'):
+                continue
+            entry_path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(entry_path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry_path))
+
+        total_bytes = sum(size for _, size, _ in entries)
+        for _, size, entry_path in sorted(entries):
+            if total_bytes <= self.max_bytes:
+                break
+            try:
+                os.remove(entry_path)
+            except OSError:
+                continue
+            total_bytes -= size
+
+# Example usage:
+if __name__ == '__main__':
+    cache = PropertyCache('property_cache', max_bytes=512 * 1024 ** 2)
+    key = cache.make_key('path_to_your_video.mp4', target_fpm=60, frame_size=(384, 384))  # Replace with your video path
+    print(cache.get(key))
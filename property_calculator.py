@@ -1,36 +1,33 @@
-import cv2
+import time
+import threading
 import numpy as np
-from image_processor import ImageProcessor
+from functools import partial
+from image_processor import ImageProcessor, PropertyScratch
+from property_table import PropertyTable
+from property_registry import registry
 
 class PropertyCalculator:
-    def __init__(self):
+    def __init__(self, fused=False, instrumentation=None, properties=None):
+        """
+        Args:
+            fused (bool): If True, compute all properties of a frame in one pass that shares intermediates such as
+                the gray plane, instead of one independent call per property. For the default properties this is
+                the ImageProcessor.calculate_all_properties kernel, which reuses per-thread work buffers (see
+                scratch), so a calculator can be shared between threads.
+            instrumentation (Instrumentation): Optional collector of per-property compute timings.
+            properties (list): Names of the properties to compute, from property_registry.registry. Defaults to
+                the eight default properties.
+        """
+        self.fused = fused
+        self.instrumentation = instrumentation
         self.processor = ImageProcessor()  # Create an instance of ImageProcessor
-        self.properties = {
-            'Aspect Ratio': {
-                'Function': self.processor.calculate_aspect_ratio,
-            },
-            'Area': {
-                'Function': self.processor.calculate_area,
-            },
-            'Average Brightness': {
-                'Function': self.processor.calculate_average_brightness,
-            },
-            'Luminance Brightness': {
-                'Function': self.processor.calculate_luminance_brightness,
-            },
-            'RMS Contrast': {
-                'Function': self.processor.calculate_rms_contrast,
-            },
-            'Mean Red Relative Intensity': {
-                'Function': self.processor.calculate_mean_red_relative_intensity,
-            },
-            'Mean Green Relative Intensity': {
-                'Function': self.processor.calculate_mean_green_relative_intensity,
-            },
-            'Mean Blue Relative Intensity': {
-                'Function': self.processor.calculate_mean_blue_relative_intensity,
-            }
-        }
+        self._local = threading.local()
+        self.registry = registry
+        self.property_names = registry.resolve(properties)
+        # The hand-fused ImageProcessor kernels compute exactly the default properties
+        self.default_properties = self.property_names == registry.default_names()
+        self.properties = {prop_name: {'Function': partial(registry.compute_one, prop_name)}
+                           for prop_name in self.property_names}
 
     def get_images_properties(self, image_list):
         """
@@ -38,32 +35,179 @@ class PropertyCalculator:
         or already-loaded image data.
 
         Args:
-            image_list: A list of image paths or image data.
+            image_list: A list of image paths or image data. Image data may be channel-last (H, W, 3), as loaded
+                by OpenCV, or channel-first (3, H, W) or (1, 3, H, W), as produced by VideoFrameExtractor.
 
         Returns:
-            A dictionary with filenames as keys and their corresponding property values as values.
+            A dictionary with filenames as keys for images given by path, and image_{index} keys for image data,
+            and their corresponding property values as values.
         """
         image_props = {}
         for index, image_data in enumerate(image_list):
             # Check if the input is a path and load the image, otherwise use the image data directly
+            image_name = image_data if isinstance(image_data, str) else f'image_{index}'
             if isinstance(image_data, str):
                 image_data = self.processor.load(image_data)
             if image_data is None:
                 continue  # If the image failed to load or is None, skip processing
 
-            if image_data.shape[0] == 1:
-                image_data = np.squeeze(image_data, axis=0)
+            image_props[image_name] = self._frame_properties(self.to_channels_last(image_data))
+
+        return image_props
+
+    def get_frames_table(self, frames):
+        """
+        Calculates image property values frame by frame into a PropertyTable, which holds them in a fraction of
+        the memory of get_images_properties' per-image dictionaries.
+
+        Args:
+            frames: An iterable of frames, or of (frame_index, timestamp, frame) tuples as yielded by
+                VideoFrameExtractor.iter_frames(with_frame_indices=True).
+
+        Returns:
+            PropertyTable: One row per frame. Without indices, frames are numbered from 0 and have NaN timestamps.
+        """
+        table = PropertyTable.empty(self.properties)
+        for index, item in enumerate(frames):
+            frame_index, timestamp = index, float('nan')
+            if isinstance(item, tuple):
+                frame_index, timestamp, item = item
+            if item is None:
+                continue
+            table.append(self._frame_properties(self.to_channels_last(item)), frame_index, timestamp)
+        return table
+
+    @property
+    def scratch(self):
+        """
+        The PropertyScratch of the calling thread, created on first use, so threads sharing this calculator never
+        write into each other's buffers.
+        """
+        scratch = getattr(self._local, 'scratch', None)
+        if scratch is None:
+            scratch = self._local.scratch = PropertyScratch()
+        return scratch
+
+    def calculate_fused(self, image_data, scratch=None):
+        """
+        Calculates the selected properties of one (H, W, 3) image in a single pass.
+
+        Args:
+            image_data: The image.
+            scratch (PropertyScratch): Optional work buffers for the default-property kernel, such as self.scratch.
+                A scratch must not be shared between threads.
+
+        Returns:
+            dict: Property names mapped to their values.
+        """
+        if self.default_properties:
+            return self.processor.calculate_all_properties(image_data, scratch)
+        return self.registry.compute(image_data, self.property_names)
+
+    def _frame_properties(self, image_data):
+        if self.instrumentation is not None:
+            return self._timed_properties(image_data)
+        if self.fused:
+            return self.calculate_fused(image_data, self.scratch)
+        prop_values = {}
+        for prop_name, prop_info in self.properties.items():
+            prop_values[prop_name] = prop_info['Function'](image_data)
+        return prop_values
+
+    def to_channels_last(self, image_data):
+        """
+        Returns an (H, W, C) view of an image given as (H, W, C), (C, H, W) or (1, C, H, W).
+        """
+        if image_data.ndim == 4:
+            image_data = np.squeeze(image_data, axis=0)
+        if image_data.ndim == 3 and image_data.shape[0] in (3, 4) and image_data.shape[2] not in (3, 4):
             image_data = image_data.transpose(1, 2, 0)
+        return image_data
 
-            prop_values = {}
-            for prop_name, prop_info in self.properties.items():
-                prop_values[prop_name] = prop_info['Function'](image_data)
+    def _timed_properties(self, image_data):
+        if self.fused:
+            start = time.perf_counter()
+            prop_values = self.calculate_fused(image_data, self.scratch)
+            self.instrumentation.record_time('property.fused', time.perf_counter() - start)
+            return prop_values
 
-            # Generate a sequential name for each image or use the filename
-            image_name = f'image_{index}' if isinstance(image_data, np.ndarray) else image_data
-            image_props[image_name] = prop_values
+        prop_values = {}
+        for prop_name, prop_info in self.properties.items():
+            start = time.perf_counter()
+            prop_values[prop_name] = prop_info['Function'](image_data)
+            self.instrumentation.record_time(f'property.{prop_name}', time.perf_counter() - start)
+        return prop_values
 
-        return image_props
+    def get_batch_properties(self, frames):
+        """
+        Calculates image property values for a batch of frames, returning one array per property.
+
+        Each frame goes through the fused kernel of calculate_fused, read through a channels-last view, and its
+        values are written straight into preallocated columns, so frames are never stacked or copied and values
+        are identical to those of the per-frame paths.
+
+        Args:
+            frames: A uint8 array of shape (N, 3, H, W), or an iterable of frames shaped (1, 3, H, W) or (3, H, W)
+                such as the output of VideoFrameExtractor.iter_frames.
+
+        Returns:
+            A dictionary with property names as keys and NumPy arrays of length N as values.
+        """
+        if isinstance(frames, np.ndarray):
+            frames = frames.reshape((-1,) + frames.shape[-3:])
+        columns = np.empty((len(self.property_names), len(frames) if hasattr(frames, '__len__') else 1024))
+        num_frames = 0
+        for frame in frames:
+            if frame is None:
+                continue
+            if frame.shape[-3] != 3:
+                raise ValueError("Frames must be shaped (3, H, W) or (1, 3, H, W).")
+            if num_frames == columns.shape[1]:
+                grown = np.empty((len(columns), max(2 * num_frames, 1)))
+                grown[:, :num_frames] = columns
+                columns = grown
+            image_data = frame.reshape(frame.shape[-3:]).transpose(1, 2, 0)
+            if self.instrumentation is None:
+                prop_values = self.calculate_fused(image_data, self.scratch)
+            else:
+                start = time.perf_counter()
+                prop_values = self.calculate_fused(image_data, self.scratch)
+                self.instrumentation.record_time('property.batch', time.perf_counter() - start)
+            columns[:, num_frames] = [prop_values[prop_name] for prop_name in self.property_names]
+            num_frames += 1
+
+        return {prop_name: columns[index, :num_frames] for index, prop_name in enumerate(self.property_names)}
+
+    def apply_native_geometry(self, props, native_size):
+        """
+        Replaces the aspect ratio and area measured on resized frames with those of the native video resolution.
+
+        Resizing every frame to a fixed size makes both properties constant; the native width and height recorded
+        by VideoFrameExtractor give their true values without touching any pixels.
+
+        Args:
+            props: Property values, either per image or per property.
+            native_size (tuple): The native (width, height).
+
+        Returns:
+            The same property values, updated in place.
+        """
+        if native_size is None or not native_size[1]:
+            return props
+        width, height = native_size
+        geometry = {'Aspect Ratio': width / height, 'Area': width * height}
+        columns = [prop_name for prop_name in props if not isinstance(props[prop_name], dict)]
+        if columns:
+            num_frames = len(props[columns[0]])
+            for prop_name, value in geometry.items():
+                if prop_name in columns:
+                    props[prop_name] = np.full(num_frames, float(value))
+        else:
+            for prop_values in props.values():
+                for prop_name, value in geometry.items():
+                    if prop_name in prop_values:
+                        prop_values[prop_name] = value
+        return props
 
 # Example usage:
 if __name__ == '__main__':
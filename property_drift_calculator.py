@@ -1,19 +1,47 @@
+import os
+import json
+import math
+import time
 import numpy as np
-from scipy.stats import ks_2samp
+from property_table import PropertyTable
+from property_registry import registry
+
+# ks_2samp's default method='auto' computes exact p-values up to this many values per sample, asymptotic ones above
+EXACT_KS_MAX_N = 10000
+
+class DriftBaseline:
+    """
+    A precomputed reference distribution of the training side: the sorted values of each property and their
+    summary statistics. Loaded baselines are memory-mapped, so one baseline can serve many test jobs without
+    re-reading or re-sorting the training data.
+    """
+
+    def __init__(self, property_names, sorted_values, stats):
+        """
+        Args:
+            property_names (list): Property names, one per row of sorted_values.
+            sorted_values (numpy.ndarray): Array of shape (P, N) holding each property's values in ascending order.
+            stats (dict): Property names mapped to dictionaries of summary statistics.
+        """
+        self.property_names = list(property_names)
+        self.sorted_values = sorted_values
+        self.stats = stats
+        self._index = {prop_name: index for index, prop_name in enumerate(self.property_names)}
+
+    def __contains__(self, prop_name):
+        return prop_name in self._index
+
+    def __len__(self):
+        return self.sorted_values.shape[1]
+
+    def values(self, prop_name):
+        return self.sorted_values[self._index[prop_name]]
 
 class DriftCalculator:
-    def __init__(self):
-        # Define properties directly within the class
-        self.properties = {
-            'Aspect Ratio': {},
-            'Area': {},
-            'Average Brightness': {},
-            'Luminance Brightness': {},
-            'RMS Contrast': {},
-            'Mean Red Relative Intensity': {},
-            'Mean Green Relative Intensity': {},
-            'Mean Blue Relative Intensity': {}
-        }
+    def __init__(self, instrumentation=None, properties=None):
+        self.instrumentation = instrumentation  # Optional collector of KS test timings
+        # The compared properties, by default the eight default properties of property_registry
+        self.properties = {prop_name: {} for prop_name in registry.resolve(properties)}
 
     def convert_to_float(self, data):
         if isinstance(data, dict):
@@ -25,14 +53,271 @@ class DriftCalculator:
         else:
             return data
 
-    def calculate_property_drift(self, test_props, train_props):
+    def build_baseline(self, train_props):
+        """
+        Builds a baseline from training property values.
+
+        Args:
+            train_props: Training property values, either per image or per property.
+
+        Returns:
+            DriftBaseline: The sorted values and summary statistics of each property.
+        """
+        columns = [np.sort(self.get_property_values(train_props, prop_name).astype(np.float64))
+                   for prop_name in self.properties]
+        if len({len(column) for column in columns}) > 1:
+            raise ValueError("All properties must have the same number of training values.")
+
+        stats = {}
+        for prop_name, column in zip(self.properties, columns):
+            stats[prop_name] = {
+                'Count': len(column),
+                'Mean': float(np.mean(column)) if len(column) else float('nan'),
+                'Std': float(np.std(column)) if len(column) else float('nan'),
+                'Min': float(column[0]) if len(column) else float('nan'),
+                'Max': float(column[-1]) if len(column) else float('nan')
+            }
+        return DriftBaseline(self.properties.keys(), np.vstack(columns), stats)
+
+    def save_baseline(self, train_props, path):
+        """
+        Saves a baseline artifact to a directory holding sorted_values.npy and baseline.json.
+
+        Both files are written under temporary names and renamed into place, so a baseline that is memory-mapped
+        from the same directory, e.g. the one being re-saved, keeps reading its old file instead of a truncated one.
+
+        Args:
+            train_props: Training property values, or an already built DriftBaseline.
+            path (str): Output directory. Created if missing.
+        """
+        baseline = train_props if isinstance(train_props, DriftBaseline) else self.build_baseline(train_props)
+        if not os.path.exists(path):
+            os.makedirs(path)
+        values_path = os.path.join(path, 'sorted_values.npy')
+        metadata_path = os.path.join(path, 'baseline.json')
+        tmp_values_path = f"{values_path}.{os.getpid()}.tmp.npy"
+        tmp_metadata_path = f"{metadata_path}.{os.getpid()}.tmp"
+        np.save(tmp_values_path, np.asarray(baseline.sorted_values))
+        with open(tmp_metadata_path, 'w') as file:
+            json.dump({'properties': baseline.property_names, 'stats': baseline.stats}, file, indent=4)
+        os.replace(tmp_values_path, values_path)
+        os.replace(tmp_metadata_path, metadata_path)
+
+    def load_baseline(self, path, mmap=True):
+        """
+        Loads a baseline artifact saved by save_baseline.
+
+        Args:
+            path (str): The baseline directory.
+            mmap (bool): If True, memory-map the sorted values instead of reading them into memory.
+
+        Returns:
+            DriftBaseline: The loaded baseline.
+        """
+        with open(os.path.join(path, 'baseline.json')) as file:
+            metadata = json.load(file)
+        sorted_values = np.load(os.path.join(path, 'sorted_values.npy'), mmap_mode='r' if mmap else None)
+        return DriftBaseline(metadata['properties'], sorted_values, metadata['stats'])
+
+    def ks_against_sorted(self, train_sorted, test_data):
+        """
+        Calculates the two-sample Kolmogorov-Smirnov test against presorted training values.
+
+        The empirical CDFs are compared with searchsorted at the distinct training values and at the test
+        values, so the training side is never re-sorted. The p-value is the one ks_2samp reports, see ks_p_values.
+
+        Args:
+            train_sorted: Training values in ascending order.
+            test_data: Testing values in any order.
+
+        Returns:
+            tuple: The KS statistic and its p-value.
+        """
+        train_sorted = np.asarray(train_sorted)
+        test_sorted = np.sort(np.asarray(test_data, dtype=np.float64))
+        n, m = len(train_sorted), len(test_sorted)
+        if not n or not m:
+            return float('nan'), float('nan')
+
+        # Evaluate the training CDF only at the last occurrence of each distinct value
+        run_ends = np.flatnonzero(np.append(train_sorted[1:] != train_sorted[:-1], True))
+        train_points = train_sorted[run_ends]
+        d_train = np.abs((run_ends + 1) / n - np.searchsorted(test_sorted, train_points, side='right') / m)
+        d_test = np.abs(np.searchsorted(train_sorted, test_sorted, side='right') / n
+                        - np.searchsorted(test_sorted, test_sorted, side='right') / m)
+        ks_statistic = max(d_train.max(), d_test.max())
+        return float(ks_statistic), float(self.ks_p_values([ks_statistic], n, m)[0])
+
+    def ks_p_values(self, ks_statistics, n, m):
+        """
+        Calculates two-sided p-values of KS statistics between samples of n and m values, the same ones ks_2samp
+        reports with its default method='auto': exact up to EXACT_KS_MAX_N values per sample, asymptotic above.
+
+        The exact distribution only depends on the statistic and the sample sizes, so ks_2samp is run on two
+        samples of zeros and ones with the same statistic rather than on the data, which is never re-sorted.
+
+        Args:
+            ks_statistics: KS statistics, each a difference i / n - j / m of two empirical CDFs.
+            n (int): Number of training values.
+            m (int): Number of testing values.
+
+        Returns:
+            numpy.ndarray: The p-values.
+        """
+        # scipy.stats dominates start-up time, so it is only imported once a test actually runs
+        from scipy.stats import kstwo, ks_2samp
+
+        ks_statistics = np.asarray(ks_statistics, dtype=np.float64)
+        if max(n, m) > EXACT_KS_MAX_N:
+            return np.clip(kstwo.sf(ks_statistics, np.round(n * m / (n + m))), 0.0, 1.0)
+
+        gcd = math.gcd(n, m)
+        n_step, m_step = n // gcd, m // gcd
+        p_values = np.empty(ks_statistics.shape)
+        by_numerator = {}
+        for index, ks_statistic in np.ndenumerate(ks_statistics):
+            # The statistic times lcm(n, m) is the integer i * m_step - j * n_step; solve it for 0 <= i <= n
+            # and 0 <= j <= m
+            numerator = int(round(ks_statistic * n_step * m))
+            if numerator not in by_numerator:
+                i = numerator * pow(m_step, -1, n_step) % n_step
+                j = (i * m_step - numerator) // n_step
+                while j < 0:
+                    i, j = i + n_step, j + m_step
+                by_numerator[numerator] = ks_2samp(np.repeat([0.0, 1.0], [i, n - i]),
+                                                   np.repeat([0.0, 1.0], [j, m - j])).pvalue
+            p_values[index] = by_numerator[numerator]
+        return p_values
+
+    def get_property_values(self, props, prop_name):
+        """
+        Returns the values of one property as a NumPy array.
+
+        Args:
+            props: A dictionary keyed by image name holding per-image property dictionaries, a dictionary
+                keyed by property name holding arrays of per-frame values, a PropertyTable or a DriftBaseline.
+            prop_name: The property to extract.
+
+        Returns:
+            numpy.ndarray: The property values as float64, so that sources stored at other precisions, such as
+            float32 tables, compare equal to the same values computed in float64.
+        """
+        if isinstance(props, DriftBaseline):
+            return props.values(prop_name)
+        if isinstance(props, PropertyTable) or (prop_name in props and not isinstance(props[prop_name], dict)):
+            return np.asarray(props[prop_name], dtype=np.float64)
+        return np.array([props[img_name][prop_name] for img_name in props if prop_name in props[img_name]],
+                        dtype=np.float64)
+
+    def get_property_matrix(self, props):
+        """
+        Stacks the values of every property into one array.
+
+        Args:
+            props: Property values in any form accepted by get_property_values.
+
+        Returns:
+            numpy.ndarray: Array of shape (N, P), one column per property in self.properties order.
+        """
+        return np.column_stack([self.get_property_values(props, prop_name).astype(np.float64)
+                                for prop_name in self.properties])
+
+    def calculate_drift_matrix(self, train_matrix, test_matrix, num_bins=10, distances=True):
+        """
+        Calculates drift statistics for all properties at once from (N, P) arrays of property values.
+
+        Both sides are sorted together once per column. The KS statistic and Wasserstein-1 distance are read
+        off the running difference of the two empirical CDFs over the merged order; PSI and Jensen-Shannon
+        share one set of num_bins quantile bins of the training values, plus a bin above the training maximum,
+        so that values beyond a constant or tied training maximum never share its bin. Results are kept at full
+        precision.
+
+        Args:
+            train_matrix: Array of shape (N_train, P) holding the training values.
+            test_matrix: Array of shape (N_test, P) holding the testing values.
+            num_bins (int): Number of training-quantile bins for PSI and Jensen-Shannon.
+            distances (bool): If False, only compute the KS statistic and its p-value.
+
+        Returns:
+            dict: Arrays of length P for 'KS', 'KS p-value' (as ks_2samp reports it), 'Wasserstein', 'PSI' and
+            'Jensen-Shannon' (base-2 distance, between 0 and 1).
+        """
+        train_matrix = np.asarray(train_matrix, dtype=np.float64)
+        test_matrix = np.asarray(test_matrix, dtype=np.float64)
+        n, m = len(train_matrix), len(test_matrix)
+        if not n or not m:
+            raise ValueError("Both training and testing data must be non-empty.")
+
+        combined = np.concatenate([train_matrix, test_matrix])
+        order = np.argsort(combined, axis=0, kind='stable')
+        values = np.take_along_axis(combined, order, axis=0)
+        is_train = order < n
+
+        # Training CDF minus testing CDF after each merged value, compared only at the last of tied values
+        train_seen = np.cumsum(is_train, axis=0)
+        test_seen = np.arange(1, n + m + 1)[:, np.newaxis] - train_seen
+        cdf_diff = train_seen / n - test_seen / m
+        run_ends = np.ones(values.shape, dtype=bool)
+        run_ends[:-1] = values[1:] != values[:-1]
+        ks_statistic = np.max(np.abs(cdf_diff) * run_ends, axis=0)
+        p_value = self.ks_p_values(ks_statistic, n, m)
+        if not distances:
+            return {'KS': ks_statistic, 'KS p-value': p_value}
+        wasserstein = np.sum(np.abs(cdf_diff[:-1]) * np.diff(values, axis=0), axis=0)
+
+        # Quantile bin edges taken from the training values in the shared sort. Tied quantiles give repeated edges,
+        # whose bins stay empty on both sides and add nothing; the closing edge just above the training maximum
+        # puts higher values into a bin of their own.
+        train_sorted = values.T[is_train.T].reshape(-1, n)
+        edges = np.concatenate([train_sorted[:, (np.arange(1, num_bins) * n) // num_bins],
+                                np.nextafter(train_sorted[:, -1:], np.inf)], axis=1)
+        train_share = self._bin_shares(train_matrix, edges, num_bins + 1)
+        test_share = self._bin_shares(test_matrix, edges, num_bins + 1)
+
+        eps = 1e-6
+        train_clipped = np.maximum(train_share, eps)
+        test_clipped = np.maximum(test_share, eps)
+        psi = np.sum((test_clipped - train_clipped) * np.log(test_clipped / train_clipped), axis=0)
+
+        midpoint = (train_share + test_share) / 2
+        with np.errstate(divide='ignore', invalid='ignore'):
+            js_train = np.where(train_share > 0, train_share * np.log2(train_share / midpoint), 0.0)
+            js_test = np.where(test_share > 0, test_share * np.log2(test_share / midpoint), 0.0)
+        jensen_shannon = np.sqrt(np.maximum(0.5 * np.sum(js_train + js_test, axis=0), 0.0))
+
+        return {
+            'KS': ks_statistic,
+            'KS p-value': p_value,
+            'Wasserstein': wasserstein,
+            'PSI': psi,
+            'Jensen-Shannon': jensen_shannon
+        }
+
+    def _bin_shares(self, matrix, edges, num_bins):
+        """
+        Returns the share of each column's values in each bin, as an array of shape (num_bins, P).
+        """
+        num_props = matrix.shape[1]
+        bins = np.empty(matrix.shape, dtype=np.int64)
+        for start in range(0, len(matrix), 65536):
+            chunk = matrix[start:start + 65536]
+            bins[start:start + 65536] = np.sum(chunk[:, :, np.newaxis] >= edges[np.newaxis], axis=2)
+        counts = np.bincount((bins + np.arange(num_props) * num_bins).ravel(), minlength=num_props * num_bins)
+        return counts.reshape(num_props, num_bins).T / len(matrix)
+
+    def calculate_property_drift(self, test_props, train_props, distances=False, precision=2):
         """
         Calculates drift scores and other information for image properties.
 
         Args:
             train_props: A dictionary containing property values for training images.
             test_props: A dictionary containing property values for testing images.
-                Keys are image filenames (without path).
+                Keys are image filenames (without path). Both may instead map property names to arrays of
+                per-frame values, as returned by PropertyCalculator.get_batch_properties. train_props may also
+                be a DriftBaseline, in which case the KS test runs against its presorted values.
+
+            distances: If True, also report the Wasserstein-1, PSI and Jensen-Shannon distances.
+            precision: Number of decimals the reported values are rounded to, or None for full precision.
 
         Returns:
             A dictionary containing drift information for each property:
@@ -42,35 +327,48 @@ class DriftCalculator:
                     'p-value': The p-value associated with the KS statistic.
                     'Mean (Train)': The mean value of the property in the training dataset.
                     'Mean (Test)': The mean value of the property in the testing dataset.
-        """
-        drift_info = {}
-        prop_scores = []
-        for prop_name in self.properties.keys():
-            train_data = [train_props[img_name][prop_name] for img_name in train_props if prop_name in train_props[img_name]]
-            test_data = [test_props[img_name][prop_name] for img_name in test_props if prop_name in test_props[img_name]]
-
-            # Convert lists to NumPy arrays
-            train_data = np.array(train_data)
-            test_data = np.array(test_data)
+                    'Wasserstein', 'PSI', 'Jensen-Shannon': Only if distances is True.
 
-            # Calculate means
-            mean_train = np.mean(train_data)
-            mean_test = np.mean(test_data)
+            KS statistics of all properties come from one call of calculate_drift_matrix; against a
+            DriftBaseline without distances, ks_against_sorted reuses its presorted values instead. Either way the
+            p-values are those of ks_2samp.
+        """
+        test_matrix = self.get_property_matrix(test_props)
+        stat_names = ('Wasserstein', 'PSI', 'Jensen-Shannon') if distances else ()
 
-            # Perform Kolmogorov-Smirnov test
-            ks_statistic, p_value = ks_2samp(train_data, test_data)
-            prop_scores.append(float("{:.2f}".format(ks_statistic)))
+        start = time.perf_counter()
+        if isinstance(train_props, DriftBaseline) and not distances:
+            ks_results = [self.ks_against_sorted(train_props.values(prop_name), test_matrix[:, index])
+                          for index, prop_name in enumerate(self.properties)]
+            matrix_stats = {'KS': [ks_statistic for ks_statistic, _ in ks_results],
+                            'KS p-value': [p_value for _, p_value in ks_results]}
+        else:
+            matrix_stats = self.calculate_drift_matrix(self.get_property_matrix(train_props), test_matrix,
+                                                       distances=distances)
+        if self.instrumentation is not None:
+            self.instrumentation.record_time('ks', time.perf_counter() - start)
 
+        drift_info = {}
+        for index, prop_name in enumerate(self.properties):
+            if isinstance(train_props, DriftBaseline):
+                mean_train = train_props.stats[prop_name]['Mean']
+            else:
+                mean_train = np.mean(self.get_property_values(train_props, prop_name))
             drift_info[prop_name] = {
-                'Drift Score': float("{:.2f}".format(ks_statistic)),
-                'p-value': float("{:.2f}".format(p_value)),
-                'Mean (Train)': float("{:.2f}".format(mean_train)),
-                'Mean (Test)': float("{:.2f}".format(mean_test))
+                'Drift Score': matrix_stats['KS'][index],
+                'p-value': matrix_stats['KS p-value'][index],
+                'Mean (Train)': mean_train,
+                'Mean (Test)': np.mean(test_matrix[:, index])
             }
+            for stat_name in stat_names:
+                drift_info[prop_name][stat_name] = matrix_stats[stat_name][index]
 
         drift_info = self.convert_to_float(drift_info)
-        drift_score_mean = sum(prop_scores) / len(prop_scores)  # This could be returned or used further if needed
 
+        # Round only the reported values, never the intermediate statistics
+        if precision is not None:
+            drift_info = {prop_name: {key: round(value, precision) for key, value in prop_info.items()}
+                          for prop_name, prop_info in drift_info.items()}
         return drift_info
 
 # Example usage:
@@ -0,0 +1,164 @@
+import cv2
+import numpy as np
+from image_processor import CHANNEL_SUM_WEIGHTS
+
+class PropertyRegistry:
+    """
+    The set of frame properties the pipeline can compute, and the intermediates they are computed from.
+
+    An intermediate is a derived array shared between properties, such as the gray plane, the per-pixel channel
+    sums or the HSV image. Properties and intermediates declare the intermediates they need, and compute()
+    evaluates exactly the intermediates required by the selected properties, each once per frame, in dependency
+    order. Selecting a subset of properties therefore skips the work only the others need.
+
+    Functions receive a dictionary holding the 'image' (uint8 BGR, shape (H, W, 3)) and the intermediates they
+    declared. Intermediates must not be modified in place, as other properties read them too.
+    """
+
+    def __init__(self):
+        self.intermediates = {}
+        self.properties = {}
+        self._plans = {}
+
+    def register_intermediate(self, name, function, requires=()):
+        """
+        Registers an intermediate.
+
+        Args:
+            name (str): The intermediate's name.
+            function: Computes the intermediate from a dictionary of the image and its requirements.
+            requires (tuple): Names of the intermediates the function reads.
+        """
+        self._check_requires(name, requires)
+        self.intermediates[name] = {'Function': function, 'Requires': tuple(requires)}
+        self._plans.clear()
+
+    def register(self, name, function, requires=(), default=False):
+        """
+        Registers a property.
+
+        Args:
+            name (str): The property's name, as reported in drift results.
+            function: Computes the property's value from a dictionary of the image and its requirements.
+            requires (tuple): Names of the intermediates the function reads.
+            default (bool): If True, the property is computed when no selection is given.
+        """
+        self._check_requires(name, requires)
+        self.properties[name] = {'Function': function, 'Requires': tuple(requires), 'Default': default}
+        self._plans.clear()
+
+    def _check_requires(self, name, requires):
+        for required in requires:
+            if required not in self.intermediates:
+                raise ValueError(f"{name} requires unknown intermediate: {required}.")
+
+    def default_names(self):
+        return [name for name, prop_info in self.properties.items() if prop_info['Default']]
+
+    def resolve(self, names=None):
+        """
+        Returns the selected property names in registration order, or the default properties if names is None.
+        """
+        if names is None:
+            return self.default_names()
+        unknown = [name for name in names if name not in self.properties]
+        if unknown:
+            raise ValueError(f"Unknown properties: {', '.join(unknown)}. Available: {', '.join(self.properties)}.")
+        return [name for name in self.properties if name in names]
+
+    def plan(self, names):
+        """
+        Returns the intermediates needed by the given properties, each after the intermediates it requires.
+        """
+        key = tuple(names)
+        if key not in self._plans:
+            order = []
+
+            def visit(intermediate):
+                if intermediate in order:
+                    return
+                for required in self.intermediates[intermediate]['Requires']:
+                    visit(required)
+                order.append(intermediate)
+
+            for name in names:
+                for required in self.properties[name]['Requires']:
+                    visit(required)
+            self._plans[key] = order
+        return self._plans[key]
+
+    def compute_one(self, name, image):
+        """
+        Computes a single property of one frame, with only the intermediates it needs.
+        """
+        return self.compute(image, [name])[name]
+
+    def compute(self, image, names=None):
+        """
+        Computes properties of one frame.
+
+        Args:
+            image: A uint8 BGR image of shape (H, W, 3).
+            names (list): The properties to compute; defaults to the default properties.
+
+        Returns:
+            dict: Property names mapped to their values.
+        """
+        if image is None or image.ndim != 3:
+            raise ValueError("Image must have color channels (e.g., RGB)")
+        names = self.resolve(names)
+        values = {'image': image}
+        for intermediate in self.plan(names):
+            values[intermediate] = self.intermediates[intermediate]['Function'](values)
+        return {name: self.properties[name]['Function'](values) for name in names}
+
+def _relative_intensities(values):
+    # Mean of each channel divided by the pixel's channel sum, with dark pixels divided by 1, computed with the
+    # same OpenCV operations as ImageProcessor.calculate_all_properties so the values are identical
+    divisor = np.maximum(values['intensity_sum'], 1.0)
+    return cv2.mean(cv2.divide(values['float'], cv2.merge([divisor, divisor, divisor])))[:3]
+
+def _entropy(values):
+    histogram = np.bincount(values['gray_u8'].ravel(), minlength=256)
+    probabilities = histogram[histogram > 0] / values['gray_u8'].size
+    return float(-np.sum(probabilities * np.log2(probabilities)))
+
+registry = PropertyRegistry()
+
+registry.register_intermediate('float', lambda values: values['image'].astype(np.float32))
+registry.register_intermediate('gray', lambda values: cv2.cvtColor(values['float'], cv2.COLOR_BGR2GRAY),
+                               requires=('float',))
+registry.register_intermediate('gray_u8', lambda values: cv2.cvtColor(values['image'], cv2.COLOR_BGR2GRAY))
+registry.register_intermediate('intensity_sum', lambda values: cv2.transform(values['float'], CHANNEL_SUM_WEIGHTS),
+                               requires=('float',))
+registry.register_intermediate('relative_intensities', _relative_intensities, requires=('float', 'intensity_sum'))
+registry.register_intermediate('hsv', lambda values: cv2.cvtColor(values['image'], cv2.COLOR_BGR2HSV))
+registry.register_intermediate('laplacian', lambda values: cv2.Laplacian(values['gray'], cv2.CV_32F),
+                               requires=('gray',))
+registry.register_intermediate('edges', lambda values: cv2.Canny(values['gray_u8'], 100, 200), requires=('gray_u8',))
+
+# The eight properties of ImageProcessor, computed as its fused kernel computes them
+registry.register('Aspect Ratio', lambda values: values['image'].shape[1] / values['image'].shape[0], default=True)
+registry.register('Area', lambda values: values['image'].shape[1] * values['image'].shape[0], default=True)
+registry.register('Average Brightness',
+                  lambda values: values['intensity_sum'].sum(dtype=np.float64) / values['image'].size,
+                  requires=('intensity_sum',), default=True)
+# BT.601 luma, the Y plane of cv2.COLOR_BGR2YUV that calculate_luminance_brightness averages
+registry.register('Luminance Brightness', lambda values: values['gray'].mean(dtype=np.float64), requires=('gray',),
+                  default=True)
+registry.register('RMS Contrast', lambda values: np.sqrt(np.square(values['gray'] - np.float32(
+    values['gray'].mean(dtype=np.float64))).mean(dtype=np.float64)), requires=('gray',), default=True)
+# calculate_mean_*_relative_intensity swap channels with RGB2BGR before indexing, so "red" reads channel 0
+registry.register('Mean Red Relative Intensity', lambda values: values['relative_intensities'][0],
+                  requires=('relative_intensities',), default=True)
+registry.register('Mean Green Relative Intensity', lambda values: values['relative_intensities'][1],
+                  requires=('relative_intensities',), default=True)
+registry.register('Mean Blue Relative Intensity', lambda values: values['relative_intensities'][2],
+                  requires=('relative_intensities',), default=True)
+
+# Opt-in properties
+registry.register('Sharpness', lambda values: float(np.var(values['laplacian'])), requires=('laplacian',))
+registry.register('Entropy', _entropy, requires=('gray_u8',))
+registry.register('Saturation', lambda values: float(np.mean(values['hsv'][:, :, 1])) / 255.0, requires=('hsv',))
+registry.register('Edge Density', lambda values: int(np.count_nonzero(values['edges'])) / values['edges'].size,
+                  requires=('edges',))
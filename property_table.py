@@ -0,0 +1,134 @@
+import numpy as np
+
+# Fields every table has in addition to its properties
+INDEX_FIELDS = (('frame_index', np.int64), ('timestamp', np.float64))
+
+class PropertyTable:
+    """
+    Per-frame property values in one NumPy structured array, with 'frame_index' (int64), 'timestamp' (float64)
+    and one float64 field per property.
+
+    Properties are kept in float64, the dtype of every other property path, so a table compared with batch
+    results or a saved baseline of the same frames reports no drift. A row costs 16 bytes plus 8 per property,
+    instead of a dictionary and a float object per value, and
+    table[prop_name] is a view of one property's column. Tables are saved as plain .npy files and loaded
+    memory-mapped, so reading one back copies nothing. Like a dictionary of per-property arrays, a table
+    supports `in`, indexing and iteration over its property names, so DriftCalculator consumes it directly.
+    """
+
+    def __init__(self, data):
+        """
+        Args:
+            data (numpy.ndarray): A structured array with the index fields and one field per property.
+        """
+        self._buffer = data
+        self._size = len(data)
+        index_names = {name for name, _ in INDEX_FIELDS}
+        self._property_names = [name for name in data.dtype.names if name not in index_names]
+
+    @classmethod
+    def empty(cls, property_names, capacity=1024):
+        """
+        Creates an empty table that grows as rows are appended.
+        """
+        dtype = np.dtype(list(INDEX_FIELDS) + [(prop_name, np.float64) for prop_name in property_names])
+        table = cls(np.empty(capacity, dtype=dtype))
+        table._size = 0
+        return table
+
+    @classmethod
+    def from_props(cls, props, frame_index=None, timestamp=None):
+        """
+        Builds a table from property values, either a dictionary keyed by image name holding per-image property
+        dictionaries or a dictionary keyed by property name holding arrays of per-frame values.
+
+        Args:
+            props (dict): The property values.
+            frame_index: Optional frame indices; defaults to 0..N-1.
+            timestamp: Optional timestamps in seconds; defaults to NaN.
+        """
+        if isinstance(props, PropertyTable):
+            return props
+        if props and all(isinstance(prop_values, dict) for prop_values in props.values()):
+            property_names = list(next(iter(props.values())))
+            columns = {prop_name: [prop_values[prop_name] for prop_values in props.values()]
+                       for prop_name in property_names}
+        else:
+            columns = props
+        num_rows = len(next(iter(columns.values()))) if columns else 0
+        table = cls.empty(list(columns), num_rows)
+        table._size = num_rows
+        table['frame_index'] = np.arange(num_rows) if frame_index is None else frame_index
+        table['timestamp'] = np.nan if timestamp is None else timestamp
+        for prop_name, values in columns.items():
+            table[prop_name] = values
+        return table
+
+    @classmethod
+    def concatenate(cls, tables):
+        """
+        Joins tables with the same properties, e.g. those of several videos, into one.
+        """
+        return cls(np.concatenate([table.data for table in tables]))
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """
+        Loads a table saved by save.
+
+        Args:
+            path (str): The .npy file.
+            mmap (bool): If True, memory-map the file instead of reading it into memory.
+        """
+        return cls(np.load(path, mmap_mode='r' if mmap else None))
+
+    def save(self, path):
+        """
+        Saves the table as a .npy file of its structured array.
+        """
+        np.save(path, self.data)
+
+    @property
+    def data(self):
+        return self._buffer[:self._size]
+
+    @property
+    def property_names(self):
+        return list(self._property_names)
+
+    def append(self, prop_values, frame_index=-1, timestamp=float('nan')):
+        """
+        Appends the property values of one frame, doubling the capacity when the table is full.
+        """
+        if self._size == len(self._buffer):
+            buffer = np.empty(max(2 * len(self._buffer), 1), dtype=self._buffer.dtype)
+            buffer[:self._size] = self._buffer
+            self._buffer = buffer
+        self._buffer[self._size] = (frame_index, timestamp) + tuple(prop_values[prop_name]
+                                                                    for prop_name in self._property_names)
+        self._size += 1
+
+    def columns(self):
+        """
+        Returns a dictionary mapping property names to float64 arrays, the format of
+        PropertyCalculator.get_batch_properties.
+        """
+        return {prop_name: np.array(self.data[prop_name], dtype=np.float64) for prop_name in self.property_names}
+
+    def __len__(self):
+        return self._size
+
+    def __contains__(self, name):
+        return name in self._buffer.dtype.names
+
+    def __getitem__(self, name):
+        return self.data[name]
+
+    def __setitem__(self, name, values):
+        self.data[name] = values
+
+    def __iter__(self):
+        return iter(self.property_names)
+
+    def keys(self):
+        return self.property_names
@@ -0,0 +1,39 @@
+import os
+import sys
+import cv2
+import numpy as np
+import pytest
+
+# The modules live at the repository root rather than in a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.fixture(scope='session')
+def video_path(tmp_path_factory):
+    """
+    A 3-second 96x64 video at 10 fps whose frames change from one to the next.
+    """
+    path = str(tmp_path_factory.mktemp('videos') / 'clip.mp4')
+    rng = np.random.default_rng(0)
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), 10, (96, 64))
+    for index in range(30):
+        frame = np.full((64, 96, 3), index * 8, dtype=np.uint8)
+        frame[16:48, 24:72] = rng.integers(0, 256, (32, 48, 3), dtype=np.uint8)
+        writer.write(frame)
+    writer.release()
+    return path
+
+@pytest.fixture(scope='session')
+def make_frames():
+    """
+    A factory of random uint8 frames of a given (height, width), in the order noise, all black, noise with black top
+    rows, flat gray, then noise again. Frames are channels-last (N, H, W, 3), or (N, 3, H, W) as stacked from
+    VideoFrameExtractor output if planar is set.
+    """
+    def make(shape=(24, 40), num_frames=4, seed=0, planar=False):
+        rng = np.random.default_rng(seed)
+        frames = rng.integers(0, 256, (num_frames,) + tuple(shape) + (3,), dtype=np.uint8)
+        frames[1:2] = 0
+        frames[2:3, :max(1, shape[0] // 2)] = 0
+        frames[3:4] = 128
+        return np.ascontiguousarray(frames.transpose(0, 3, 1, 2)) if planar else frames
+    return make
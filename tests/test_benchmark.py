@@ -0,0 +1,13 @@
+import glob
+import os
+from benchmark import STARTUP_SCRIPTS
+
+def test_every_command_line_entry_point_is_timed_at_startup():
+    repo_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    entry_points = set()
+    for path in glob.glob(os.path.join(repo_dir, '*.py')):
+        with open(path) as file:
+            if 'ArgumentParser(' in file.read():
+                entry_points.add(os.path.basename(path))
+    entry_points.discard('benchmark.py')
+    assert entry_points == set(STARTUP_SCRIPTS)
@@ -0,0 +1,108 @@
+import numpy as np
+import pytest
+from scipy.stats import ks_2samp
+from drift_monitor import HistogramSketch, OnlineDriftMonitor, SlidingWindowDrift, ks_bin_edges
+from property_registry import registry
+
+def props(values):
+    """
+    The same values for every default property.
+    """
+    return {prop_name: np.asarray(values, dtype=np.float64) for prop_name in registry.default_names()}
+
+def test_bin_edges_cover_every_quantile_from_both_sides():
+    edges = ks_bin_edges(np.ones(20), 4)
+    assert len(edges) == 8 and np.all(np.diff(edges) >= 0)
+    assert np.unique(edges).tolist() == [1.0, np.nextafter(1.0, np.inf)]
+
+def test_sketch_counts_merges_and_resets():
+    sketch, other = HistogramSketch([1.0, 2.0]), HistogramSketch([1.0, 2.0])
+    sketch.update([0.5, 1.0, 1.5])
+    other.update(2.5)
+    sketch.merge(other)
+    assert sketch.counts.tolist() == [1, 2, 1]
+    assert sketch.count == 4 and sketch.mean() == pytest.approx(1.375)
+    np.testing.assert_allclose(sketch.cdf(), [0.25, 0.75])
+    with pytest.raises(ValueError):
+        sketch.merge(HistogramSketch([1.0, 3.0]))
+    sketch.reset()
+    assert sketch.count == 0 and np.isnan(sketch.mean())
+
+@pytest.mark.parametrize('test_value,expected', [(2.0, 1.0), (0.5, 1.0), (1.0, 0.0)])
+def test_shift_of_a_constant_property(test_value, expected):
+    monitor = OnlineDriftMonitor(props(np.ones(200)), num_bins=10)
+    monitor.update(props(np.full(30, test_value)))
+    assert all(prop_drift['Drift Score'] == expected for prop_drift in monitor.drift().values())
+
+def test_shift_past_a_tied_maximum():
+    train = np.append(np.linspace(0, 1, 50), np.ones(150))
+    monitor = OnlineDriftMonitor(props(train), num_bins=10)
+    monitor.update(props(np.full(30, 1.5)))
+    assert monitor.drift()['Area']['Drift Score'] == 1.0
+
+@pytest.mark.parametrize('num_bins', [10, 100])
+def test_binned_statistic_is_close_to_exact_ks(num_bins):
+    rng = np.random.default_rng(num_bins)
+    train = np.append(rng.normal(0, 1, 2000), np.zeros(500))  # A quarter of the values tied at 0
+    for test in (rng.normal(0.2, 1.2, 500), rng.normal(0, 1, 500), np.append(rng.normal(0, 1, 400), np.zeros(100))):
+        monitor = OnlineDriftMonitor(props(train), num_bins=num_bins)
+        monitor.update(props(test))
+        score = monitor.drift()['Area']['Drift Score']
+        exact = ks_2samp(train, test).statistic
+        assert exact - 1.0 / num_bins - 1e-9 <= score <= exact + 1e-9
+
+def test_emits_every_n_frames_and_resets():
+    updates = []
+    monitor = OnlineDriftMonitor(props(np.arange(100.0)), num_bins=10, every_n_frames=5, callback=updates.append,
+                                 reset_on_emit=True)
+    for value in range(12):
+        monitor.update(props(float(value)))
+    assert len(updates) == 2
+    assert updates[1]['Area']['Frames'] == 5 and updates[1]['Area']['Mean (Test)'] == 7.0
+    assert monitor.sketches['Area'].count == 2
+
+def test_merged_monitors_equal_one_monitor():
+    rng = np.random.default_rng(0)
+    train, first, second = rng.normal(0, 1, 500), rng.normal(0.5, 1, 100), rng.normal(-0.5, 1, 50)
+    merged, other, single = (OnlineDriftMonitor(props(train), num_bins=20) for _ in range(3))
+    merged.update(props(first))
+    other.update(props(second))
+    merged.merge(other)
+    single.update(props(np.append(first, second)))
+    for prop_name, prop_drift in single.drift().items():
+        assert merged.drift()[prop_name] == pytest.approx(prop_drift)
+
+def slide(sliding_drift, values):
+    for index, value in enumerate(values):
+        sliding_drift.update({prop_name: value for prop_name in sliding_drift.property_names}, timestamp=index / 2)
+    return sliding_drift.result()
+
+@pytest.mark.parametrize('shifted_value', [2.0, 0.5])
+def test_window_alarms_on_a_shift_of_a_constant_property(shifted_value):
+    timeline = slide(SlidingWindowDrift(props(np.ones(100)), window=4, num_bins=10),
+                     [1.0] * 8 + [shifted_value] * 8)
+    drift = timeline['drift'][:, timeline['properties'].tolist().index('Area')]
+    shifted_frames = np.clip(np.arange(len(drift)) + 4 - 8, 0, 4)
+    np.testing.assert_allclose(drift, shifted_frames / 4)
+    # With an alarm threshold of 0.5, the alarm is raised once half of a window has shifted
+    assert np.flatnonzero(drift >= 0.5)[0] == 6
+
+def test_windowed_statistic_is_close_to_exact_ks():
+    rng = np.random.default_rng(0)
+    train = np.append(rng.normal(0, 1, 1000), np.zeros(250))
+    values = np.concatenate([rng.normal(0, 1, 60), np.zeros(20), rng.normal(1, 1, 60)])
+    window, num_bins = 40, 50
+    timeline = slide(SlidingWindowDrift(props(train), window=window, stride=7, num_bins=num_bins), values)
+    assert timeline['start_frame'].tolist() == list(range(0, len(values) - window + 1, 7))
+    for drift, start in zip(timeline['drift'][:, 0], timeline['start_frame']):
+        exact = ks_2samp(train, values[start:start + window]).statistic
+        assert exact - 1.0 / num_bins - 1e-6 <= drift <= exact + 1e-6
+
+def test_window_result_layout():
+    timeline = slide(SlidingWindowDrift(props(np.arange(10.0)), window=3, stride=2), np.arange(8.0))
+    assert timeline['drift'].shape == (3, 8) and timeline['drift'].dtype == np.float32
+    assert timeline['start_frame'].tolist() == [0, 2, 4]
+    assert timeline['start_time'].tolist() == [0.0, 1.0, 2.0]
+    assert timeline['end_time'].tolist() == [1.0, 2.0, 3.0]
+    with pytest.raises(ValueError):
+        SlidingWindowDrift(props(np.arange(10.0)), window=0)
@@ -0,0 +1,64 @@
+import io
+import json
+import os
+import numpy as np
+from drift_service import DriftService
+from instrumentation import Instrumentation
+from pipeline_propdrift import PropertyDriftPipeline
+
+def make_service(tmp_path, **options):
+    pipeline = PropertyDriftPipeline(None, None, frame_size=(48, 32), **options)
+    pipeline.extractor_options['target_fpm'] = 300  # Every other frame of the 3-second test video
+    return DriftService(pipeline, io.StringIO(), baseline_dir=str(tmp_path / 'baselines'))
+
+def output_records(service):
+    return [json.loads(line) for line in service.output.getvalue().splitlines()]
+
+def test_jobs_share_a_saved_baseline(tmp_path, video_path):
+    service = make_service(tmp_path)
+    saved = service.run_job({'job_id': 'train', 'train_video': video_path, 'test_video': video_path,
+                             'save_baseline': 'clip'})
+    assert saved['status'] == 'ok'
+    assert os.path.isdir(tmp_path / 'baselines' / 'clip')
+    assert all(prop_drift['Drift Score'] == 0 for prop_drift in saved['results'].values())
+
+    reused = service.run_job({'train_baseline': 'clip', 'test_video': video_path, 'distances': True})
+    assert reused['job_id'] == 'job-2'
+    assert reused['results'] == {prop_name: {**prop_drift, 'Wasserstein': 0.0, 'PSI': 0.0, 'Jensen-Shannon': 0.0}
+                                 for prop_name, prop_drift in saved['results'].items()}
+    # Options of one job do not leak into the next
+    plain = service.run_job({'train_baseline': 'clip', 'test_video': video_path})
+    assert plain['results'] == saved['results']
+    assert [record['job_id'] for record in output_records(service)] == ['train', 'job-2', 'job-3']
+
+def test_windowed_job(tmp_path, video_path):
+    service = make_service(tmp_path)
+    record = service.run_job({'train_video': video_path, 'test_video': video_path, 'window': 5, 'stride': 5})
+    assert record['status'] == 'ok'
+    assert record['results']['start_frame'] == [0, 5, 10]
+    assert np.array(record['results']['drift']).shape == (3, len(record['results']['properties']))
+
+def test_invalid_jobs_are_reported_and_do_not_stop_the_service(tmp_path, video_path):
+    service = make_service(tmp_path)
+    lines = ['not json\n', '\n', '[1]\n', json.dumps({'test_video': video_path}) + '\n',
+             json.dumps({'job_id': 'missing', 'train_video': video_path, 'test_video': str(tmp_path / 'none.mp4')}),
+             json.dumps({'train_video': video_path, 'test_video': video_path})]
+    records = service.run_lines(lines)
+    assert [record['status'] for record in records] == ['error'] * 4 + ['ok']
+    assert records[0]['error'].startswith('Invalid job JSON')
+    assert records[1]['error'] == 'ValueError: A job must be a JSON object.'
+    assert records[3]['job_id'] == 'missing'
+    assert [record['job_id'] for record in records] == [record['job_id'] for record in output_records(service)]
+
+def test_serve_directory_once(tmp_path, video_path):
+    jobs_dir = tmp_path / 'jobs'
+    jobs_dir.mkdir()
+    (jobs_dir / 'b.jsonl').write_text(json.dumps({'job_id': 'b', 'train_video': video_path, 'test_video': video_path}))
+    (jobs_dir / 'a.jsonl').write_text(json.dumps({'job_id': 'a', 'train_video': video_path, 'test_video': video_path}))
+    (jobs_dir / 'c.jsonl.tmp').write_text('')
+    instrumentation = Instrumentation()
+    service = make_service(tmp_path, instrumentation=instrumentation)
+    service.serve_directory(str(jobs_dir), once=True)
+    assert [record['job_id'] for record in output_records(service)] == ['a', 'b']
+    assert sorted(os.listdir(jobs_dir)) == ['a.jsonl.done', 'b.jsonl.done', 'c.jsonl.tmp']
+    assert instrumentation.counters['frames_sampled'] == 4 * 15
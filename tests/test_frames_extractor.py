@@ -0,0 +1,91 @@
+import cv2
+import numpy as np
+import pytest
+from frames_extractor import FrameRingBuffer, VideoFrameExtractor
+from instrumentation import Instrumentation
+
+class TruncatedCapture:
+    """
+    A capture whose container announces more frames than it can seek to or decode.
+    """
+
+    def __init__(self, readable_frames, seekable=True):
+        self.readable_frames = readable_frames
+        self.seekable = seekable
+        self.position = 0
+
+    def set(self, prop_id, value):
+        assert prop_id == cv2.CAP_PROP_POS_FRAMES
+        if not self.seekable and value >= self.readable_frames:
+            return False
+        self.position = int(value)
+        return True
+
+    def read(self):
+        if self.position >= self.readable_frames:
+            return False, None
+        self.position += 1
+        return True, self.position - 1
+
+    def grab(self):
+        return self.read()[0]
+
+@pytest.mark.parametrize('seek,seekable', [(False, True), (True, True), (True, False)])
+def test_undecodable_frames_are_counted_as_dropped(seek, seekable):
+    instrumentation = Instrumentation()
+    extractor = VideoFrameExtractor('unused.mp4', instrumentation=instrumentation)
+    cap = TruncatedCapture(readable_frames=45, seekable=seekable)
+    sampled = list(extractor._iter_sampled(cap, cap.read, cap.grab, 10, 100, seek))
+    assert [frame_index for frame_index, _ in sampled] == [0, 10, 20, 30, 40]
+    # Every frame from the first one that could not be reached is dropped
+    expected_dropped = 100 - (45 if not seek else 50)
+    assert instrumentation.counters.get('frames_dropped') == expected_dropped
+
+def test_complete_video_drops_nothing(video_path):
+    for seek in (False, True):
+        instrumentation = Instrumentation()
+        extractor = VideoFrameExtractor(video_path, target_fpm=120, instrumentation=instrumentation)
+        assert len(list(extractor.iter_frames(seek=seek))) > 1
+        assert 'frames_dropped' not in instrumentation.counters
+
+def test_seeking_samples_the_same_frames_as_grabbing(video_path):
+    extractor = VideoFrameExtractor(video_path, target_fpm=120, frame_size=None)
+    grabbed = list(extractor.iter_frames(seek=False, with_frame_indices=True))
+    sought = list(extractor.iter_frames(seek=True, with_frame_indices=True))
+    # A 3-second video sampled at 120 frames per minute: every fifth of its 30 frames
+    assert [frame_index for frame_index, _, _ in grabbed] == [0, 5, 10, 15, 20, 25]
+    assert [frame_index for frame_index, _, _ in sought] == [0, 5, 10, 15, 20, 25]
+    assert [timestamp for _, timestamp, _ in grabbed] == pytest.approx([0.0, 0.5, 1.0, 1.5, 2.0, 2.5])
+    for (_, _, grabbed_frame), (_, _, sought_frame) in zip(grabbed, sought):
+        assert grabbed_frame.shape == (1, 3, 64, 96)
+        np.testing.assert_array_equal(grabbed_frame, sought_frame)
+
+def test_frame_size_and_ring_buffer(video_path):
+    extractor = VideoFrameExtractor(video_path, target_fpm=120, frame_size=(48, 32))
+    frames = [frame.copy() for frame in extractor.iter_frames()]
+    assert extractor.native_size == (96, 64)
+    assert all(frame.shape == (1, 3, 32, 48) for frame in frames)
+    buffered = [frame.copy() for frame in extractor.iter_frames(ring_buffer=FrameRingBuffer())]
+    np.testing.assert_array_equal(np.concatenate(buffered), np.concatenate(frames))
+
+def sampled_frames(values):
+    return [(index, np.full((32, 32, 3), value, dtype=np.uint8)) for index, value in enumerate(values)]
+
+def test_change_threshold_skips_unchanged_frames():
+    instrumentation = Instrumentation()
+    extractor = VideoFrameExtractor('unused.mp4', change_threshold=5, instrumentation=instrumentation)
+    # Changes are measured against the last kept frame, so a slow drift is kept once it adds up
+    kept = extractor._iter_changed(sampled_frames([100, 101, 102, 150, 152, 154, 156, 20]))
+    assert [frame_index for frame_index, _ in kept] == [0, 3, 6, 7]
+    assert instrumentation.counters['frames_unchanged'] == 4
+
+def test_max_gap_keeps_a_frame_after_that_many_skips():
+    extractor = VideoFrameExtractor('unused.mp4', change_threshold=5, max_gap=2)
+    kept = extractor._iter_changed(sampled_frames([100] * 8))
+    assert [frame_index for frame_index, _ in kept] == [0, 3, 6]
+
+def test_change_threshold_on_a_video(video_path):
+    extractor = VideoFrameExtractor(video_path, target_fpm=600, change_threshold=12)
+    kept = [frame_index for frame_index, _, _ in extractor.iter_frames(with_frame_indices=True)]
+    # The background brightens by 8 per frame, so it takes two frames to pass a threshold of 12
+    assert kept == list(range(0, 30, 2))
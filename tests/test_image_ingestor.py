@@ -0,0 +1,40 @@
+import io
+import os
+import tarfile
+import cv2
+import numpy as np
+from image_ingestor import ImageIngestor, load_properties
+from image_processor import ImageProcessor
+
+def test_ingested_chunks_load_back_into_one_array_per_property(tmp_path):
+    rng = np.random.default_rng(0)
+    image_dir = tmp_path / 'images'
+    image_dir.mkdir()
+    images = {}
+    for index in range(5):
+        image = rng.integers(0, 256, (20 + index, 30, 3), dtype=np.uint8)
+        name = f'{index}.png'
+        cv2.imwrite(str(image_dir / name), image)
+        images[name] = image
+    image = rng.integers(0, 256, (16, 16, 3), dtype=np.uint8)
+    data = cv2.imencode('.png', image)[1].tobytes()
+    with tarfile.open(str(image_dir / 'shard.tar'), 'w') as archive:
+        member = tarfile.TarInfo('in_tar.png')
+        member.size = len(data)
+        archive.addfile(member, io.BytesIO(data))
+    images['shard.tar/in_tar.png'] = image
+
+    output_dir = str(tmp_path / 'properties')
+    summary = ImageIngestor(threads=2, chunk_size=2).ingest([str(image_dir)], output_dir)
+    assert summary == {'images': 6, 'failed': 0, 'chunks': 3}
+    assert len(os.listdir(output_dir)) == 3
+
+    props = load_properties(output_dir)
+    assert sorted(props['names']) == sorted(images)
+    processor = ImageProcessor()
+    for index, name in enumerate(props['names']):
+        for prop_name, value in processor.calculate_all_properties(images[name]).items():
+            assert props[prop_name][index] == value, (name, prop_name)
+
+def test_load_properties_of_an_empty_directory(tmp_path):
+    assert load_properties(str(tmp_path)) == {}
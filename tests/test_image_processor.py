@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+from image_processor import ImageProcessor
+from property_calculator import PropertyCalculator
+
+PER_PROPERTY_FUNCTIONS = {
+    'Aspect Ratio': 'calculate_aspect_ratio',
+    'Area': 'calculate_area',
+    'Average Brightness': 'calculate_average_brightness',
+    'Luminance Brightness': 'calculate_luminance_brightness',
+    'RMS Contrast': 'calculate_rms_contrast',
+    'Mean Red Relative Intensity': 'calculate_mean_red_relative_intensity',
+    'Mean Green Relative Intensity': 'calculate_mean_green_relative_intensity',
+    'Mean Blue Relative Intensity': 'calculate_mean_blue_relative_intensity',
+}
+
+@pytest.mark.parametrize('shape', [(48, 64), (97, 131), (1, 1), (5, 7)])
+def test_fused_kernel_matches_per_property_functions(shape, make_frames):
+    processor = ImageProcessor()
+    for frame in make_frames(shape):
+        fused = processor.calculate_all_properties(frame)
+        assert set(fused) == set(PER_PROPERTY_FUNCTIONS)
+        for prop_name, function_name in PER_PROPERTY_FUNCTIONS.items():
+            expected = getattr(processor, function_name)(frame)
+            assert fused[prop_name] == pytest.approx(expected, rel=1e-5, abs=1e-6), prop_name
+
+@pytest.mark.parametrize('shape', [(48, 64), (97, 131), (1, 1), (5, 7), (3, 5)])
+def test_batch_properties_equal_fused_kernel(shape, make_frames):
+    processor = ImageProcessor()
+    frames = make_frames(shape)
+    planar = make_frames(shape, planar=True)
+    calculator = PropertyCalculator()
+    # A stacked array, and frames as VideoFrameExtractor yields them: planar views of channels-last images
+    for batch_frames in (planar, [frame.transpose(2, 0, 1)[np.newaxis] for frame in frames]):
+        batch = calculator.get_batch_properties(batch_frames)
+        for index, frame in enumerate(frames):
+            fused = processor.calculate_all_properties(frame)
+            for prop_name, value in fused.items():
+                assert batch[prop_name].dtype == np.float64
+                assert batch[prop_name][index] == value, prop_name
+
+def test_batch_properties_of_an_empty_or_growing_batch(make_frames):
+    calculator = PropertyCalculator()
+    batch = calculator.get_batch_properties(np.zeros((0, 3, 8, 8), dtype=np.uint8))
+    assert set(batch) == set(PER_PROPERTY_FUNCTIONS)
+    assert all(len(values) == 0 for values in batch.values())
+    frames = make_frames((6, 10), planar=True)
+    # A generator has no length, so the columns grow as frames arrive
+    batch = calculator.get_batch_properties(frame for _ in range(700) for frame in frames)
+    assert len(batch['Area']) == 2800
+    np.testing.assert_array_equal(batch['Average Brightness'][4:8], batch['Average Brightness'][:4])
+
+def test_kernels_reject_images_without_channels():
+    processor = ImageProcessor()
+    with pytest.raises(ValueError):
+        processor.calculate_all_properties(np.zeros((4, 4), dtype=np.uint8))
+    with pytest.raises(ValueError):
+        PropertyCalculator().get_batch_properties(np.zeros((2, 4, 4), dtype=np.uint8))
@@ -0,0 +1,35 @@
+import json
+from instrumentation import CallbackSink, Instrumentation, JsonLogSink, PrometheusTextSink
+
+def test_merge_adds_timers_and_counters():
+    instrumentation, other = Instrumentation(), Instrumentation()
+    instrumentation.record_time('decode', 0.5)
+    instrumentation.increment('frames_sampled', 2)
+    other.record_time('decode', 1.5)
+    other.record_time('decode', 0.25)
+    other.record_time('resize', 0.1)
+    other.increment('frames_sampled', 3)
+    other.increment('frames_dropped')
+    instrumentation.merge(other.snapshot())
+    assert instrumentation.timers['decode'] == {'count': 3, 'total_seconds': 2.25, 'max_seconds': 1.5}
+    assert instrumentation.timers['resize'] == {'count': 1, 'total_seconds': 0.1, 'max_seconds': 0.1}
+    assert instrumentation.counters == {'frames_sampled': 5, 'frames_dropped': 1}
+    # The merged timer is a copy, not the other collector's dictionary
+    assert instrumentation.timers['resize'] is not other.timers['resize']
+
+def test_sinks(tmp_path):
+    snapshots = []
+    json_path, prom_path = str(tmp_path / 'metrics.jsonl'), str(tmp_path / 'metrics.prom')
+    instrumentation = Instrumentation([CallbackSink(snapshots.append), JsonLogSink(json_path),
+                                       PrometheusTextSink(prom_path)])
+    with instrumentation.timer('property.RMS Contrast'):
+        pass
+    instrumentation.increment('bytes_read', 10)
+    instrumentation.flush()
+    assert snapshots[0]['counters'] == {'bytes_read': 10}
+    with open(json_path) as file:
+        assert json.loads(file.readline())['timers']['property.RMS Contrast']['count'] == 1
+    with open(prom_path) as file:
+        text = file.read()
+    assert 'propdrift_property_rms_contrast_seconds_count 1' in text
+    assert 'propdrift_bytes_read_total 10' in text
@@ -0,0 +1,36 @@
+import numpy as np
+from noise_drift import NoiseDriftSweep
+from pipeline_propdrift import compute_video_properties
+
+def test_clean_properties_equal_those_of_the_pipeline(video_path):
+    sweep = NoiseDriftSweep([{'gaussian': 0.01}], target_fpm=300, frame_size=(48, 32))
+    clean_props, noisy_props = sweep.measure(video_path)
+    props = compute_video_properties(video_path, extractor_options={'target_fpm': 300, 'frame_size': (48, 32)})
+    assert len(noisy_props) == 1
+    for prop_name, values in props.items():
+        np.testing.assert_array_equal(clean_props[prop_name], values)
+        assert len(noisy_props[0][prop_name]) == len(values) == 15
+
+def test_curve_grows_with_noise_and_is_seeded(video_path):
+    noise_configs = [{'gaussian': 0.0}, {'gaussian': 0.001}, {'gaussian': 0.1}]
+    sweep = NoiseDriftSweep(noise_configs, target_fpm=300, frame_size=(48, 32), seed=5)
+    curve = sweep.calculate_curve(video_path)
+    assert [point['noise'] for point in curve] == noise_configs
+    contrast = [point['drift']['RMS Contrast']['Drift Score'] for point in curve]
+    # Without noise the frames pass through unchanged
+    assert all(prop_drift['Drift Score'] == 0 for prop_drift in curve[0]['drift'].values())
+    assert 0 < contrast[1] < contrast[2]
+    again = NoiseDriftSweep(noise_configs, target_fpm=300, frame_size=(48, 32), seed=5).measure(video_path)[1]
+    for props, point in zip(again, sweep.measure(video_path)[1]):
+        for prop_name, values in props.items():
+            np.testing.assert_array_equal(point[prop_name], values)
+
+def test_curve_against_another_reference(video_path):
+    sweep = NoiseDriftSweep([{'salt_pepper': 0.3}], target_fpm=300, frame_size=(48, 32), seed=0)
+    clean_props, _ = sweep.measure(video_path)
+    # The clean frames of the source video are the default reference
+    assert sweep.calculate_curve(video_path, train_props=clean_props) == sweep.calculate_curve(video_path)
+    drift = sweep.calculate_curve(video_path, train_props=clean_props, distances=True)[0]['drift']
+    assert {'Wasserstein', 'PSI', 'Jensen-Shannon'} <= set(drift['RMS Contrast'])
+    assert drift['RMS Contrast']['Wasserstein'] > 0
+    assert drift['Area']['Wasserstein'] == 0
@@ -0,0 +1,76 @@
+import os
+import numpy as np
+from instrumentation import Instrumentation
+from pipeline_propdrift import PropertyDriftPipeline
+from property_registry import registry
+
+def train_props(num_frames, offset=0.0):
+    return {prop_name: np.arange(num_frames, dtype=np.float64) + offset for prop_name in registry.default_names()}
+
+def test_loaded_baseline_is_reused_until_its_files_change(tmp_path):
+    path = str(tmp_path / 'baseline')
+    pipeline = PropertyDriftPipeline(None, None)
+    pipeline.drift_calculator.save_baseline(train_props(10), path)
+    baseline = pipeline.load_baseline(path)
+    assert pipeline.load_baseline(path + os.sep) is baseline
+
+    # Only sorted_values.npy changes size, and baseline.json keeps its modification time
+    json_path = os.path.join(path, 'baseline.json')
+    json_stat = os.stat(json_path)
+    pipeline.drift_calculator.save_baseline(train_props(20), path)
+    os.utime(json_path, ns=(json_stat.st_atime_ns, json_stat.st_mtime_ns))
+    reloaded = pipeline.load_baseline(path)
+    assert reloaded is not baseline and len(reloaded) == 20
+
+def test_saving_a_baseline_invalidates_the_loaded_one(tmp_path, video_path):
+    path = str(tmp_path / 'baseline')
+    pipeline = PropertyDriftPipeline(video_path, None, save_baseline=path)
+    pipeline.drift_calculator.save_baseline(train_props(10, offset=1000.0), path)
+    stale = pipeline.load_baseline(path)
+    pipeline.load_train_properties()
+    assert os.path.realpath(path) not in pipeline.baselines
+    baseline = pipeline.load_baseline(path)
+    assert baseline is not stale
+    assert baseline.stats['Area']['Mean'] != stale.stats['Area']['Mean']
+
+def test_parallel_workers_report_their_instrumentation(video_path):
+    options = {'frame_size': (48, 32)}
+    single = Instrumentation()
+    PropertyDriftPipeline(video_path, video_path, instrumentation=single, **options).extract_properties(video_path)
+    instrumentation = Instrumentation()
+    pipeline = PropertyDriftPipeline(video_path, video_path, workers=2, instrumentation=instrumentation, **options)
+    train_props, test_props = pipeline.extract_properties_parallel([video_path], [video_path, video_path])
+    assert len(test_props['Area']) == 2 * len(train_props['Area']) > 0
+    counters = instrumentation.counters
+    assert counters['videos'] == 3
+    assert counters['frames_sampled'] == 3 * single.counters['frames_sampled']
+    assert counters['frames_total'] == 3 * single.counters['frames_total']
+    for stage in ('decode', 'resize', 'property.batch', 'extract_parallel'):
+        assert instrumentation.timers[stage]['count'] > 0, stage
+    assert instrumentation.timers['decode']['count'] == 3 * single.timers['decode']['count']
+
+def test_extraction_paths_agree(video_path):
+    expected = PropertyDriftPipeline(video_path, video_path, frame_size=(48, 32)).extract_properties(video_path)
+    assert len(expected['Area']) > 1
+    for options in ({'fused': True}, {'batch': True}, {'batch': True, 'zero_copy': True}, {'seek': True},
+                    {'pipelined': True}, {'pipelined': True, 'zero_copy': True}, {'workers': 2}):
+        pipeline = PropertyDriftPipeline(video_path, video_path, frame_size=(48, 32), **options)
+        if options.get('workers'):
+            props = pipeline.extract_properties_parallel([video_path])[0]
+        else:
+            props = pipeline.extract_properties(video_path)
+        for prop_name in registry.default_names():
+            np.testing.assert_array_equal(props[prop_name], expected[prop_name], err_msg=f"{options} {prop_name}")
+
+def test_native_geometry(video_path):
+    resized = PropertyDriftPipeline(video_path, video_path, frame_size=(48, 48)).extract_properties(video_path)
+    for options in ({}, {'pipelined': True}, {'workers': 2}):
+        pipeline = PropertyDriftPipeline(video_path, video_path, frame_size=(48, 48), native_geometry=True, **options)
+        if options.get('workers'):
+            props = pipeline.extract_properties_parallel([video_path])[0]
+        else:
+            props = pipeline.extract_properties(video_path)
+        # The 96x64 test video, not the square frames its properties are measured on
+        assert np.all(props['Aspect Ratio'] == 1.5) and np.all(props['Area'] == 96 * 64), options
+        assert np.all(resized['Aspect Ratio'] == 1.0)
+        np.testing.assert_array_equal(props['RMS Contrast'], resized['RMS Contrast'])
@@ -0,0 +1,62 @@
+import os
+import shutil
+import numpy as np
+from instrumentation import Instrumentation
+from pipeline_propdrift import compute_video_properties
+from property_cache import PropertyCache
+
+def test_key_follows_content_and_parameters(tmp_path):
+    cache = PropertyCache(str(tmp_path / 'cache'))
+    video, renamed, changed = tmp_path / 'video.mp4', tmp_path / 'renamed.mp4', tmp_path / 'changed.mp4'
+    video.write_bytes(b'frames')
+    renamed.write_bytes(b'frames')
+    changed.write_bytes(b'frames!')
+    key = cache.make_key(str(video), target_fpm=60, frame_size=(384, 384))
+    assert cache.make_key(str(renamed), frame_size=(384, 384), target_fpm=60) == key
+    assert cache.make_key(str(changed), target_fpm=60, frame_size=(384, 384)) != key
+    assert cache.make_key(str(video), target_fpm=30, frame_size=(384, 384)) != key
+
+def test_put_get_and_least_recently_used_eviction(tmp_path):
+    cache = PropertyCache(str(tmp_path / 'cache'))
+    assert cache.get('missing') is None
+    props = {'Area': np.arange(1000, dtype=np.float64), 'RMS Contrast': np.linspace(0, 1, 1000)}
+    for key in ('first', 'second', 'third'):
+        cache.put(key, props)
+    loaded = cache.get('first')
+    assert set(loaded) == set(props)
+    np.testing.assert_array_equal(loaded['RMS Contrast'], props['RMS Contrast'])
+
+    entry_size = os.path.getsize(os.path.join(cache.cache_dir, 'first.npz'))
+    os.utime(os.path.join(cache.cache_dir, 'second.npz'), (0, 0))
+    os.utime(os.path.join(cache.cache_dir, 'third.npz'), (1, 1))
+    cache.max_bytes = 2 * entry_size
+    cache.evict()
+    assert cache.get('second') is None
+    assert cache.get('first') is not None and cache.get('third') is not None
+
+def test_video_properties_are_cached_until_the_video_or_parameters_change(tmp_path, video_path):
+    cache = PropertyCache(str(tmp_path / 'cache'))
+    path = str(tmp_path / 'clip.mp4')
+    shutil.copy(video_path, path)
+    options = {'frame_size': (48, 32)}
+
+    def extract(**params):
+        instrumentation = Instrumentation()
+        props = compute_video_properties(path, cache=cache, instrumentation=instrumentation,
+                                         extractor_options=options, **params)
+        return props, instrumentation.counters
+
+    props, counters = extract()
+    assert counters['cache_misses'] == 1 and counters['frames_sampled'] > 0
+    cached, counters = extract()
+    assert counters == {'cache_hits': 1}
+    for prop_name, values in props.items():
+        np.testing.assert_array_equal(cached[prop_name], values)
+
+    _, counters = extract(native_geometry=True)
+    assert counters['cache_misses'] == 1
+    # Appending to the file changes its content hash
+    with open(path, 'ab') as file:
+        file.write(b'\0')
+    _, counters = extract()
+    assert counters['cache_misses'] == 1
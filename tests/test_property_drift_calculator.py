@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+from scipy.spatial.distance import jensenshannon
+from scipy.stats import ks_2samp, wasserstein_distance
+from property_drift_calculator import DriftCalculator
+
+def binned_shares(train, test, num_bins=10):
+    """
+    Training-quantile bin shares computed one column at a time, with a bin for values above the training maximum.
+    """
+    train_sorted = np.sort(train)
+    edges = np.append(train_sorted[(np.arange(1, num_bins) * len(train)) // num_bins],
+                      np.nextafter(train_sorted[-1], np.inf))
+    shares = [np.bincount(np.searchsorted(edges, values, side='right'), minlength=num_bins + 1) / len(values)
+              for values in (train, test)]
+    return shares[0], shares[1]
+
+def reference_psi(train, test):
+    train_share, test_share = (np.maximum(share, 1e-6) for share in binned_shares(train, test))
+    return np.sum((test_share - train_share) * np.log(test_share / train_share))
+
+def drift_samples():
+    rng = np.random.default_rng(0)
+    train = np.column_stack([rng.normal(0, 1, 300), rng.integers(0, 5, 300), np.ones(300)])
+    test = np.column_stack([rng.normal(0.5, 1.5, 200), rng.integers(2, 8, 200), np.ones(200)])
+    return train, test
+
+def test_drift_matrix_matches_scipy():
+    train, test = drift_samples()
+    stats = DriftCalculator().calculate_drift_matrix(train, test)
+    for column in range(train.shape[1]):
+        expected = ks_2samp(train[:, column], test[:, column])
+        assert stats['KS'][column] == pytest.approx(expected.statistic, abs=1e-12)
+        assert stats['Wasserstein'][column] == pytest.approx(
+            wasserstein_distance(train[:, column], test[:, column]), abs=1e-12)
+        assert stats['PSI'][column] == pytest.approx(reference_psi(train[:, column], test[:, column]), abs=1e-12)
+        assert stats['Jensen-Shannon'][column] == pytest.approx(
+            jensenshannon(*binned_shares(train[:, column], test[:, column]), base=2), abs=1e-7)
+
+def test_identical_samples_show_no_drift():
+    train, _ = drift_samples()
+    stats = DriftCalculator().calculate_drift_matrix(train, train)
+    for stat_name in ('KS', 'Wasserstein', 'PSI', 'Jensen-Shannon'):
+        np.testing.assert_allclose(stats[stat_name], 0.0, atol=1e-7)
+
+@pytest.mark.parametrize('train_column', [np.ones(50), np.append(np.linspace(0, 1, 10), np.ones(40))],
+                         ids=['constant', 'tied-maximum'])
+@pytest.mark.parametrize('test_value', [2.0, -1.0])
+def test_shift_beyond_constant_or_tied_training_values(train_column, test_value):
+    test_column = np.full(40, test_value)
+    stats = DriftCalculator().calculate_drift_matrix(train_column[:, np.newaxis], test_column[:, np.newaxis])
+    assert stats['KS'][0] == 1.0
+    assert stats['Wasserstein'][0] == pytest.approx(wasserstein_distance(train_column, test_column))
+    assert stats['PSI'][0] == pytest.approx(reference_psi(train_column, test_column)) and stats['PSI'][0] > 1
+    assert stats['Jensen-Shannon'][0] == pytest.approx(
+        jensenshannon(*binned_shares(train_column, test_column), base=2), abs=1e-7)
+    assert stats['Jensen-Shannon'][0] > 0.5
+
+@pytest.mark.parametrize('n,m', [(10, 10), (30, 30), (7, 13), (100, 35), (1, 50), (12000, 300)])
+def test_p_values_match_ks_2samp(n, m):
+    rng = np.random.default_rng(n * m)
+    train = np.column_stack([rng.normal(0, 1, n), np.round(rng.normal(0, 1, n)), np.ones(n)])
+    test = np.column_stack([rng.normal(0.3, 1, m), np.round(rng.normal(0.3, 1, m)), np.full(m, 2.0)])
+    drift_calculator = DriftCalculator()
+    stats = drift_calculator.calculate_drift_matrix(train, test, distances=False)
+    for column in range(train.shape[1]):
+        expected = ks_2samp(train[:, column], test[:, column])
+        assert stats['KS p-value'][column] == expected.pvalue
+        ks_statistic, p_value = drift_calculator.ks_against_sorted(np.sort(train[:, column]), test[:, column])
+        assert ks_statistic == pytest.approx(expected.statistic, abs=1e-12)
+        assert p_value == expected.pvalue
@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+from image_processor import ImageProcessor
+from property_calculator import PropertyCalculator
+from property_registry import PropertyRegistry, registry
+
+EXTRA_PROPERTIES = ['Sharpness', 'Entropy', 'Saturation', 'Edge Density']
+
+@pytest.mark.parametrize('shape', [(48, 64), (97, 131), (1, 1)])
+def test_defaults_equal_the_fused_kernel(shape, make_frames):
+    processor = ImageProcessor()
+    for frame in make_frames(shape):
+        assert registry.compute(frame) == processor.calculate_all_properties(frame)
+
+def test_resolve():
+    assert registry.resolve() == registry.default_names()
+    assert len(registry.default_names()) == 8
+    # Selections come back in registration order
+    assert registry.resolve(['Entropy', 'Area']) == ['Area', 'Entropy']
+    with pytest.raises(ValueError, match='Unknown properties: Focus'):
+        registry.resolve(['Area', 'Focus'])
+
+def test_plans_only_the_needed_intermediates():
+    assert registry.plan(['Area']) == []
+    assert registry.plan(['Entropy']) == ['gray_u8']
+    assert registry.plan(['Sharpness']) == ['float', 'gray', 'laplacian']
+    plan = registry.plan(registry.default_names())
+    assert 'hsv' not in plan and 'laplacian' not in plan
+    assert plan.index('float') < plan.index('intensity_sum') < plan.index('relative_intensities')
+
+def test_compute_evaluates_each_intermediate_once():
+    calls = []
+    test_registry = PropertyRegistry()
+    test_registry.register_intermediate('double', lambda values: calls.append('double') or values['image'] * 2)
+    test_registry.register('A', lambda values: int(values['double'].sum()), requires=('double',), default=True)
+    test_registry.register('B', lambda values: int(values['double'].max()), requires=('double',), default=True)
+    test_registry.register('C', lambda values: 1)
+    image = np.ones((2, 3, 3), dtype=np.int64)
+    assert test_registry.compute(image) == {'A': 36, 'B': 2}
+    assert calls == ['double']
+    assert test_registry.compute(image, ['C']) == {'C': 1}
+    assert calls == ['double']
+    with pytest.raises(ValueError, match='unknown intermediate'):
+        test_registry.register('D', lambda values: 0, requires=('missing',))
+    with pytest.raises(ValueError):
+        test_registry.compute(np.zeros((2, 3), dtype=np.uint8))
+
+def test_extra_properties():
+    black, gray = np.zeros((32, 32, 3), dtype=np.uint8), np.full((32, 32, 3), 128, dtype=np.uint8)
+    for flat in (black, gray):
+        assert registry.compute(flat, EXTRA_PROPERTIES) == {name: 0 for name in EXTRA_PROPERTIES}
+
+    image = np.zeros((32, 32, 3), dtype=np.uint8)
+    image[:, 16:] = (0, 0, 255)  # Right half pure red
+    prop_values = registry.compute(image, EXTRA_PROPERTIES)
+    assert prop_values['Entropy'] == pytest.approx(1.0)
+    assert prop_values['Saturation'] == pytest.approx(0.5)
+    assert prop_values['Sharpness'] > 0
+    assert 0 < prop_values['Edge Density'] < 0.2
+
+def test_calculator_paths_agree_on_selected_properties(make_frames):
+    frames = make_frames()
+    names = ['Area', 'Entropy', 'Saturation']
+    batch_props = PropertyCalculator(properties=names).get_batch_properties(frames.transpose(0, 3, 1, 2))
+    for fused in (False, True):
+        table = PropertyCalculator(fused=fused, properties=names).get_frames_table(frames)
+        assert table.property_names == names
+        for name in names:
+            np.testing.assert_array_equal(table[name], batch_props[name])
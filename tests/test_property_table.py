@@ -0,0 +1,75 @@
+import numpy as np
+from property_calculator import PropertyCalculator
+from property_drift_calculator import DriftCalculator
+from property_table import PropertyTable
+
+def test_from_props_accepts_both_layouts():
+    columns = {'A': np.array([1.0, 2.0, 3.0]), 'B': np.array([0.5, 0.25, 0.125])}
+    per_image = {f'image_{index}': {'A': columns['A'][index], 'B': columns['B'][index]} for index in range(3)}
+    for props in (columns, per_image):
+        table = PropertyTable.from_props(props)
+        assert len(table) == 3
+        assert table.property_names == ['A', 'B']
+        np.testing.assert_array_equal(table['frame_index'], [0, 1, 2])
+        assert np.isnan(table['timestamp']).all()
+        for prop_name, values in columns.items():
+            assert table[prop_name].dtype == np.float64
+            np.testing.assert_array_equal(table[prop_name], values)
+    assert PropertyTable.from_props(table) is table
+
+def test_append_grows_the_table():
+    table = PropertyTable.empty(['A', 'B'], capacity=1)
+    for index in range(10):
+        table.append({'A': index, 'B': index / 3}, frame_index=index * 2, timestamp=index / 10)
+    assert len(table) == 10
+    np.testing.assert_array_equal(table['frame_index'], np.arange(10) * 2)
+    np.testing.assert_array_equal(table['timestamp'], np.arange(10) / 10)
+    np.testing.assert_array_equal(table['B'], np.arange(10) / 3)
+
+def test_columns_and_mapping_interface():
+    table = PropertyTable.from_props({'A': [1.0, 2.0], 'B': [3.0, 4.0]})
+    columns = table.columns()
+    assert list(columns) == ['A', 'B'] == list(table) == table.keys()
+    assert 'A' in table and 'frame_index' in table and 'C' not in table
+    columns['A'][0] = 10.0  # Columns are copies
+    assert table['A'][0] == 1.0
+
+def test_save_and_memory_mapped_load_round_trip(tmp_path):
+    table = PropertyTable.from_props({'A': np.linspace(0, 1, 7), 'B': np.arange(7.0)},
+                                     frame_index=np.arange(7) * 5, timestamp=np.arange(7) / 2)
+    path = str(tmp_path / 'props.npy')
+    table.save(path)
+    for mmap in (True, False):
+        loaded = PropertyTable.load(path, mmap=mmap)
+        assert isinstance(loaded.data, np.memmap) == mmap
+        assert loaded.property_names == table.property_names
+        np.testing.assert_array_equal(loaded.data, table.data)
+
+def test_concatenate():
+    first = PropertyTable.from_props({'A': [1.0, 2.0]})
+    second = PropertyTable.from_props({'A': [3.0]})
+    np.testing.assert_array_equal(PropertyTable.concatenate([first, second])['A'], [1.0, 2.0, 3.0])
+
+def test_table_and_batch_properties_show_no_drift(make_frames):
+    frames = make_frames(num_frames=12, planar=True)
+    calculator = PropertyCalculator()
+    drift_calculator = DriftCalculator()
+    for native_size in (None, (1920, 1080)):
+        table = calculator.get_frames_table(frames)
+        batch_props = calculator.get_batch_properties(frames)
+        calculator.apply_native_geometry(table, native_size)
+        calculator.apply_native_geometry(batch_props, native_size)
+        for prop_name, values in batch_props.items():
+            np.testing.assert_array_equal(table[prop_name], values)
+        drift = drift_calculator.calculate_property_drift(table, batch_props, precision=None)
+        for prop_name, prop_drift in drift.items():
+            assert prop_drift['Drift Score'] == 0, prop_name
+            assert prop_drift['p-value'] == 1, prop_name
+
+def test_table_shows_no_drift_against_its_saved_baseline(tmp_path, make_frames):
+    table = PropertyCalculator(fused=True).get_frames_table(make_frames(num_frames=12, planar=True))
+    drift_calculator = DriftCalculator()
+    drift_calculator.save_baseline(table, str(tmp_path))
+    baseline = drift_calculator.load_baseline(str(tmp_path))
+    drift = drift_calculator.calculate_property_drift(table, baseline, precision=None)
+    assert all(prop_drift['Drift Score'] == 0 for prop_drift in drift.values())
@@ -0,0 +1,126 @@
+import os
+import threading
+import time
+import numpy as np
+import pytest
+from frames_extractor import VideoFrameExtractor
+from pipeline_propdrift import PropertyDriftPipeline
+from video_downloader import DownloadStream, VideoCache, YouTubeDownloader
+
+URL = 'https://www.youtube.com/watch?v=abc'
+
+class FakeYDL:
+    """
+    Stands in for yt_dlp.YoutubeDL: serves a local video, written in small throttled chunks like a network download
+    and reported through the progress hooks.
+    """
+    source = None
+    error = None
+    downloads = 0
+
+    def __init__(self, opts):
+        self.opts = opts
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def extract_info(self, url, download=True):
+        return {'id': 'abc', 'extractor': 'fake', 'extractor_key': 'Fake', 'format_id': '137', 'ext': 'mp4',
+                'title': 'A clip'}
+
+    def prepare_filename(self, info):
+        path = self.opts['outtmpl']
+        for field in ('extractor', 'id', 'format_id', 'ext'):
+            path = path.replace(f'%({field})s', info[field])
+        return path.replace('%(title).50s', info['title'])
+
+    def process_ie_result(self, info, download=True):
+        FakeYDL.downloads += 1
+        if FakeYDL.error is not None:
+            raise FakeYDL.error
+        path = self.prepare_filename(info)
+        with open(FakeYDL.source, 'rb') as file:
+            data = file.read()
+        with open(path, 'wb') as file:
+            for start in range(0, len(data), 4096):
+                file.write(data[start:start + 4096])
+                file.flush()
+                for hook in self.opts['progress_hooks']:
+                    hook({'status': 'downloading', 'filename': path, 'total_bytes': len(data),
+                          'downloaded_bytes': start})
+                time.sleep(0.002)
+        for hook in self.opts['progress_hooks']:
+            hook({'status': 'finished', 'filename': path, 'total_bytes': len(data)})
+        return info
+
+@pytest.fixture
+def fake_ydl(video_path):
+    FakeYDL.source, FakeYDL.error, FakeYDL.downloads = video_path, None, 0
+    return FakeYDL
+
+def test_frames_decode_from_a_growing_download(tmp_path, fake_ydl, video_path):
+    expected = list(VideoFrameExtractor(video_path, target_fpm=600, frame_size=(48, 32)).iter_frames())
+    downloader = YouTubeDownloader(URL, str(tmp_path), cache_dir=str(tmp_path / 'cache'), ydl_class=fake_ydl)
+    stream = downloader.open_stream()
+    try:
+        frames = list(VideoFrameExtractor(stream, target_fpm=600, frame_size=(48, 32)).iter_frames())
+        path = stream.result()
+    finally:
+        stream.close()
+    assert len(frames) == len(expected) > 1
+    for frame, expected_frame in zip(frames, expected):
+        np.testing.assert_array_equal(frame, expected_frame)
+    with open(path, 'rb') as file, open(video_path, 'rb') as source:
+        assert file.read() == source.read()
+
+def test_cached_video_is_not_downloaded_again(tmp_path, fake_ydl):
+    cache_dir = str(tmp_path / 'cache')
+    first = YouTubeDownloader(URL, str(tmp_path), cache_dir=cache_dir, ydl_class=fake_ydl).fetch()
+    second = YouTubeDownloader(URL, str(tmp_path), cache_dir=cache_dir, ydl_class=fake_ydl).fetch()
+    assert first == second
+    assert fake_ydl.downloads == 1
+    assert os.listdir(os.path.join(cache_dir, 'incoming')) == []
+
+def test_download_error_is_raised_by_result(tmp_path, fake_ydl):
+    fake_ydl.error = RuntimeError('HTTP Error 403')
+    stream = YouTubeDownloader(URL, str(tmp_path), ydl_class=fake_ydl).open_stream()
+    assert list(VideoFrameExtractor(stream).iter_frames()) == []
+    with pytest.raises(RuntimeError, match='403'):
+        stream.result()
+    stream.close()
+
+def test_concurrent_adds_keep_every_index_entry(tmp_path):
+    cache = VideoCache(str(tmp_path))
+
+    def add(index):
+        path = os.path.join(cache.incoming_dir, f'{index}.mp4')
+        with open(path, 'wb') as file:
+            file.write(bytes([index]) * 1024)
+        cache.add(f'Fake:{index}:137', path)
+
+    threads = [threading.Thread(target=add, args=(index,)) for index in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert all(cache.lookup(f'Fake:{index}:137') is not None for index in range(16))
+
+@pytest.mark.parametrize('pipelined', [False, True])
+def test_pipeline_closes_download_streams(tmp_path, fake_ydl, pipelined):
+    pipeline = PropertyDriftPipeline(URL, URL, pipelined=pipelined, download_dir=str(tmp_path))
+    streams = []
+
+    def open_video(video_path):
+        streams.append(YouTubeDownloader(video_path, str(tmp_path), ydl_class=fake_ydl).open_stream())
+        return streams[-1]
+
+    pipeline.open_video = open_video
+    assert len(pipeline.extract_properties(URL)['Area']) > 0
+    fake_ydl.error = RuntimeError('HTTP Error 403')
+    with pytest.raises(RuntimeError, match='403'):
+        pipeline.extract_properties(URL)
+    assert len(streams) == 2 and all(stream.closed for stream in streams)
+    assert isinstance(streams[0], DownloadStream)
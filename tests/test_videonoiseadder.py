@@ -0,0 +1,97 @@
+import argparse
+import os
+import shutil
+import sys
+import cv2
+import numpy as np
+import pytest
+import videonoiseadder
+from videonoiseadder import NoiseEngine, VideoNoiseAdder, parse_noise_config
+
+def gray_frame(value=128, shape=(200, 300, 3)):
+    return np.full(shape, value, dtype=np.uint8)
+
+def test_rejects_unknown_noise_types():
+    with pytest.raises(ValueError):
+        NoiseEngine({'blur': 1.0})
+
+def test_same_seed_draws_the_same_noise():
+    frame = gray_frame()
+    noise_types = {'gaussian': 0.01, 'salt_pepper': 0.05, 'speckle': 0.01, 'poisson': 1.0}
+    first = NoiseEngine(noise_types, seed=3).apply(frame)
+    np.testing.assert_array_equal(NoiseEngine(noise_types, seed=3).apply(frame), first)
+    assert not np.array_equal(NoiseEngine(noise_types, seed=4).apply(frame), first)
+    # Noise can be written over the frame itself
+    in_place = frame.copy()
+    assert NoiseEngine(noise_types, seed=3).apply(in_place, out=in_place) is in_place
+    np.testing.assert_array_equal(in_place, first)
+    np.testing.assert_array_equal(frame, gray_frame())
+
+@pytest.mark.parametrize('noise_types,expected_std', [
+    ({'gaussian': 0.01}, 0.1 * 255),
+    ({'speckle': 0.01}, 0.1 * 128),
+    # Poisson counts at 256 levels of an intensity of 128 / 255
+    ({'poisson': 1.0}, np.sqrt(128 / 255 * 256) / 256 * 255),
+])
+def test_additive_noise_levels(noise_types, expected_std):
+    noisy = NoiseEngine(noise_types, seed=0).apply(gray_frame()).astype(np.float64)
+    # The uint8 conversion truncates, which lowers the mean by half an intensity level
+    assert noisy.mean() == pytest.approx(127.5, abs=0.5)
+    assert noisy.std() == pytest.approx(expected_std, rel=0.03)
+
+def test_salt_and_pepper():
+    noisy = NoiseEngine({'salt_pepper': 0.2}, seed=0).apply(gray_frame())
+    assert np.mean(noisy == 0) == pytest.approx(0.1, abs=0.005)
+    assert np.mean(noisy == 255) == pytest.approx(0.1, abs=0.005)
+    assert np.mean(noisy == 128) == pytest.approx(0.8, abs=0.005)
+
+def test_noise_is_chained_in_order():
+    frame = gray_frame()
+    # Pepper after gaussian noise stays black; gaussian noise after pepper lifts some of it above zero
+    pepper_last = NoiseEngine({'gaussian': 0.01, 'salt_pepper': 0.2}, seed=0).apply(frame)
+    pepper_first = NoiseEngine({'salt_pepper': 0.2, 'gaussian': 0.01}, seed=0).apply(frame)
+    assert np.mean(pepper_last == 0) > 1.5 * np.mean(pepper_first == 0)
+
+def test_parse_noise_config():
+    assert parse_noise_config('gaussian=0.01, poisson=1') == {'gaussian': 0.01, 'poisson': 1.0}
+    for spec in ('blur=1', 'gaussian', 'gaussian='):
+        with pytest.raises(argparse.ArgumentTypeError):
+            parse_noise_config(spec)
+
+def read_frames(path):
+    cap = cv2.VideoCapture(path)
+    frames = []
+    ret, frame = cap.read()
+    while ret:
+        frames.append(frame)
+        ret, frame = cap.read()
+    cap.release()
+    return np.array(frames)
+
+@pytest.mark.filterwarnings('ignore:ffmpeg not found')
+def test_corpus_does_not_depend_on_the_number_of_workers(tmp_path, video_path):
+    input_dir = tmp_path / 'videos'
+    input_dir.mkdir()
+    for name in ('a.mp4', 'b.mp4'):
+        shutil.copy(video_path, input_dir / name)
+    sweep = [{'gaussian': 0.01}, {'salt_pepper': 0.05}]
+    outputs = {}
+    for run, (seed, workers) in enumerate([(7, 1), (7, 2), (8, 1)]):
+        output_dir = str(tmp_path / f'run{run}')
+        VideoNoiseAdder(str(input_dir), output_dir, frames_per_minute=300, seed=seed, workers=workers).process_videos(sweep)
+        outputs[run] = {name: read_frames(os.path.join(output_dir, name)) for name in sorted(os.listdir(output_dir))}
+    assert sorted(outputs[0]) == ['a_gaussian_0.01.mp4', 'a_salt_pepper_0.05.mp4',
+                                  'b_gaussian_0.01.mp4', 'b_salt_pepper_0.05.mp4']
+    assert all(len(frames) == 30 for frames in outputs[0].values())
+    for name, frames in outputs[0].items():
+        np.testing.assert_array_equal(outputs[1][name], frames)
+        assert not np.array_equal(outputs[2][name], frames)
+    # Each video gets its own noise
+    assert not np.array_equal(outputs[0]['a_gaussian_0.01.mp4'], outputs[0]['b_gaussian_0.01.mp4'])
+
+def test_workers_must_be_positive(monkeypatch, tmp_path, capsys):
+    monkeypatch.setattr(sys, 'argv', ['videonoiseadder.py', '--input_dir', str(tmp_path), '--output_dir',
+                                      str(tmp_path / 'out'), '--workers', '0'])
+    with pytest.raises(SystemExit):
+        videonoiseadder.main()
+    assert 'argument --workers: Must be at least 1: 0.' in capsys.readouterr().err
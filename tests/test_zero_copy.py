@@ -0,0 +1,51 @@
+import threading
+import numpy as np
+from frames_extractor import VideoFrameExtractor, FrameRingBuffer
+from image_processor import ImageProcessor, PropertyScratch
+from pipelined_extractor import PipelinedPropertyExtractor
+from property_calculator import PropertyCalculator
+
+def test_ring_buffer_yields_the_same_frames(video_path):
+    extractor = VideoFrameExtractor(video_path, target_fpm=600, frame_size=(48, 32))
+    expected = [frame.copy() for frame in extractor.iter_frames()]
+    ring_buffer = FrameRingBuffer(2)
+    frames = [frame.copy() for frame in extractor.iter_frames(ring_buffer=ring_buffer)]
+    assert len(frames) == len(expected) > 1
+    for frame, expected_frame in zip(frames, expected):
+        np.testing.assert_array_equal(frame, expected_frame)
+
+def test_scratch_reuse_across_frame_sizes():
+    processor = ImageProcessor()
+    scratch = PropertyScratch()
+    rng = np.random.default_rng(1)
+    for shape in [(32, 48), (32, 48), (7, 5), (32, 48)]:
+        image = rng.integers(0, 256, shape + (3,), dtype=np.uint8)
+        assert processor.calculate_all_properties(image, scratch) == processor.calculate_all_properties(image)
+
+def test_fused_calculator_shared_between_threads():
+    calculator = PropertyCalculator(fused=True)
+    rng = np.random.default_rng(2)
+    images = [rng.integers(0, 256, (40, 60, 3), dtype=np.uint8) for _ in range(8)]
+    expected = [ImageProcessor().calculate_all_properties(image) for image in images]
+    results = [[] for _ in images]
+
+    def measure(index):
+        for _ in range(50):
+            results[index].append(calculator.calculate_fused(images[index], calculator.scratch))
+
+    threads = [threading.Thread(target=measure, args=(index,)) for index in range(len(images))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    for index, image_results in enumerate(results):
+        assert all(prop_values == expected[index] for prop_values in image_results)
+
+def test_pipelined_zero_copy_matches_copying_extraction(video_path):
+    options = {'target_fpm': 600, 'frame_size': (48, 32)}
+    expected, _ = PipelinedPropertyExtractor(queue_size=4, workers=2, extractor_options=options).extract_properties(video_path)
+    props, stats = PipelinedPropertyExtractor(queue_size=4, workers=2, extractor_options=options,
+                                              zero_copy=True).extract_properties(video_path)
+    assert stats['frames'] == len(expected['Area']) > 1
+    for prop_name, values in expected.items():
+        np.testing.assert_array_equal(props[prop_name], values)
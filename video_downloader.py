@@ -1,11 +1,248 @@
-import yt_dlp as youtube_dl
-import argparse
+import io
 import os
+import json
+import time
+import hashlib
+import argparse
+import threading
+from contextlib import contextmanager
+try:
+    import fcntl
+except ImportError:  # Not available on Windows, where only threads of one process are serialized
+    fcntl = None
+
+# A single video-only or progressive stream that OpenCV decodes directly, so nothing has to be merged or re-encoded
+FRAMES_FORMAT = 'bestvideo[ext=mp4][vcodec^=avc1]/best[ext=mp4]/best'
+
+# Serializes index updates between the threads of this process; fcntl.flock serializes them between processes
+_INDEX_LOCK = threading.Lock()
+
+def is_url(source):
+    return isinstance(source, str) and source.startswith(('http://', 'https://'))
+
+class VideoCache:
+    """
+    A content-addressed store of downloaded videos.
+
+    Each video is stored once as <SHA-256 of its content>.<ext>, and index.json maps the source it was fetched
+    from (extractor, video ID and format) to that file, so a video is only downloaded again when its file is gone,
+    and two sources serving identical bytes share one file.
+    """
+
+    def __init__(self, cache_dir):
+        """
+        Args:
+            cache_dir (str): Directory holding the videos and the index. Created if missing.
+        """
+        self.cache_dir = cache_dir
+        self.incoming_dir = os.path.join(cache_dir, 'incoming')  # Downloads in progress
+        self.index_path = os.path.join(cache_dir, 'index.json')
+        self.lock_path = os.path.join(cache_dir, 'index.lock')
+        if not os.path.exists(self.incoming_dir):
+            os.makedirs(self.incoming_dir)
+
+    @staticmethod
+    def source_key(info):
+        """
+        Builds the index key of a video from its yt-dlp info dictionary.
+        """
+        extractor = info.get('extractor_key') or info.get('extractor', 'generic')
+        return f"{extractor}:{info['id']}:{info.get('format_id', '')}"
+
+    def _load_index(self):
+        if not os.path.exists(self.index_path):
+            return {}
+        with open(self.index_path, 'r') as file:
+            return json.load(file)
+
+    @contextmanager
+    def _index_lock(self):
+        """
+        Holds an exclusive lock on the index, so concurrent downloads into the same cache never drop each other's
+        entries.
+        """
+        with _INDEX_LOCK, open(self.lock_path, 'a') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)  # Released when the file is closed
+            yield
+
+    def lookup(self, source_key):
+        """
+        Returns the path of the cached video of a source, or None if it has not been fetched.
+        """
+        name = self._load_index().get(source_key)
+        if name is None:
+            return None
+        path = os.path.join(self.cache_dir, name)
+        return path if os.path.exists(path) else None
+
+    def add(self, source_key, path):
+        """
+        Moves a downloaded video into the store under its content hash and records its source.
+
+        Returns:
+            str: The path of the stored video.
+        """
+        digest = hashlib.sha256()
+        with open(path, 'rb') as file:
+            for block in iter(lambda: file.read(1 << 20), b''):
+                digest.update(block)
+        stored_path = os.path.join(self.cache_dir, f"{digest.hexdigest()}{os.path.splitext(path)[1]}")
+        if os.path.exists(stored_path):
+            os.remove(path)  # Identical content is already stored
+        else:
+            os.replace(path, stored_path)
+
+        with self._index_lock():
+            index = self._load_index()
+            index[source_key] = os.path.basename(stored_path)
+            tmp_path = f"{self.index_path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w') as file:
+                json.dump(index, file, indent=4)
+            os.replace(tmp_path, self.index_path)
+        return stored_path
+
+class DownloadStream(io.BufferedIOBase):
+    """
+    A seekable binary stream over a video that is still downloading, which VideoFrameExtractor accepts in place
+    of a path.
+
+    The download runs in a background thread that writes the file front to back. Reads of bytes that have not
+    arrived yet wait for them, so frames are decoded while the rest of the video downloads. OpenCV asks for the
+    stream size when opening it; it is answered from the size the server announced, or once the download is
+    finished if none was announced. Containers indexed at the front, like YouTube's MP4 streams, start decoding
+    right away; those indexed at the end are read once that end has arrived.
+    """
+
+    def __init__(self, download, poll_seconds=0.05):
+        """
+        Args:
+            download: Called in the background thread with a yt-dlp progress hook; downloads the video and returns
+                the path of the finished file.
+            poll_seconds (float): Interval at which waiting reads check for new data.
+        """
+        super().__init__()
+        self.poll_seconds = poll_seconds
+        self.filename = None
+        self.total_bytes = None
+        self.error = None
+        self.finished = threading.Event()
+        self._file = None
+        self._position = 0
+        self._thread = threading.Thread(target=self._run, args=(download,), daemon=True)
+        self._thread.start()
+
+    def _run(self, download):
+        try:
+            self.filename = download(self._progress)
+        except Exception as e:
+            self.error = e
+        finally:
+            self.finished.set()
+
+    def _progress(self, status):
+        if self.filename is None and status.get('filename'):
+            self.filename = status['filename']
+        if self.total_bytes is None and status.get('total_bytes'):
+            self.total_bytes = status['total_bytes']
+
+    def _open(self):
+        while self._file is None:
+            # Checked before opening: once finished, filename is the final path
+            finished = self.finished.is_set()
+            if self.filename is not None:
+                try:
+                    self._file = open(self.filename, 'rb')
+                except FileNotFoundError:
+                    pass  # Not created yet, or just moved into the cache
+            if self._file is None:
+                if finished:
+                    return None
+                time.sleep(self.poll_seconds)
+        return self._file
+
+    def _wait_for(self, end):
+        file = self._open()
+        while file is not None and not self.finished.is_set() and os.fstat(file.fileno()).st_size < end:
+            time.sleep(self.poll_seconds)
+        return file
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            self.finished.wait()
+            file = self._open()
+        else:
+            file = self._wait_for(self._position + size)
+        if file is None:
+            return b''
+        file.seek(self._position)
+        data = file.read(size)
+        self._position += len(data)
+        return data
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_END:
+            total_bytes = self.total_bytes
+            if total_bytes is None:
+                self.finished.wait()
+                file = self._open()
+                total_bytes = os.fstat(file.fileno()).st_size if file is not None else 0
+            self._position = total_bytes + offset
+        elif whence == io.SEEK_CUR:
+            self._position += offset
+        else:
+            self._position = offset
+        return self._position
+
+    def tell(self):
+        return self._position
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+        super().close()
+
+    def result(self):
+        """
+        Waits for the download to finish.
+
+        Returns:
+            str: The path of the downloaded video.
+        """
+        self._thread.join()
+        if self.error is not None:
+            raise self.error
+        return self.filename
 
 class YouTubeDownloader:
-    def __init__(self, url, output_folder):
+    def __init__(self, url, output_folder, cache_dir=None, ydl_class=None):
+        """
+        Args:
+            url (str): The video URL.
+            output_folder (str): Folder to save videos to.
+            cache_dir (str): Optional VideoCache directory. fetch and open_stream then reuse videos already fetched
+                and store new ones there instead of in output_folder.
+            ydl_class: Used in place of yt_dlp.YoutubeDL, e.g. a fake that serves local files in tests. It is called
+                with the options dictionary and must provide the context manager, extract_info, process_ie_result
+                and prepare_filename methods of YoutubeDL and call the options' progress_hooks.
+        """
         self.url = url
         self.output_folder = output_folder
+        self.cache = VideoCache(cache_dir) if cache_dir else None
+        self.ydl_class = ydl_class
+
+    def _youtube_dl(self, ydl_opts):
+        if self.ydl_class is not None:
+            return self.ydl_class(ydl_opts)
+        # yt_dlp takes most of a second to import, so it is only imported once a download starts
+        import yt_dlp as youtube_dl
+        return youtube_dl.YoutubeDL(ydl_opts)
 
     def download_video(self):
         """
@@ -20,7 +257,7 @@ class YouTubeDownloader:
             }]
         }
         try:
-            with youtube_dl.YoutubeDL(ydl_opts) as ydl:
+            with self._youtube_dl(ydl_opts) as ydl:
                 info_dict = ydl.extract_info(self.url, download=True)
                 title = info_dict.get('title', 'downloaded_video')
                 filename = f"{title[:50]}.mp4"  # Custom filename
@@ -31,14 +268,61 @@ class YouTubeDownloader:
         except Exception as e:
             print(f"Failed to download video: {e}")
 
+    def fetch(self, progress_hook=None):
+        """
+        Downloads only the video stream in FRAMES_FORMAT, as served and without merging or re-encoding, which is
+        all frame extraction needs. With a cache, a video fetched before is returned without downloading it.
+
+        Args:
+            progress_hook: Optional yt-dlp progress hook.
+
+        Returns:
+            str: The path of the video.
+        """
+        if self.cache is not None:
+            outtmpl = os.path.join(self.cache.incoming_dir, '%(extractor)s-%(id)s-%(format_id)s.%(ext)s')
+        else:
+            outtmpl = os.path.join(self.output_folder, '%(title).50s.%(ext)s')
+        ydl_opts = {
+            'format': FRAMES_FORMAT,
+            'outtmpl': outtmpl,
+            # Write the final file from the first byte, so DownloadStream can read it while it grows
+            'nopart': True,
+            'progress_hooks': [progress_hook] if progress_hook is not None else [],
+        }
+        with self._youtube_dl(ydl_opts) as ydl:
+            info_dict = ydl.extract_info(self.url, download=False)
+            source_key = VideoCache.source_key(info_dict)
+            if self.cache is not None:
+                cached_path = self.cache.lookup(source_key)
+                if cached_path is not None:
+                    return cached_path
+            info_dict = ydl.process_ie_result(info_dict, download=True)
+            path = ydl.prepare_filename(info_dict)
+        if self.cache is not None:
+            path = self.cache.add(source_key, path)
+        return path
+
+    def open_stream(self):
+        """
+        Starts fetching the video in the background and returns a DownloadStream over it, to extract frames while it
+        downloads, e.g. VideoFrameExtractor(downloader.open_stream()). stream.result() returns the fetched path.
+        """
+        return DownloadStream(self.fetch)
+
 def main():
     parser = argparse.ArgumentParser(description="Download a video from YouTube with a custom filename.")
     parser.add_argument('--url', type=str, required=True, help='YouTube video URL')
     parser.add_argument('--output_folder', type=str, required=True, help='Output folder to save the video')
+    parser.add_argument('--frames_only', action='store_true', help='Download only the video stream, without merging audio or converting to MP4')
+    parser.add_argument('--cache_dir', type=str, default=None, help='Content-addressed cache of fetched videos (with --frames_only)')
 
     args = parser.parse_args()
-    downloader = YouTubeDownloader(args.url, args.output_folder)
-    downloader.download_video()
+    downloader = YouTubeDownloader(args.url, args.output_folder, args.cache_dir)
+    if args.frames_only:
+        print(f"Video saved as {downloader.fetch()}")
+    else:
+        downloader.download_video()
 
 if __name__ == "__main__":
     main()
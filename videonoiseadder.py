@@ -1,69 +1,387 @@
 import cv2
 import numpy as np
 import os
+import shutil
+import warnings
+import zlib
 import argparse
-from moviepy.editor import VideoFileClip
-from skimage.util import random_noise
+import subprocess
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
+from pipeline_propdrift import positive_int
+
+NOISE_TYPES = ('gaussian', 'salt_pepper', 'speckle', 'poisson')
+
+class NoiseEngine:
+    """
+    Applies a chain of noise types to uint8 BGR frames in place.
+
+    The noise models follow skimage.util.random_noise with clip=True on images scaled to [0, 1]: 'gaussian' adds
+    N(0, var), 'salt_pepper' sets a fraction `amount` of the values to 0 or 1 with equal probability, 'speckle'
+    adds image * N(0, var), and 'poisson' scales the image by its intensity and draws Poisson counts at 256
+    levels, the number random_noise infers for 8-bit frames. Noise is drawn from a seeded np.random.Generator
+    in float32 into work buffers that are allocated once per frame size, so no frame-sized float64 copies are made.
+    """
+
+    def __init__(self, noise_types, seed=None):
+        """
+        Args:
+            noise_types (dict): Noise type names mapped to their intensities, applied in order.
+            seed: Seed of the noise generator, e.g. an int or a np.random.SeedSequence.
+        """
+        for noise_type in noise_types:
+            if noise_type not in NOISE_TYPES:
+                raise ValueError(f"Invalid noise type: {noise_type}.")
+        self.noise_types = dict(noise_types)
+        self.rng = np.random.default_rng(seed)
+        self.work = None
+        self.noise = None
+        self.mask = None
+
+    def _prepare(self, shape):
+        if self.work is None or self.work.shape != shape:
+            self.work = np.empty(shape, dtype=np.float32)
+            self.noise = np.empty(shape, dtype=np.float32)
+            self.mask = np.empty(shape, dtype=bool)
+
+    def apply(self, frame, out=None):
+        """
+        Adds noise to a frame.
+
+        Args:
+            frame: A uint8 frame of shape (H, W, 3).
+            out: The uint8 array to write the noisy frame to; may be frame itself. Defaults to a new array.
+
+        Returns:
+            numpy.ndarray: The noisy frame.
+        """
+        self._prepare(frame.shape)
+        work, noise, mask = self.work, self.noise, self.mask
+        np.multiply(frame, np.float32(1.0 / 255.0), out=work)
+        for noise_type, noise_intensity in self.noise_types.items():
+            if noise_type == 'gaussian':
+                self.rng.standard_normal(dtype=np.float32, out=noise)
+                noise *= np.float32(np.sqrt(noise_intensity))
+                work += noise
+            elif noise_type == 'salt_pepper':
+                self.rng.random(dtype=np.float32, out=noise)
+                np.less(noise, noise_intensity, out=mask)
+                np.copyto(work, 1.0, where=mask)
+                np.less(noise, noise_intensity / 2.0, out=mask)
+                np.copyto(work, 0.0, where=mask)
+            elif noise_type == 'speckle':
+                self.rng.standard_normal(dtype=np.float32, out=noise)
+                noise *= np.float32(np.sqrt(noise_intensity))
+                noise *= work
+                work += noise
+            else:
+                # Generator.poisson has no out argument, so this is the one noise type that allocates
+                work *= np.float32(noise_intensity * 256.0)
+                np.multiply(self.rng.poisson(work), np.float32(1.0 / 256.0), out=work, casting='unsafe')
+            np.clip(work, 0.0, 1.0, out=work)
+
+        work *= np.float32(255.0)
+        if out is None:
+            out = np.empty(frame.shape, dtype=np.uint8)
+        # The unsafe cast truncates, as the previous (255 * noisy_frame).astype(np.uint8) conversion did
+        np.copyto(out, work, casting='unsafe')
+        return out
+
+class VideoEncoder:
+    """
+    Encodes BGR frames to H.264 through a single ffmpeg pipe, re-encoding the audio of a source video as AAC.
+
+    Falls back to cv2.VideoWriter (MPEG-4 Part 2, no audio) when ffmpeg is not on the PATH.
+    """
+
+    def __init__(self, output_path, width, height, fps, audio_source=None):
+        self.process = None
+        self.writer = None
+        if shutil.which('ffmpeg') is None:
+            warnings.warn("ffmpeg not found; writing video without audio using OpenCV.")
+            self.writer = cv2.VideoWriter(output_path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (width, height))
+            return
+        command = ['ffmpeg', '-y', '-loglevel', 'error',
+                   '-f', 'rawvideo', '-pix_fmt', 'bgr24', '-s', f'{width}x{height}', '-r', str(fps), '-i', '-']
+        if audio_source is not None:
+            command += ['-i', audio_source, '-map', '0:v', '-map', '1:a?', '-c:a', 'aac', '-shortest']
+        command += ['-c:v', 'libx264', '-pix_fmt', 'yuv420p', output_path]
+        self.process = subprocess.Popen(command, stdin=subprocess.PIPE)
+
+    def write(self, frame):
+        if self.writer is not None:
+            self.writer.write(frame)
+        else:
+            self.process.stdin.write(np.ascontiguousarray(frame).data)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.release()
+            return
+        try:
+            self.process.stdin.close()
+        except BrokenPipeError:
+            pass  # ffmpeg already exited; its exit status is checked below
+        if self.process.wait():
+            raise RuntimeError(f"ffmpeg exited with status {self.process.returncode}.")
+
+def close_encoders(encoders):
+    """
+    Closes every encoder, also when closing one of them fails, so no ffmpeg process is left running.
+
+    Returns:
+        list: The errors raised while closing, one per encoder that failed.
+    """
+    errors = []
+    for encoder in encoders:
+        try:
+            encoder.close()
+        except Exception as e:
+            errors.append(e)
+    return errors
+
+def concat_videos(part_paths, output_path, audio_source=None):
+    """
+    Joins video segments into one video with the ffmpeg concat demuxer, without re-encoding the video, and takes
+    the audio from a source video. Without ffmpeg the segments are decoded and re-encoded with OpenCV.
+    """
+    if shutil.which('ffmpeg') is None:
+        encoder = None
+        succeeded = False
+        try:
+            for part_path in part_paths:
+                cap = cv2.VideoCapture(part_path)
+                if encoder is None:
+                    encoder = VideoEncoder(output_path, int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                                           int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)), cap.get(cv2.CAP_PROP_FPS))
+                ret, frame = cap.read()
+                while ret:
+                    encoder.write(frame)
+                    ret, frame = cap.read(frame)
+                cap.release()
+            succeeded = True
+        finally:
+            close_errors = close_encoders([encoder] if encoder is not None else [])
+            if close_errors and succeeded:
+                raise close_errors[0]
+        return
+
+    list_path = f"{output_path}.{os.getpid()}.txt"
+    with open(list_path, 'w') as file:
+        for part_path in part_paths:
+            file.write(f"file '{os.path.abspath(part_path)}'\n")
+    command = ['ffmpeg', '-y', '-loglevel', 'error', '-f', 'concat', '-safe', '0', '-i', list_path]
+    if audio_source is not None:
+        command += ['-i', audio_source, '-map', '0:v', '-map', '1:a?', '-c:a', 'aac', '-shortest']
+    command += ['-c:v', 'copy', output_path]
+    try:
+        subprocess.run(command, check=True)
+    finally:
+        os.remove(list_path)
+
+def parse_noise_config(spec):
+    """
+    Parses a noise configuration such as 'gaussian=0.01,poisson=1.0' into a dictionary of intensities.
+    """
+    noise_types = {}
+    for item in spec.split(','):
+        noise_type, _, intensity = item.partition('=')
+        noise_type = noise_type.strip()
+        if noise_type not in NOISE_TYPES or not intensity:
+            raise argparse.ArgumentTypeError(f"Invalid noise configuration: {spec}.")
+        noise_types[noise_type] = float(intensity)
+    return noise_types
+
+def noise_video(video_path, output_paths, noise_configs, seeds, frames_per_minute, start_frame=0, end_frame=None,
+                with_audio=True):
+    """
+    Decodes frames [start_frame, end_frame) of a video once and writes one noisy copy per noise configuration.
+    Runs in pool worker processes.
+
+    Noise is added to every frame whose index in the whole video is a multiple of the sampling interval, so
+    segments of one video line up with a single pass over it.
+
+    Args:
+        video_path (str): The source video.
+        output_paths (list): One output path per noise configuration.
+        noise_configs (list): Dictionaries of noise types and intensities.
+        seeds (list): One NoiseEngine seed per noise configuration.
+        frames_per_minute (int): Number of noisy frames per minute of video.
+        start_frame (int): Index of the first frame to process.
+        end_frame (int): Index after the last frame to process; defaults to the end of the video.
+        with_audio (bool): If True, the outputs take their audio from the source video.
+
+    Returns:
+        int: The number of frames processed.
+    """
+    cap = cv2.VideoCapture(video_path)
+    encoders = []
+    succeeded = False
+    try:
+        if not cap.isOpened():
+            raise IOError("Could not open video.")
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        frame_interval = max(1, int(fps * 60 / frames_per_minute))
+        if start_frame:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+
+        engines = [NoiseEngine(noise_types, seed) for noise_types, seed in zip(noise_configs, seeds)]
+        for output_path in output_paths:
+            encoders.append(VideoEncoder(output_path, width, height, fps, video_path if with_audio else None))
+        frame = None
+        noisy_frame = None
+        frame_index = start_frame
+        while end_frame is None or frame_index < end_frame:
+            ret, frame = cap.read(frame)
+            if not ret:
+                break
+            if frame_index % frame_interval == 0:
+                # The decoded frame stays clean, so every configuration adds noise to the same source pixels
+                if noisy_frame is None:
+                    noisy_frame = np.empty_like(frame)
+                for engine, encoder in zip(engines, encoders):
+                    encoder.write(engine.apply(frame, out=noisy_frame))
+            else:
+                for encoder in encoders:
+                    encoder.write(frame)
+            frame_index += 1
+        succeeded = True
+    finally:
+        cap.release()
+        close_errors = close_encoders(encoders)
+        # Raised only after a successful pass, so a close error never replaces the error that stopped it
+        if close_errors and succeeded:
+            raise RuntimeError(f"Failed to finish {len(close_errors)} of {len(encoders)} outputs: "
+                               f"{'; '.join(str(e) for e in close_errors)}")
+    return frame_index - start_frame
 
 class VideoNoiseAdder:
-    def __init__(self, input_directory, output_directory, frames_per_minute=10):
+    def __init__(self, input_directory, output_directory, frames_per_minute=10, seed=None, workers=1,
+                 segment_seconds=None):
+        """
+        Args:
+            input_directory (str): Directory of source videos.
+            output_directory (str): Directory the noisy videos are written to.
+            frames_per_minute (int): Number of noisy frames per minute of video.
+            seed (int): Root seed of the noise. Each video, noise configuration and segment gets its own stream
+                derived from it and the video's file name, so output does not depend on the number of workers or
+                the order videos finish in. Defaults to fresh entropy, which is printed so a run can be repeated.
+            workers (int): Number of worker processes.
+            segment_seconds (float): If given, videos longer than this are split into segments of this length that
+                are processed as separate jobs and joined afterwards.
+        """
         self.input_directory = input_directory
         self.output_directory = output_directory
         self.frames_per_minute = frames_per_minute
+        self.seed = seed
+        self.workers = workers
+        self.segment_seconds = segment_seconds
         if not os.path.exists(self.output_directory):
             os.makedirs(self.output_directory)
 
-    def _apply_noise(self, frame, noise_types):
-        noisy_frame = frame
-        for noise_type, noise_intensity in noise_types.items():
-            if noise_type == "gaussian":
-                noisy_frame = random_noise(noisy_frame, mode='gaussian', var=noise_intensity, clip=True)
-            elif noise_type == "salt_pepper":
-                noisy_frame = random_noise(noisy_frame, mode='s&p', amount=noise_intensity, clip=True)
-            elif noise_type == "speckle":
-                noisy_frame = random_noise(noisy_frame, mode='speckle', var=noise_intensity, clip=True)
-            elif noise_type == "poisson":
-                noisy_frame = random_noise(noisy_frame * noise_intensity, mode='poisson', clip=True)
-            else:
-                raise ValueError(f"Invalid noise type: {noise_type}.")
-        return (255 * noisy_frame).astype(np.uint8)
+    def _seed(self, entropy, video_name, config_index, segment_index):
+        return np.random.SeedSequence([entropy, zlib.crc32(video_name.encode()), config_index, segment_index])
+
+    def _output_path(self, video_path, noise_types):
+        noise_suffix = "_".join([f"{k}_{v}" for k, v in noise_types.items()])
+        video_name_no_ext = os.path.splitext(os.path.basename(video_path))[0]
+        return os.path.join(self.output_directory, f"{video_name_no_ext}_{noise_suffix}.mp4")
+
+    def _segments(self, video_path):
+        if not self.segment_seconds:
+            return [(0, None)]
+        cap = cv2.VideoCapture(video_path)
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        cap.release()
+        segment_frames = max(1, int(round(self.segment_seconds * fps))) if fps > 0 else 0
+        if not segment_frames or frame_count <= segment_frames:
+            return [(0, None)]
+        return [(start, min(start + segment_frames, frame_count)) for start in range(0, frame_count, segment_frames)]
 
     def process_videos(self, noise_types):
-        for video_file in os.listdir(self.input_directory):
+        """
+        Adds noise to every video in the input directory.
+
+        Args:
+            noise_types: A dictionary of noise types and intensities, or a list of them to sweep. A sweep decodes
+                each source video once and writes one noisy copy per configuration.
+        """
+        noise_configs = [noise_types] if isinstance(noise_types, dict) else list(noise_types)
+        entropy = np.random.SeedSequence(self.seed).entropy
+        if self.seed is None:
+            print(f"Noise seed: {entropy}")
+
+        jobs = []
+        for video_file in sorted(os.listdir(self.input_directory)):
             video_path = os.path.join(self.input_directory, video_file)
             if not video_file.lower().endswith(('.mp4', '.avi', '.mov', '.mkv', '.webm')):
                 print(f"Skipping unsupported file format: {video_file}")
                 continue
-            print(f"Processing video: {video_file}")
-            self._process_single_video(video_path, noise_types)
+            output_paths = [self._output_path(video_path, config) for config in noise_configs]
+            segments = self._segments(video_path)
+            for segment_index, (start_frame, end_frame) in enumerate(segments):
+                seeds = [self._seed(entropy, video_file, config_index, segment_index)
+                         for config_index in range(len(noise_configs))]
+                part_paths = output_paths
+                if len(segments) > 1:
+                    part_paths = [f"{os.path.splitext(path)[0]}.part{segment_index:04d}.mp4" for path in output_paths]
+                jobs.append({
+                    'video_path': video_path,
+                    'output_paths': output_paths,
+                    'part_paths': part_paths,
+                    'num_segments': len(segments),
+                    'args': (video_path, part_paths, noise_configs, seeds, self.frames_per_minute, start_frame,
+                             end_frame, len(segments) == 1)
+                })
+
+        print(f"Processing {len(jobs)} jobs with {self.workers} workers")
+        if self.workers > 1:
+            with ProcessPoolExecutor(max_workers=self.workers) as executor:
+                futures = [executor.submit(noise_video, *job['args']) for job in jobs]
+                errors = [self._error(future.result) for future in futures]
+        else:
+            errors = [self._error(partial(noise_video, *job['args'])) for job in jobs]
+
+        parts = {}
+        for job, error in zip(jobs, errors):
+            if error is not None:
+                print(f"Failed to process video {job['video_path']}: {error}")
+            if job['num_segments'] == 1:
+                if error is None:
+                    for output_path in job['output_paths']:
+                        print(f"Noised video saved to {output_path}")
+                continue
+            for output_path, part_path in zip(job['output_paths'], job['part_paths']):
+                parts.setdefault((job['video_path'], output_path), []).append(None if error else part_path)
+
+        for (video_path, output_path), part_paths in parts.items():
+            if None in part_paths:
+                print(f"Skipping {output_path}: not all segments were processed")
+            else:
+                error = self._error(partial(concat_videos, part_paths, output_path, audio_source=video_path))
+                if error is None:
+                    print(f"Noised video saved to {output_path}")
+                else:
+                    print(f"Failed to join segments of video {video_path}: {error}")
+                    if os.path.exists(output_path):
+                        os.remove(output_path)  # Incomplete
+            for part_path in part_paths:
+                if part_path is not None and os.path.exists(part_path):
+                    os.remove(part_path)
 
-    def _process_single_video(self, video_path, noise_types):
+    @staticmethod
+    def _error(run):
+        """
+        Runs a job and returns its error message, or None if it succeeded.
+        """
         try:
-            clip = VideoFileClip(video_path)
-            fps = clip.fps
-            duration = clip.duration
-            frame_interval = max(1, int(fps * 60 / self.frames_per_minute))
-            output_frames = range(0, int(fps * duration), frame_interval)
-
-            noise_suffix = "_".join([f"{k}_{v}" for k, v in noise_types.items()])
-            video_name = os.path.basename(video_path)
-            video_name_no_ext = os.path.splitext(video_name)[0]
-            output_filename = f"{video_name_no_ext}_{noise_suffix}.mp4"
-            output_path = os.path.join(self.output_directory, output_filename)
-            
-            def make_frame(t):
-                frame_index = int(t * fps)
-                if frame_index in output_frames:
-                    frame = clip.get_frame(t)
-                    return self._apply_noise(frame, noise_types)
-                return clip.get_frame(t)
-
-            output_clip = VideoFileClip(video_path, has_mask=True)
-            output_clip = output_clip.set_make_frame(make_frame)
-            output_clip.write_videofile(output_path, codec='libx264', audio_codec='aac')
-            print(f"Noised video saved to {output_path}")
+            run()
+            return None
         except Exception as e:
-            print(f"Failed to process video {video_path}: {str(e)}")
+            return str(e)
 
 def main():
     parser = argparse.ArgumentParser(description="Add noise to videos in a directory and output to another directory.")
@@ -74,16 +392,21 @@ def main():
     parser.add_argument('--salt_pepper', type=float, default=0.01, help='Salt & Pepper noise intensity')
     parser.add_argument('--speckle', type=float, default=0.01, help='Speckle noise intensity')
     parser.add_argument('--poisson', type=float, default=1.0, help='Poisson noise scaling factor')
+    parser.add_argument('--seed', type=int, default=None, help='Seed of the noise generator, for reproducible output')
+    parser.add_argument('--workers', type=positive_int, default=1, help='Number of worker processes')
+    parser.add_argument('--segment_seconds', type=float, default=None, help='Split longer videos into segments of this many seconds processed in parallel')
+    parser.add_argument('--sweep', type=parse_noise_config, nargs='+', default=None, metavar='CONFIG', help="Noise configurations such as 'gaussian=0.01,poisson=1.0' to write from one decode, instead of the individual noise options")
 
     args = parser.parse_args()
-    noise_types = {
+    noise_types = args.sweep or {
         'gaussian': args.gaussian,
         'salt_pepper': args.salt_pepper,
         'speckle': args.speckle,
         'poisson': args.poisson
     }
 
-    noise_adder = VideoNoiseAdder(args.input_dir, args.output_dir, args.frames_per_minute)
+    noise_adder = VideoNoiseAdder(args.input_dir, args.output_dir, args.frames_per_minute, args.seed, args.workers,
+                                  args.segment_seconds)
     noise_adder.process_videos(noise_types=noise_types)
 
 if __name__ == "__main__":